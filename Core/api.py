@@ -0,0 +1,313 @@
+"""
+API HTTP de solo lectura sobre Core, para paneles y cuadernos.
+
+    GET /api/estadisticas?indices=NDVI,EVI&anios=2018-2023
+    GET /api/serie?indices=NDVI&inicio=2000&fin=2025
+    GET /api/mapas?indices=NDVI&anios=2020,2023
+
+Los parámetros admiten varios valores (lista con comas o rango con guion).
+Varios años se resuelven con una sola reducción en GEE (estadisticas_anios)
+y, con el modo multiíndice, los demás índices salen de esa misma petición.
+
+Las respuestas se guardan en memoria del proceso, por encima del almacén
+persistente y de la memoria de map IDs que ya comparten las páginas, y
+peticiones idénticas simultáneas esperan a la misma. Todas llevan ETag y
+Cache-Control con lo que le queda de vida a la respuesta guardada: un
+cliente o proxy inverso que repita la petición con If-None-Match recibe un
+304 sin cuerpo y sin llegar a GEE.
+
+Uso (desde la raíz del repositorio):
+    python -m Core.api --puerto 8766
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import tornado.ioloop
+import tornado.web
+
+from Core.concurrencia import ejecutar_concurrente
+from Core.indices import NOMBRES_INDICES
+
+PUERTO_API = int(os.getenv("LANDSAT_API_PUERTO", "8766"))
+
+ANIO_INICIAL = 2000
+ANIO_FINAL = 2025
+
+# Segundos que el servidor, los clientes y los proxies reutilizan cada
+# respuesta como mucho. Las plantillas de teselas, además, nunca más allá de
+# lo que le queda a la más antigua en la memoria de map IDs (vigencia_mapas)
+MAX_EDAD = {"estadisticas": 3600, "serie": 3600, "mapas": 600}
+
+MAX_RESPUESTAS = 512
+
+
+# ===============================
+# PARÁMETROS
+# ===============================
+def _lista(texto):
+    return [v.strip() for v in texto.split(",") if v.strip()]
+
+
+def _indices(texto):
+    """Índices pedidos en el orden de NOMBRES_INDICES: 'EVI,ndvi' y 'NDVI,EVI' son la misma respuesta"""
+    pedidos = {i.upper() for i in _lista(texto)}
+    desconocidos = sorted(pedidos - set(NOMBRES_INDICES))
+    if not pedidos or desconocidos:
+        raise tornado.web.HTTPError(
+            400, f"Índices no válidos: {', '.join(desconocidos) or '(ninguno)'}"
+        )
+    return [i for i in NOMBRES_INDICES if i in pedidos]
+
+
+def _anio(texto):
+    try:
+        anio = int(texto)
+    except ValueError:
+        raise tornado.web.HTTPError(400, f"Año no válido: {texto}")
+    if not ANIO_INICIAL <= anio <= ANIO_FINAL:
+        raise tornado.web.HTTPError(400, f"Año fuera de {ANIO_INICIAL}–{ANIO_FINAL}: {anio}")
+    return anio
+
+
+def _anios(texto):
+    """'2018-2023' o '2018,2020,2022-2023' -> años ordenados y sin repetir"""
+    anios = set()
+    for parte in _lista(texto):
+        if "-" in parte:
+            inicio, fin = (_anio(v) for v in parte.split("-", 1))
+            anios.update(range(inicio, fin + 1))
+        else:
+            anios.add(_anio(parte))
+    if not anios:
+        raise tornado.web.HTTPError(400, "Falta el parámetro anios")
+    return sorted(anios)
+
+
+# ===============================
+# CONSULTAS
+# ===============================
+def estadisticas(indices, anios):
+    """{índice: {año: estadísticas}}"""
+    from Core.datos import estadisticas_anios
+
+    # Con el modo multiíndice el primer índice trae los demás a la caché
+    return {
+        indice: {str(anio): stats for anio, stats in estadisticas_anios(anios, indice).items()}
+        for indice in indices
+    }
+
+
+def serie(indices, inicio, fin):
+    """{índice: [{Periodo, Año, Valor}, ...]}"""
+    from Core.datos import serie_temporal
+
+    # Una serie con lotes fallidos no se sirve (ni se guarda) como completa
+    series = {}
+    for indice in indices:
+        series[indice], fallidos = serie_temporal(indice, inicio, fin)
+        if fallidos:
+            raise RuntimeError(f"Falló el cálculo de {indice} en {', '.join(fallidos)}")
+    return series
+
+
+def mapas(indices, anios):
+    """{índice: {año: plantilla de teselas}}, con los getMapId que falten en paralelo"""
+    from Core.teselas import url_map_id
+
+    tareas = {
+        (indice, anio): (url_map_id, indice, anio, "api")
+        for indice in indices for anio in anios
+    }
+    resultado = {indice: {} for indice in indices}
+    for r in ejecutar_concurrente(tareas):
+        if r.error is not None:
+            raise r.error
+        indice, anio = r.nombre
+        resultado[indice][str(anio)] = r.valor
+    return resultado
+
+
+def vigencia_mapas(indices, anios):
+    """Segundos que siguen valiendo todas las plantillas de una respuesta de mapas"""
+    from Core.teselas import vigencia_map_id
+
+    return min(vigencia_map_id(indice, anio) for indice in indices for anio in anios)
+
+
+# ===============================
+# CACHÉ DE RESPUESTAS
+# ===============================
+class Respuestas:
+    """
+    Cuerpos JSON ya serializados, con su ETag, hasta que caducan. Solo se usa
+    desde el bucle de tornado, así que no necesita cerrojo; el cálculo va a
+    un hilo para no bloquearlo.
+    """
+
+    def __init__(self, max_respuestas=MAX_RESPUESTAS):
+        self.max_respuestas = max_respuestas
+        self._respuestas = {}
+        self._en_curso = {}
+        self.contadores = {"aciertos": 0, "fallos": 0, "fusionadas": 0}
+
+    async def obtener(self, clave, max_edad, funcion, *args, vigencia=None):
+        """
+        (cuerpo, etag, segundos de vida restantes) de `funcion(*args)`,
+        guardado `max_edad` segundos o, si es menos, `vigencia(*args)`
+        (lo que les queda a los datos tras calcularlos)
+        """
+        guardada = self._respuestas.get(clave)
+        if guardada is not None and guardada[2] > time.time():
+            self.contadores["aciertos"] += 1
+            return guardada[0], guardada[1], guardada[2] - time.time()
+
+        tarea = self._en_curso.get(clave)
+        if tarea is None:
+            self.contadores["fallos"] += 1
+            tarea = self._en_curso[clave] = asyncio.ensure_future(
+                self._calcular(clave, max_edad, vigencia, funcion, *args)
+            )
+            tarea.add_done_callback(lambda _: self._en_curso.pop(clave, None))
+        else:
+            self.contadores["fusionadas"] += 1
+        # Si un cliente se va, la respuesta se sigue calculando para los demás
+        cuerpo, etag, caducidad = await asyncio.shield(tarea)
+        return cuerpo, etag, caducidad - time.time()
+
+    async def _calcular(self, clave, max_edad, vigencia, funcion, *args):
+        bucle = tornado.ioloop.IOLoop.current()
+        valor = await bucle.run_in_executor(None, funcion, *args)
+        if vigencia is not None:
+            max_edad = min(max_edad, await bucle.run_in_executor(None, vigencia, *args))
+
+        cuerpo = json.dumps(valor, ensure_ascii=False).encode("utf-8")
+        # El ETag depende solo del contenido: al caducar y recalcularse (desde
+        # las cachés de Core) la misma respuesta conserva su ETag
+        etag = '"' + hashlib.sha1(cuerpo).hexdigest()[:20] + '"'
+
+        caducidad = time.time() + max_edad
+        self._respuestas.pop(clave, None)
+        self._respuestas[clave] = (cuerpo, etag, caducidad)
+        while len(self._respuestas) > self.max_respuestas:
+            self._respuestas.pop(next(iter(self._respuestas)))
+        return cuerpo, etag, caducidad
+
+    def limpiar(self):
+        self._respuestas.clear()
+
+
+# ===============================
+# SERVIDOR
+# ===============================
+class ManejadorConsulta(tornado.web.RequestHandler):
+    """
+    Base de los endpoints: `consulta` es el nombre en MAX_EDAD y `argumentos()`
+    devuelve los parámetros normalizados, que forman la clave de la respuesta.
+    `vigencia`, si la hay, acota la vida de la respuesta a la de sus datos.
+    """
+
+    consulta = None
+    funcion = None
+    vigencia = None
+
+    def initialize(self, respuestas):
+        self.respuestas = respuestas
+        self._etag = None
+
+    def argumentos(self):
+        raise NotImplementedError
+
+    async def get(self):
+        argumentos = self.argumentos()
+        try:
+            cuerpo, self._etag, restante = await self.respuestas.obtener(
+                (self.consulta, *argumentos), MAX_EDAD[self.consulta],
+                type(self).funcion, *argumentos, vigencia=type(self).vigencia
+            )
+        except Exception as e:
+            raise tornado.web.HTTPError(502, f"Error de Earth Engine: {e}"[:200])
+
+        # Los clientes y proxies, solo lo que le queda a la copia del servidor
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.set_header("Cache-Control", f"public, max-age={max(0, int(restante))}")
+        self.set_header("Access-Control-Allow-Origin", "*")
+        # tornado compara compute_etag() con If-None-Match y responde 304
+        self.write(cuerpo)
+
+    def compute_etag(self):
+        return self._etag
+
+    def write_error(self, status_code, **kwargs):
+        # El detalle va en el cuerpo: la línea de estado solo admite latin-1
+        error = kwargs.get("exc_info", (None, None, None))[1]
+        mensaje = getattr(error, "log_message", None) or self._reason
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps({"error": mensaje}, ensure_ascii=False))
+
+
+class ManejadorEstadisticas(ManejadorConsulta):
+    consulta = "estadisticas"
+    funcion = estadisticas
+
+    def argumentos(self):
+        return (
+            tuple(_indices(self.get_argument("indices", "NDVI"))),
+            tuple(_anios(self.get_argument("anios"))),
+        )
+
+
+class ManejadorSerie(ManejadorConsulta):
+    consulta = "serie"
+    funcion = serie
+
+    def argumentos(self):
+        inicio = _anio(self.get_argument("inicio", str(ANIO_INICIAL)))
+        fin = _anio(self.get_argument("fin", str(ANIO_FINAL)))
+        if inicio > fin:
+            raise tornado.web.HTTPError(400, "inicio posterior a fin")
+        return tuple(_indices(self.get_argument("indices", "NDVI"))), inicio, fin
+
+
+class ManejadorMapas(ManejadorConsulta):
+    consulta = "mapas"
+    funcion = mapas
+    vigencia = vigencia_mapas
+
+    def argumentos(self):
+        return (
+            tuple(_indices(self.get_argument("indices", "NDVI"))),
+            tuple(_anios(self.get_argument("anios"))),
+        )
+
+
+def crear_aplicacion(respuestas=None):
+    respuestas = respuestas or Respuestas()
+    return tornado.web.Application([
+        (r"/api/estadisticas", ManejadorEstadisticas, {"respuestas": respuestas}),
+        (r"/api/serie", ManejadorSerie, {"respuestas": respuestas}),
+        (r"/api/mapas", ManejadorMapas, {"respuestas": respuestas}),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON de estadísticas, series y mapas")
+    parser.add_argument("--puerto", type=int, default=PUERTO_API)
+    args = parser.parse_args()
+
+    from Core.gee_init import asegurar_zona_estudio
+
+    asegurar_zona_estudio()
+    crear_aplicacion().listen(args.puerto)
+    print(f"API en http://0.0.0.0:{args.puerto}/api/...")
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
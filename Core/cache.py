@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from Core import trazas
+
+DIRECTORIO_CACHE = os.getenv("LANDSAT_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "landsat"
+)
+
+TTL_DEFECTO = 30 * 24 * 3600          # 30 días
+MAX_BYTES_DEFECTO = 256 * 1024 * 1024  # 256 MB
+
+
+class CacheResultados:
+    """
+    Almacén persistente de resultados en SQLite, compartido entre procesos.
+    Las entradas caducan tras `ttl` segundos y, cuando el tamaño total supera
+    `max_bytes`, se eliminan las de acceso más antiguo (LRU).
+    """
+
+    def __init__(self, ruta=None, ttl=TTL_DEFECTO, max_bytes=MAX_BYTES_DEFECTO):
+        self.ruta = ruta or os.path.join(DIRECTORIO_CACHE, "resultados.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+
+        con = self._conexion()
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resultados (
+                clave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                accedido REAL NOT NULL
+            )
+            """
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_accedido ON resultados(accedido)"
+        )
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS contadores (
+                nombre TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            )
+            """
+        )
+
+    def _conexion(self):
+        # sqlite3 no permite compartir conexiones entre hilos
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            self._local.con = con
+        return con
+
+    def _contar(self, nombre):
+        self._conexion().execute(
+            """
+            INSERT INTO contadores (nombre, valor) VALUES (?, 1)
+            ON CONFLICT(nombre) DO UPDATE SET valor = valor + 1
+            """,
+            (nombre,)
+        )
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado para `clave`, o None si no existe o caducó"""
+        with trazas.medir("cache", clave.split("|")[0], clave=clave) as traza:
+            con = self._conexion()
+            fila = con.execute(
+                "SELECT valor, creado FROM resultados WHERE clave = ?", (clave,)
+            ).fetchone()
+
+            ahora = time.time()
+            if fila is None or ahora - fila[1] > self.ttl:
+                self._contar("fallos")
+                traza.cache = "fallo"
+                return None
+
+            con.execute(
+                "UPDATE resultados SET accedido = ? WHERE clave = ?", (ahora, clave)
+            )
+            self._contar("aciertos")
+            traza.cache = "acierto"
+            traza.bytes = len(fila[0])
+            return json.loads(fila[0])
+
+    def guardar(self, clave, valor):
+        texto = json.dumps(valor, ensure_ascii=False)
+        ahora = time.time()
+
+        con = self._conexion()
+        con.execute(
+            """
+            INSERT OR REPLACE INTO resultados (clave, valor, tamano, creado, accedido)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (clave, texto, len(texto), ahora, ahora)
+        )
+        self._desalojar()
+
+    def borrar(self, clave):
+        self._conexion().execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+
+    def _desalojar(self):
+        con = self._conexion()
+        con.execute(
+            "DELETE FROM resultados WHERE creado < ?", (time.time() - self.ttl,)
+        )
+
+        total = con.execute(
+            "SELECT COALESCE(SUM(tamano), 0) FROM resultados"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        sobrante = total - self.max_bytes
+        for clave, tamano in con.execute(
+            "SELECT clave, tamano FROM resultados ORDER BY accedido"
+        ).fetchall():
+            con.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+            self._contar("desalojos")
+            sobrante -= tamano
+            if sobrante <= 0:
+                break
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos y ocupación actual del almacén"""
+        con = self._conexion()
+        contadores = dict(con.execute("SELECT nombre, valor FROM contadores"))
+        entradas, total = con.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM resultados"
+        ).fetchone()
+
+        aciertos = contadores.get("aciertos", 0)
+        fallos = contadores.get("fallos", 0)
+        consultas = aciertos + fallos
+
+        return {
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "desalojos": contadores.get("desalojos", 0),
+            "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+            "entradas": entradas,
+            "bytes": total,
+        }
+
+    def limpiar(self):
+        con = self._conexion()
+        con.execute("DELETE FROM resultados")
+        con.execute("DELETE FROM contadores")
+
+
+def clave_cache(*partes):
+    """Construye la clave textual a partir de sus componentes"""
+    return "|".join(str(p) for p in partes)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    """Instancia única del almacén para todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheResultados()
+        return _cache
@@ -0,0 +1,134 @@
+"""
+Detección de cambios entre dos años: diferencia del índice por píxel,
+clasificación en pérdida / estable / ganancia según dos umbrales, y
+hectáreas por clase.
+
+Las hectáreas de las tres clases salen de una sola reducción agrupada
+(pixelArea con un reductor sum().group() sobre la banda de clase), no de
+una petición por clase. Las tablas se guardan en el almacén persistente por
+(índice, par de años, umbrales); las capas, con su plantilla memorizada. Las
+dos claves llevan version_cambio, así que tabla y mapa cambian a la vez.
+"""
+import ee
+import streamlit as st
+
+from Core.cache import clave_cache, obtener_cache
+from Core.datos import ESCALA, NUBOSIDAD_MAX, obtener_indice, sensor
+from Core.gee_init import asegurar_zona_estudio
+from Core.materializado import origen_composicion
+from Core.remoto import get_info
+from Core.zona import huella_zona
+
+# Variación del índice por debajo de la cual un píxel se considera estable
+UMBRAL_PERDIDA = 0.1
+UMBRAL_GANANCIA = 0.1
+
+# Valor de la banda "clase" (el reductor agrupado necesita enteros >= 0)
+CLASES = {0: "Pérdida", 1: "Estable", 2: "Ganancia"}
+
+VIS_DIFERENCIA = {"min": -0.5, "max": 0.5, "palette": ["darkred", "white", "darkgreen"]}
+VIS_CAMBIO = {"min": 0, "max": 2, "palette": ["red", "lightgray", "green"]}
+
+
+def version_cambio(anio_inicial, anio_final):
+    """
+    Lo que decide los píxeles del cambio aparte del índice y los umbrales:
+    origen de las dos composiciones (asset materializado o mediana),
+    umbral de nubes y zona
+    """
+    asegurar_zona_estudio()
+    return (
+        origen_composicion(anio_inicial), origen_composicion(anio_final),
+        NUBOSIDAD_MAX, huella_zona()
+    )
+
+
+def diferencia(indice, anio_inicial, anio_final):
+    """Índice del año final menos el del inicial, por píxel"""
+    return _diferencia(indice, anio_inicial, anio_final, version_cambio(anio_inicial, anio_final))
+
+
+@st.cache_data(show_spinner=False)
+def _diferencia(indice, anio_inicial, anio_final, version):
+    return (
+        obtener_indice(anio_final, indice)
+        .subtract(obtener_indice(anio_inicial, indice))
+        .rename("diferencia")
+        .clip(asegurar_zona_estudio())
+    )
+
+
+def clasificacion(indice, anio_inicial, anio_final,
+                  umbral_perdida=UMBRAL_PERDIDA, umbral_ganancia=UMBRAL_GANANCIA):
+    """
+    Banda "clase" (ver CLASES): pérdida si la diferencia baja de
+    −umbral_perdida, ganancia si supera umbral_ganancia, estable en medio.
+    Los píxeles sin dato en alguno de los dos años quedan enmascarados.
+    """
+    return _clasificacion(
+        indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia,
+        version_cambio(anio_inicial, anio_final)
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _clasificacion(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia, version):
+    dif = diferencia(indice, anio_inicial, anio_final)
+    return (
+        ee.Image.constant(1)
+        .where(dif.lt(-umbral_perdida), 0)
+        .where(dif.gt(umbral_ganancia), 2)
+        .updateMask(dif.mask())
+        .toByte()
+        .rename("clase")
+    )
+
+
+def _clave(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia):
+    # Con el origen de cada composición (asset materializado o mediana): al
+    # publicarse un año, sus áreas de cambio se vuelven a calcular
+    return clave_cache(
+        "cambios", indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia,
+        sensor(anio_inicial), sensor(anio_final), ESCALA,
+        *version_cambio(anio_inicial, anio_final)
+    )
+
+
+def areas_cambio(indice, anio_inicial, anio_final,
+                 umbral_perdida=UMBRAL_PERDIDA, umbral_ganancia=UMBRAL_GANANCIA):
+    """
+    Hectáreas por clase con una reducción agrupada: lista de
+    {"Clase", "Hectáreas", "Porcentaje"} en el orden de CLASES.
+    """
+    cache = obtener_cache()
+    clave = _clave(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia)
+
+    hectareas = cache.obtener(clave)
+    if hectareas is None:
+        clase = clasificacion(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia)
+
+        reduccion = ee.Image.pixelArea().divide(10000).addBands(clase).reduceRegion(
+            reducer=ee.Reducer.sum().group(groupField=1, groupName="clase"),
+            geometry=asegurar_zona_estudio(),
+            scale=ESCALA,
+            maxPixels=1e9
+        )
+        respuesta = get_info(
+            reduccion, "areas_cambio",
+            indice=indice, anios=[anio_inicial, anio_final]
+        )
+
+        # Las clases sin ningún píxel no aparecen en la respuesta
+        por_clase = {int(g["clase"]): g["sum"] for g in respuesta.get("groups", [])}
+        hectareas = [por_clase.get(c, 0.0) for c in CLASES]
+        cache.guardar(clave, hectareas)
+
+    total = sum(hectareas)
+    return [
+        {
+            "Clase": nombre,
+            "Hectáreas": round(ha, 2),
+            "Porcentaje": round(100 * ha / total, 2) if total else None,
+        }
+        for nombre, ha in zip(CLASES.values(), hectareas)
+    ]
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Límite global de peticiones simultáneas a GEE desde este proceso
+MAX_CONCURRENCIA = int(os.getenv("LANDSAT_MAX_CONCURRENCIA", "8"))
+
+# Cálculos de fondo (series completas...). Van en un pool aparte porque a su
+# vez reparten peticiones en el pool de GEE: si compartieran pool, podrían
+# ocupar todos los hilos esperando a tareas que nunca llegan a arrancar
+MAX_SEGUNDO_PLANO = int(os.getenv("LANDSAT_MAX_SEGUNDO_PLANO", "4"))
+
+_ejecutor = None
+_ejecutor_fondo = None
+_ejecutor_lock = threading.Lock()
+_futuros_fondo = weakref.WeakSet()
+
+
+def obtener_ejecutor():
+    """Pool de hilos compartido por todas las sesiones del proceso"""
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENCIA,
+                thread_name_prefix="gee"
+            )
+        return _ejecutor
+
+
+def obtener_ejecutor_fondo():
+    """Pool de los cálculos en segundo plano, compartido por todas las sesiones"""
+    global _ejecutor_fondo
+    with _ejecutor_lock:
+        if _ejecutor_fondo is None:
+            _ejecutor_fondo = ThreadPoolExecutor(
+                max_workers=MAX_SEGUNDO_PLANO,
+                thread_name_prefix="fondo"
+            )
+        return _ejecutor_fondo
+
+
+@dataclass
+class Resultado:
+    nombre: Any
+    valor: Any = None
+    error: Exception = None
+    inicio: float = 0.0
+    duracion: float = 0.0
+
+
+def enviar(nombre, funcion, *args, **kwargs):
+    """
+    Programa `funcion(*args, **kwargs)` en el pool y devuelve un Future
+    que se resuelve con un Resultado (nunca lanza: el error va en el Resultado).
+    """
+    return _programar(obtener_ejecutor(), nombre, funcion, args, kwargs)
+
+
+def _programar(ejecutor, nombre, funcion, args, kwargs):
+    # El contexto de Streamlit permite usar st.cache_data y session_state
+    # desde el hilo de trabajo
+    ctx = get_script_run_ctx()
+
+    def tarea():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+        resultado = Resultado(nombre, inicio=time.perf_counter())
+        try:
+            resultado.valor = funcion(*args, **kwargs)
+        except Exception as e:
+            resultado.error = e
+        resultado.duracion = time.perf_counter() - resultado.inicio
+        return resultado
+
+    return ejecutor.submit(tarea)
+
+
+def en_segundo_plano(clave, funcion, *args, completo=None):
+    """
+    Future (de un Resultado) de `funcion(*args)` en el pool de fondo. Dentro
+    de una sesión se reutiliza entre ejecuciones de la página mientras siga
+    en curso o haya terminado bien. Si terminó con error, o con un valor
+    para el que `completo(valor)` es falso, se entrega una vez (la página
+    muestra el fallo) y se relanza en la siguiente ejecución.
+    """
+    futuros = st.session_state.setdefault("_segundo_plano", {})
+    entregados = st.session_state.setdefault("_segundo_plano_entregados", set())
+
+    futuro = futuros.get(clave)
+    if futuro is None or (
+        futuro.done() and clave in entregados and not _terminado_bien(futuro.result(), completo)
+    ):
+        futuro = _programar(obtener_ejecutor_fondo(), clave, funcion, args, {})
+        futuros[clave] = futuro
+        entregados.discard(clave)
+        _futuros_fondo.add(futuro)
+    elif futuro.done():
+        entregados.add(clave)
+    return futuro
+
+
+def _terminado_bien(resultado, completo):
+    if resultado.error is not None:
+        return False
+    return completo is None or completo(resultado.valor)
+
+
+def esperar_segundo_plano(timeout=None):
+    """Espera a todos los cálculos de fondo del proceso (benchmarks, pruebas)"""
+    wait(list(_futuros_fondo), timeout=timeout)
+
+
+def ejecutar_concurrente(tareas, max_simultaneas=None):
+    """
+    Lanza las `tareas` ({nombre: (funcion, *args)}) y genera cada Resultado
+    en cuanto termina, en orden de llegada. Con `max_simultaneas`, como mucho
+    esas tareas a la vez: cada una que termina deja paso a la siguiente.
+    """
+    pendientes = iter(tareas.items())
+    limite = max_simultaneas or len(tareas)
+
+    def siguiente():
+        nombre, (funcion, *args) = next(pendientes)
+        return enviar(nombre, funcion, *args)
+
+    en_curso = set()
+    for _ in range(limite):
+        try:
+            en_curso.add(siguiente())
+        except StopIteration:
+            break
+
+    while en_curso:
+        terminados, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            try:
+                en_curso.add(siguiente())
+            except StopIteration:
+                pass
+            yield futuro.result()
+
+
+def resumen_tiempos(resultados, tiempo_total):
+    """Filas con la duración de cada petición, más el total y la suma"""
+    filas = [
+        {"Petición": str(r.nombre), "Duración (s)": round(r.duracion, 3), "Error": bool(r.error)}
+        for r in sorted(resultados, key=lambda r: -r.duracion)
+    ]
+    filas.append({
+        "Petición": "Suma de peticiones",
+        "Duración (s)": round(sum(r.duracion for r in resultados), 3),
+        "Error": False
+    })
+    filas.append({
+        "Petición": "Tiempo real (pared)",
+        "Duración (s)": round(tiempo_total, 3),
+        "Error": False
+    })
+    return filas
@@ -1,29 +1,119 @@
+import datetime
+import os
 import ee
+import numpy as np
+import pandas as pd
 import streamlit as st
-from Core.gee_init import zona_estudio
-from Core.indices import INDICES
+from Core.cache import clave_cache, obtener_cache
+from Core.concurrencia import ejecutar_concurrente
+from Core.gee_init import asegurar_zona_estudio
+from Core.indices import (
+    INDICES, INTERVALOS_HISTOGRAMA, NOMBRES_INDICES, PERCENTILES, RANGOS_HISTOGRAMA, imagen_indices
+)
+from Core.materializado import origen_composicion
+from Core.remoto import get_info
+from Core.zona import caja_zona_estudio, huella_zona, zona_para_escala
+
+NUBOSIDAD_MAX = 20
+ESCALA = 30
+
+# Con el modo multiíndice, el primer cálculo de un año reduce los 7 índices
+# a la vez y deja en caché las estadísticas de todos ellos
+MODO_MULTI_INDICE = True
+
+# Con el motor local, las bandas de cada año se descargan una vez y las
+# estadísticas se calculan con NumPy (ver Core/local.py)
+MODO_LOCAL = os.getenv("LANDSAT_MOTOR_LOCAL") == "1"
+
+# Con el modo progresivo, las páginas muestran primero una estimación
+# provisional (reducción a escala gruesa con bestEffort, que llega mucho
+# antes) y la sustituyen por el resultado exacto a ESCALA cuando termina
+MODO_PROGRESIVO = True
+ESCALA_APROXIMADA = 300
+
+# Comparaciones estimación/exacta necesarias para dar una cota de error, y
+# cuántas se conservan por índice
+MIN_COMPARACIONES = 8
+MAX_COMPARACIONES = 200
+
+# Años por petición al completar una serie: por debajo de los límites de
+# cómputo de una sola llamada a GEE
+TAMANO_LOTE_SERIE = 13
+
+# Lo mismo para series estacionales o mensuales (312 meses en 2000–2025),
+# con un tope de lotes simultáneos para no acaparar el pool compartido
+TAMANO_LOTE_PERIODOS = 24
+MAX_LOTES_SIMULTANEOS = 4
+
+GRANULARIDADES = ["anual", "estacional", "mensual"]
+
+# Estaciones meteorológicas del hemisferio sur; la de verano (DJF) empieza
+# en diciembre del año anterior
+ESTACIONES = [("1 DJF", -1), ("2 MAM", 2), ("3 JJA", 5), ("4 SON", 8)]
+
+SENSORES = {
+    "LE07": ("LANDSAT/LE07/C02/T1_L2", ["SR_B1","SR_B2","SR_B3","SR_B4","SR_B5","SR_B7"]),
+    "LC08": ("LANDSAT/LC08/C02/T1_L2", ["SR_B2","SR_B3","SR_B4","SR_B5","SR_B6","SR_B7"]),
+}
+
+BANDAS = ["BLUE","GREEN","RED","NIR","SWIR1","SWIR2"]
+
+
+def sensor(anio):
+    return "LE07" if anio <= 2011 else "LC08"
+
+
+def _clave(tipo, indice, anio, escala=ESCALA):
+    """
+    Clave del almacén persistente:
+    (tipo, índice, año, huella ROI, umbral de nubes, sensor, escala)
+    """
+    asegurar_zona_estudio()
+    return clave_cache(
+        tipo,
+        indice,
+        anio,
+        huella_zona(),
+        NUBOSIDAD_MAX,
+        sensor(anio),
+        escala
+    )
+
+
+def _imagen_anual(anio, origen):
+    """
+    Seis bandas del año sin recortar: el asset materializado `origen` o, si
+    es None, la mediana de las escenas del año
+    """
+    if origen:
+        return ee.Image(origen).select(BANDAS)
+    return composicion_periodo(f"{anio}-01-01", f"{anio}-12-31", anio)[1]
+
+
+def composicion_anual(anio):
+    """
+    Mediana anual con las seis bandas renombradas, recortada a la zona.
+    Parte de la composición materializada si hay una al día (ver
+    Core/materializado.py).
+    """
+    asegurar_zona_estudio()
+    return _composicion_anual(anio, origen_composicion(anio))
 
 
 @st.cache_data(show_spinner=False)
+def _composicion_anual(anio, origen):
+    return _imagen_anual(anio, origen).clip(asegurar_zona_estudio())
+
+
 def obtener_indice(anio, indice):
+    asegurar_zona_estudio()
+    return _obtener_indice(anio, indice, origen_composicion(anio))
 
-    if anio <= 2011:
-        coleccion = ee.ImageCollection("LANDSAT/LE07/C02/T1_L2")
-        bandas_origen = ["SR_B1","SR_B2","SR_B3","SR_B4","SR_B5","SR_B7"]
-    else:
-        coleccion = ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-        bandas_origen = ["SR_B2","SR_B3","SR_B4","SR_B5","SR_B6","SR_B7"]
-
-    imagen = (
-        coleccion
-        .filterDate(f"{anio}-01-01", f"{anio}-12-31")
-        .filterBounds(zona_estudio)
-        .filter(ee.Filter.lt("CLOUD_COVER", 20))
-        .median()
-        .select(bandas_origen)
-        .rename(["BLUE","GREEN","RED","NIR","SWIR1","SWIR2"])
-        .clip(zona_estudio)
-    )
+
+@st.cache_data(show_spinner=False)
+def _obtener_indice(anio, indice, origen):
+
+    imagen = _composicion_anual(anio, origen)
 
     # 👉 aquí ya están GARANTIZADAS todas las bandas
     img_indice = INDICES[indice](imagen).rename(indice)
@@ -31,61 +121,716 @@ def obtener_indice(anio, indice):
     return img_indice
 
 
+@st.cache_data(show_spinner=False, ttl=300)
+def tabla_precalculada():
+    """
+    {(índice, año): estadísticas} de la tabla de Core/precalculo.py, solo
+    con las filas calculadas para la zona y parámetros actuales. Las filas
+    con rango de histograma traen también la distribución; las de ficheros
+    escritos antes de guardarla, solo mean/min/max.
+    """
+    from Core.precalculo import COLUMNAS_PERCENTILES, configuracion_actual, leer_tabla
+
+    tabla = leer_tabla(configuracion=configuracion_actual())
+
+    def valor(v):
+        return None if pd.isna(v) else float(v)
+
+    def estadisticas(fila):
+        stats = {
+            f"{fila['indice']}_{s}": valor(fila.get(s))
+            for s in ["mean", "min", "max"]
+        }
+        rango = fila.get("rango_histograma")
+        if isinstance(rango, (list, np.ndarray)):
+            histograma = fila.get("histograma")
+            stats.update({f"{fila['indice']}_{c}": valor(fila.get(c)) for c in COLUMNAS_PERCENTILES})
+            # Sin histograma el año no tiene píxeles: su distribución también se conoce (vacía)
+            stats[f"{fila['indice']}_histogram"] = (
+                [int(conteo) for conteo in histograma]
+                if isinstance(histograma, (list, np.ndarray)) else None
+            )
+            stats[f"{fila['indice']}_histogram_rango"] = [float(v) for v in rango]
+        return stats
+
+    return {
+        (fila["indice"], int(fila["anio"])): estadisticas(fila)
+        for fila in tabla.to_dict("records")
+    }
+
+
+def _buscar_estadisticas(indice, anio):
+    """Primero la tabla precalculada, después el almacén persistente"""
+    stats = tabla_precalculada().get((indice, anio))
+    if stats is not None:
+        return stats
+    return obtener_cache().obtener(_clave("estadisticas", indice, anio))
+
+
+def _buscar_distribucion(indice, anio):
+    """
+    Estadísticas con histograma y percentiles, de la tabla precalculada o
+    del almacén persistente. Las filas y entradas guardadas sin ellos, o
+    con un histograma de otro rango (RANGOS_HISTOGRAMA), no sirven: None.
+    """
+    rango = list(RANGOS_HISTOGRAMA[indice])
+    for stats in (
+        tabla_precalculada().get((indice, anio)),
+        obtener_cache().obtener(_clave("estadisticas", indice, anio)),
+    ):
+        if stats is not None and stats.get(f"{indice}_histogram_rango") == rango:
+            return stats
+    return None
+
+
+def composicion_servidor(anio, zona_estudio):
+    """
+    Versión de composicion_anual con el año como ee.Number, para usarla
+    dentro de ee.List.map. Devuelve también la colección filtrada para
+    poder comprobar si el año tiene escenas.
+    """
+    anio = ee.Number(anio)
+
+    coleccion = ee.ImageCollection(
+        ee.Algorithms.If(
+            anio.lte(2011),
+            ee.ImageCollection(SENSORES["LE07"][0]),
+            ee.ImageCollection(SENSORES["LC08"][0])
+        )
+    ).filterDate(
+        ee.Date.fromYMD(anio, 1, 1),
+        ee.Date.fromYMD(anio, 12, 31)
+    ).filterBounds(caja_zona_estudio()).filter(
+        ee.Filter.lt("CLOUD_COVER", NUBOSIDAD_MAX)
+    )
+
+    bandas = ee.List(
+        ee.Algorithms.If(
+            anio.lte(2011),
+            SENSORES["LE07"][1],
+            SENSORES["LC08"][1]
+        )
+    )
+
+    return coleccion, coleccion.median().select(bandas).rename(BANDAS)
+
+
+def periodos(granularidad, inicio=2000, fin=2025):
+    """
+    Periodos de composición entre los años `inicio` y `fin`, como dicts con
+    "periodo" (etiqueta ordenable), "anio", "inicio" y "fin" (fin exclusivo).
+    """
+    def fecha(anio, mes):
+        # mes puede salirse de 1..12 (diciembre del año anterior, etc.)
+        anio, mes = anio + (mes - 1) // 12, (mes - 1) % 12 + 1
+        return datetime.date(anio, mes, 1).isoformat()
+
+    resultado = []
+    for anio in range(inicio, fin + 1):
+        if granularidad == "anual":
+            tramos = [(str(anio), 1, 12)]
+        elif granularidad == "estacional":
+            tramos = [(f"{anio}-{nombre}", mes + 1, 3) for nombre, mes in ESTACIONES]
+        elif granularidad == "mensual":
+            tramos = [(f"{anio}-{mes:02d}", mes, 1) for mes in range(1, 13)]
+        else:
+            raise ValueError(f"Granularidad desconocida: {granularidad}")
+
+        for etiqueta, mes, meses in tramos:
+            resultado.append({
+                "periodo": etiqueta,
+                "granularidad": granularidad,
+                "anio": anio,
+                "inicio": fecha(anio, mes),
+                "fin": fecha(anio, mes + meses),
+            })
+    return resultado
+
+
+def composicion_periodo(inicio, fin, anio):
+    """
+    Mediana de las escenas entre las fechas `inicio` y `fin` (exclusivo),
+    con el sensor del año `anio`. Devuelve también la colección filtrada.
+    """
+    coleccion_id, bandas_origen = SENSORES[sensor(anio)]
+    coleccion = (
+        ee.ImageCollection(coleccion_id)
+        .filterDate(inicio, fin)
+        .filterBounds(caja_zona_estudio())
+        .filter(ee.Filter.lt("CLOUD_COVER", NUBOSIDAD_MAX))
+    )
+    return coleccion, coleccion.median().select(bandas_origen).rename(BANDAS)
+
+
+def _clave_periodo(indice, periodo):
+    asegurar_zona_estudio()
+    return clave_cache(
+        f"estadisticas_{periodo['granularidad']}",
+        indice,
+        periodo["periodo"],
+        huella_zona(),
+        NUBOSIDAD_MAX,
+        sensor(periodo["anio"]),
+        ESCALA
+    )
+
+
+def _reductor_estadisticas(percentiles=PERCENTILES):
+    """mean/min/max y, en la misma pasada sobre los píxeles, percentiles"""
+    reductor = (
+        ee.Reducer.mean()
+        .combine(ee.Reducer.min(), "", True)
+        .combine(ee.Reducer.max(), "", True)
+    )
+    if percentiles:
+        reductor = reductor.combine(ee.Reducer.percentile(list(percentiles)), "", True)
+    return reductor
+
+
+def _bandas_histograma(imagen, nombres):
+    """
+    Cada índice recortado a su RANGOS_HISTOGRAMA y llevado a [0, 1), como
+    banda "<índice>_histogram": un solo fixedHistogram sirve para todos, y
+    los valores fuera del rango caen en los intervalos de los extremos en
+    lugar de perderse
+    """
+    return ee.Image.cat([
+        imagen.select(nombre)
+        .clamp(*RANGOS_HISTOGRAMA[nombre])
+        .unitScale(*RANGOS_HISTOGRAMA[nombre])
+        .min(1 - 1e-6)
+        .rename(f"{nombre}_histogram")
+        for nombre in nombres
+    ])
+
+
+def _reducir_estadisticas(imagen, nombres, **argumentos):
+    """
+    Diccionario con las estadísticas (_reductor_estadisticas) y el
+    histograma de cada banda-índice de `imagen`. Son dos reducciones en
+    una sola petición: la composición se calcula una vez para las dos.
+    """
+    stats = imagen.reduceRegion(reducer=_reductor_estadisticas(), **argumentos)
+    histogramas = _bandas_histograma(imagen, nombres).reduceRegion(
+        reducer=ee.Reducer.fixedHistogram(0, 1, INTERVALOS_HISTOGRAMA), **argumentos
+    )
+    return ee.Dictionary(stats).combine(histogramas)
+
+
+def _claves_esperadas(indice, percentiles=PERCENTILES, histograma=True):
+    sufijos = ["mean", "min", "max"] + [f"p{p}" for p in (percentiles or [])]
+    if histograma:
+        sufijos.append("histogram")
+    return [f"{indice}_{s}" for s in sufijos]
+
+
+def _leer_estadisticas(indice, valores):
+    """
+    Estadísticas de `indice` en una respuesta de GEE. El histograma llega
+    como [[mínimo del intervalo, píxeles], ...]; se guardan solo los
+    conteos y, aparte, el rango del índice con el que se calcularon.
+    """
+    stats = {k: valores.get(k) for k in _claves_esperadas(indice)}
+    histograma = stats[f"{indice}_histogram"]
+    if histograma:
+        stats[f"{indice}_histogram"] = [int(conteo) for _, conteo in histograma]
+    stats[f"{indice}_histogram_rango"] = list(RANGOS_HISTOGRAMA[indice])
+    return stats
+
+
+def estadisticas_todos_indices(anio, recalcular=False):
+    """
+    Reduce una sola imagen con los 7 índices del año y devuelve
+    {índice: estadísticas}, distribución incluida. Deja en caché el
+    resultado de cada índice. Con `recalcular` no se mira la caché: sus
+    entradas del año se descartan y se sustituyen por las nuevas.
+    """
+
+    cache = obtener_cache()
+    claves = {i: _clave("estadisticas", i, anio) for i in NOMBRES_INDICES}
+
+    if recalcular:
+        # Si la reducción falla, nadie debe volver a leer los valores viejos
+        for clave in claves.values():
+            cache.borrar(clave)
+    else:
+        resultado = {}
+        for indice in NOMBRES_INDICES:
+            stats = _buscar_distribucion(indice, anio)
+            if stats is None:
+                break
+            resultado[indice] = stats
+        else:
+            return resultado
+
+    img = imagen_indices(composicion_anual(anio), NOMBRES_INDICES)
+
+    reduccion = _reducir_estadisticas(
+        img, NOMBRES_INDICES,
+        geometry=asegurar_zona_estudio(),
+        scale=ESCALA,
+        maxPixels=1e9
+    )
+    respuesta = get_info(reduccion, "estadisticas_todos_indices", anio=anio)
+
+    # Índices sin píxeles válidos vuelven sin claves: quedan en None
+    resultado = {}
+    for indice in NOMBRES_INDICES:
+        resultado[indice] = _leer_estadisticas(indice, respuesta)
+        cache.guardar(claves[indice], resultado[indice])
+
+    return resultado
+
+
 @st.cache_data(show_spinner=False)
 def estadisticas_indice(anio, indice):
 
+    stats = _buscar_estadisticas(indice, anio)
+    if stats is not None:
+        return stats
+
+    if MODO_LOCAL:
+        from Core.local import motor_local
+        return motor_local().estadisticas_todos(anio)[indice]
+
+    if MODO_MULTI_INDICE:
+        return estadisticas_todos_indices(anio)[indice]
+
     img = obtener_indice(anio, indice)
 
-    stats = img.reduceRegion(
-        reducer=ee.Reducer.mean()
-            .combine(ee.Reducer.min(), "", True)
-            .combine(ee.Reducer.max(), "", True),
-        geometry=zona_estudio,
-        scale=30,
+    reduccion = _reducir_estadisticas(
+        img, [indice],
+        geometry=asegurar_zona_estudio(),
+        scale=ESCALA,
         maxPixels=1e9
     )
+    stats = _leer_estadisticas(
+        indice, get_info(reduccion, "estadisticas_indice", anio=anio, indice=indice)
+    )
 
-    return stats.getInfo()
+    obtener_cache().guardar(_clave("estadisticas", indice, anio), stats)
+    return stats
 
 
-@st.cache_data(show_spinner=False)
-def serie_temporal(indice, inicio=2000, fin=2025):
+def estadisticas_en_cache(anio, indice):
+    """Estadísticas exactas ya calculadas (tabla o almacén), o None; sin llamar a GEE"""
+    return _buscar_estadisticas(indice, anio)
+
+
+def estadisticas_aproximadas(anio):
+    """
+    Estimación rápida de los 7 índices del año a ESCALA_APROXIMADA, con la
+    zona simplificada y bestEffort. Además de mean/min/max trae stdDev y
+    count (ver intervalo_muestreo). Se guarda en el almacén con su propia
+    escala, aparte de las exactas.
+    """
+
+    cache = obtener_cache()
+    claves = {i: _clave("estadisticas", i, anio, ESCALA_APROXIMADA) for i in NOMBRES_INDICES}
+
+    guardadas = {i: cache.obtener(c) for i, c in claves.items()}
+    if all(v is not None for v in guardadas.values()):
+        return guardadas
+
+    reductor = _reductor_estadisticas(None).combine(
+        ee.Reducer.stdDev(), "", True
+    ).combine(ee.Reducer.count(), "", True)
+
+    reduccion = imagen_indices(composicion_anual(anio), NOMBRES_INDICES).reduceRegion(
+        reducer=reductor,
+        geometry=zona_para_escala(ESCALA_APROXIMADA),
+        scale=ESCALA_APROXIMADA,
+        bestEffort=True,
+        maxPixels=1e7
+    )
+    respuesta = get_info(reduccion, "estadisticas_aproximadas", anio=anio)
+
+    resultado = {}
+    for indice in NOMBRES_INDICES:
+        sufijos = ["mean", "min", "max", "stdDev", "count"]
+        resultado[indice] = {f"{indice}_{s}": respuesta.get(f"{indice}_{s}") for s in sufijos}
+        cache.guardar(claves[indice], resultado[indice])
+
+    return resultado
+
+
+def intervalo_muestreo(stats, indice):
+    """
+    Semiamplitud del intervalo al 95 % de la media de los píxeles gruesos
+    como muestra (1.96·σ/√n). Mide solo el ruido de muestreo: no acota la
+    diferencia con el valor a 30 m ni dice nada de mínimo y máximo. None si
+    faltan datos.
+    """
+    desviacion = stats.get(f"{indice}_stdDev")
+    n = stats.get(f"{indice}_count")
+    if desviacion is None or not n:
+        return None
+    return 1.96 * desviacion / n ** 0.5
+
+
+def diferencias(aproximadas, exactas, indice):
+    """Error observado de la estimación: |exacta − aproximada| por estadístico"""
+    resultado = {}
+    for s in ("mean", "min", "max"):
+        a = aproximadas.get(f"{indice}_{s}")
+        e = exactas.get(f"{indice}_{s}")
+        resultado[s] = abs(e - a) if a is not None and e is not None else None
+    return resultado
+
+
+def _clave_comparaciones(indice):
+    asegurar_zona_estudio()
+    return clave_cache(
+        "comparaciones_aproximadas", indice, huella_zona(), NUBOSIDAD_MAX, ESCALA_APROXIMADA
+    )
+
+
+def registrar_diferencias(aproximadas, exactas, indice):
+    """
+    diferencias(), anotadas en el almacén para calibrar cota_error con las
+    MAX_COMPARACIONES más recientes
+    """
+    error = diferencias(aproximadas, exactas, indice)
+    if all(v is None for v in error.values()):
+        return error
+
+    cache = obtener_cache()
+    clave = _clave_comparaciones(indice)
+    comparaciones = (cache.obtener(clave) or []) + [error]
+    cache.guardar(clave, comparaciones[-MAX_COMPARACIONES:])
+    return error
+
+
+def cota_error(indice):
+    """
+    Cota empírica del error de la estimación gruesa frente a la de 30 m:
+    por estadístico (mean/min/max), el percentil 95 de |exacta − aproximada|
+    en las comparaciones anotadas. None mientras haya menos de
+    MIN_COMPARACIONES. Incluye "comparaciones" (cuántas hay).
+    """
+    comparaciones = obtener_cache().obtener(_clave_comparaciones(indice)) or []
+    cotas = {"comparaciones": len(comparaciones)}
+    for s in ("mean", "min", "max"):
+        errores = sorted(c[s] for c in comparaciones if c.get(s) is not None)
+        if len(errores) < MIN_COMPARACIONES:
+            cotas[s] = None
+        else:
+            cotas[s] = errores[min(int(0.95 * len(errores)), len(errores) - 1)]
+    return cotas
+
+
+def estadisticas_anios(anios, indice, distribucion=False):
+    """
+    Estadísticas de `indice` para varios años con una sola petición a GEE.
+    Solo se calculan los años que no están en caché; con el modo multiíndice
+    se guardan además las de los demás índices. Con `distribucion`, solo
+    valen las guardadas con histograma y percentiles (las de la tabla
+    precalculada se vuelven a pedir). Devuelve {año: estadísticas}.
+    """
+
+    if MODO_LOCAL:
+        if distribucion:
+            from Core.local import motor_local
+            return {anio: motor_local().estadisticas_todos(anio)[indice] for anio in anios}
+        return {anio: estadisticas_indice(anio, indice) for anio in anios}
+
+    cache = obtener_cache()
+    nombres = NOMBRES_INDICES if MODO_MULTI_INDICE else [indice]
+    buscar = _buscar_distribucion if distribucion else _buscar_estadisticas
+
+    resultado = {}
+    faltantes = []
+    for anio in dict.fromkeys(anios):
+        stats = buscar(indice, anio)
+        if stats is None:
+            faltantes.append(anio)
+        else:
+            resultado[anio] = stats
+
+    if not faltantes:
+        return resultado
+
+    zona_estudio = asegurar_zona_estudio()
+
+    def calcular(anio):
+        origen = origen_composicion(anio)
+        img = _imagen_anual(anio, origen)
+
+        stats = _reducir_estadisticas(
+            imagen_indices(img, nombres), nombres,
+            geometry=zona_estudio,
+            scale=ESCALA,
+            maxPixels=1e9
+        )
+
+        # Solo se materializan años con escenas; los demás se comprueban
+        if not origen:
+            coleccion = composicion_periodo(f"{anio}-01-01", f"{anio}-12-31", anio)[0]
+            stats = ee.Algorithms.If(coleccion.size().gt(0), stats, {})
+
+        return ee.Feature(None, ee.Dictionary(stats).set("Año", anio))
+
+    # Años literales en el cliente: cada uno apunta a su composición
+    # materializada o a su propia mediana
+    fc = ee.FeatureCollection([calcular(anio) for anio in faltantes])
+
+    datos = get_info(fc, "estadisticas_anios", anios=faltantes, indice=indice)
+
+    for f in datos["features"]:
+        props = f["properties"]
+        anio = int(props["Año"])
+
+        for nombre in nombres:
+            stats = _leer_estadisticas(nombre, props)
+            cache.guardar(_clave("estadisticas", nombre, anio), stats)
+            if nombre == indice:
+                resultado[anio] = stats
+
+    return resultado
 
-    def calcular_valor(anio):
-        img = obtener_indice(anio, indice)
 
-        reduccion = img.reduceRegion(
-            reducer=ee.Reducer.mean(),
+def estadisticas_periodos(lista, indice):
+    """
+    Estadísticas de `indice` para una lista de periodos (ver periodos()) con
+    una sola petición a GEE. Como estadisticas_anios: solo los que faltan,
+    y con el modo multiíndice se guardan todos los índices.
+    Devuelve {etiqueta: estadísticas}.
+    """
+
+    cache = obtener_cache()
+    nombres = NOMBRES_INDICES if MODO_MULTI_INDICE else [indice]
+
+    resultado = {}
+    faltantes = []
+    for periodo in lista:
+        stats = cache.obtener(_clave_periodo(indice, periodo))
+        if stats is None:
+            faltantes.append(periodo)
+        else:
+            resultado[periodo["periodo"]] = stats
+
+    if not faltantes:
+        return resultado
+
+    zona_estudio = asegurar_zona_estudio()
+
+    def calcular(periodo):
+        coleccion, img = composicion_periodo(periodo["inicio"], periodo["fin"], periodo["anio"])
+
+        stats = _reducir_estadisticas(
+            imagen_indices(img, nombres), nombres,
             geometry=zona_estudio,
-            scale=30,
+            scale=ESCALA,
             maxPixels=1e9
         )
 
         return ee.Feature(
             None,
+            ee.Dictionary(
+                ee.Algorithms.If(coleccion.size().gt(0), stats, {})
+            ).set("Periodo", periodo["periodo"])
+        )
+
+    # Los periodos se conocen en el cliente: cada uno lleva sus fechas y su
+    # sensor literales, sin ee.Algorithms.If para elegir colección
+    fc = ee.FeatureCollection([calcular(p) for p in faltantes])
+
+    datos = get_info(
+        fc, "estadisticas_periodos",
+        periodos=[faltantes[0]["periodo"], faltantes[-1]["periodo"]], indice=indice
+    )
+
+    por_etiqueta = {p["periodo"]: p for p in faltantes}
+    for f in datos["features"]:
+        props = f["properties"]
+        periodo = por_etiqueta[props["Periodo"]]
+
+        for nombre in nombres:
+            stats = _leer_estadisticas(nombre, props)
+            cache.guardar(_clave_periodo(nombre, periodo), stats)
+            if nombre == indice:
+                resultado[periodo["periodo"]] = stats
+
+    return resultado
+
+
+def _estadisticas_lote_anual(lote, indice):
+    """estadisticas_anios para periodos anuales, con la etiqueta como clave"""
+    anios = [p["anio"] for p in lote]
+    return {str(anio): stats for anio, stats in estadisticas_anios(anios, indice).items()}
+
+
+def serie_periodos(indice, granularidad="anual", inicio=2000, fin=2025):
+    """
+    Serie de la media del índice con la granularidad dada, como generador:
+    entrega (serie, fallidos) primero con lo que ya está en caché y otra vez
+    cada vez que termina un lote. La serie va completa, con None en lo aún
+    pendiente o sin escenas.
+
+    Los periodos que faltan se piden a GEE en lotes de tamaño acotado
+    (TAMANO_LOTE_SERIE años o TAMANO_LOTE_PERIODOS periodos), como mucho
+    MAX_LOTES_SIMULTANEOS a la vez; si un lote falla, sus periodos quedan
+    en None, sus etiquetas pasan a `fallidos` y los demás se conservan.
+    """
+
+    lista = periodos(granularidad, inicio, fin)
+
+    if granularidad == "anual":
+        def buscar(periodo):
+            return _buscar_estadisticas(indice, periodo["anio"])
+
+        calcular, tamano = _estadisticas_lote_anual, TAMANO_LOTE_SERIE
+    else:
+        cache = obtener_cache()
+
+        def buscar(periodo):
+            return cache.obtener(_clave_periodo(indice, periodo))
+
+        calcular, tamano = estadisticas_periodos, TAMANO_LOTE_PERIODOS
+
+    stats = {}
+    faltantes = []
+    for periodo in lista:
+        encontrado = buscar(periodo)
+        if encontrado is None:
+            faltantes.append(periodo)
+        else:
+            stats[periodo["periodo"]] = encontrado
+
+    def serie():
+        return [
             {
-                "Año": anio,
-                "Valor": ee.Algorithms.If(
-                    reduccion.contains(indice),
-                    reduccion.get(indice),
-                    None
-                )
+                "Periodo": p["periodo"],
+                "Año": p["anio"],
+                "Valor": stats[p["periodo"]].get(f"{indice}_mean") if p["periodo"] in stats else None
             }
-        )
+            for p in lista
+        ]
+
+    fallidos = []
+    yield serie(), fallidos
+
+    lotes = [faltantes[i:i + tamano] for i in range(0, len(faltantes), tamano)]
+    tareas = {
+        tuple(p["periodo"] for p in lote): (calcular, lote, indice)
+        for lote in lotes
+    }
+    for resultado in ejecutar_concurrente(tareas, MAX_LOTES_SIMULTANEOS):
+        # El error ya queda registrado en las trazas de get_info
+        if resultado.error is None:
+            stats.update(resultado.valor)
+        else:
+            fallidos = sorted(fallidos + list(resultado.nombre))
+        yield serie(), fallidos
+
+
+def serie_temporal(indice, inicio=2000, fin=2025):
+    """
+    Serie anual de la media del índice, montada año a año desde la tabla
+    precalculada y el almacén persistente; solo se piden a GEE los años que
+    faltan (ver serie_periodos). Devuelve (serie, fallidos): los años de los
+    lotes que fallaron quedan en None como los que no tienen escenas.
+    """
+    for serie, fallidos in serie_periodos(indice, "anual", inicio, fin):
+        pass
+    return serie, fallidos
 
-    fc = ee.FeatureCollection(
-        ee.List.sequence(inicio, fin).map(calcular_valor)
+
+def version_serie(inicio=2000, fin=2025):
+    """
+    Lo que decide la serie aparte del índice: origen de la composición de
+    cada año, umbral de nubes y zona
+    """
+    asegurar_zona_estudio()
+    return (
+        tuple(origen_composicion(anio) for anio in range(inicio, fin + 1)),
+        NUBOSIDAD_MAX, huella_zona()
     )
 
-    datos = fc.getInfo()
 
-    return [
-        {
-            "Año": int(f["properties"]["Año"]),
-            "Valor": f["properties"].get("Valor")
+def fusionar_histogramas(histogramas):
+    """Suma de histogramas del mismo rango (listas de conteos); None se ignora"""
+    validos = [h for h in histogramas if h]
+    if not validos:
+        return None
+    return [sum(conteos) for conteos in zip(*validos)]
+
+
+def cuantiles_histograma(conteos, cuantiles, rango):
+    """
+    Cuantiles (en %) de un histograma de intervalos iguales en `rango`
+    (mínimo, máximo), interpolando dentro del intervalo. El error es como
+    mucho el ancho de un intervalo; los cuantiles de píxeles recortados a
+    los extremos del rango se quedan en el extremo.
+    """
+    minimo, maximo = rango
+    ancho = (maximo - minimo) / len(conteos)
+    total = sum(conteos)
+
+    resultado = {}
+    for q in cuantiles:
+        objetivo = total * q / 100
+        acumulado = 0
+        for i, conteo in enumerate(conteos):
+            if conteo and acumulado + conteo >= objetivo:
+                resultado[q] = minimo + ancho * (i + (objetivo - acumulado) / conteo)
+                break
+            acumulado += conteo
+        else:
+            resultado[q] = maximo
+    return resultado
+
+
+def distribucion_periodos(indice, grupos):
+    """
+    Distribución de los píxeles del índice en cada grupo de años
+    ({nombre: (primer año, último año)}), a partir de los histogramas
+    anuales: {nombre: {"p5"..."p95", "pixeles", "anios"}}, o None si el
+    grupo no tiene ningún año con datos. Los histogramas ya guardados (en
+    la tabla precalculada o en el almacén) se reutilizan; los que falten se
+    piden en lotes de TAMANO_LOTE_SERIE años, como en serie_periodos.
+    """
+    anios = sorted({a for inicio, fin in grupos.values() for a in range(inicio, fin + 1)})
+
+    stats = {}
+    faltantes = []
+    for anio in anios:
+        encontrado = _buscar_distribucion(indice, anio)
+        if encontrado is None:
+            faltantes.append(anio)
+        else:
+            stats[anio] = encontrado
+
+    lotes = [faltantes[i:i + TAMANO_LOTE_SERIE] for i in range(0, len(faltantes), TAMANO_LOTE_SERIE)]
+    tareas = {tuple(lote): (estadisticas_anios, lote, indice, True) for lote in lotes}
+    errores = []
+    for resultado in ejecutar_concurrente(tareas, MAX_LOTES_SIMULTANEOS):
+        if resultado.error is None:
+            stats.update(resultado.valor)
+        else:
+            errores.append(resultado.error)
+    # Con un lote de menos los percentiles saldrían sesgados; los demás
+    # lotes ya quedan en el almacén para el siguiente intento
+    if errores:
+        raise errores[0]
+
+    resultado = {}
+    for nombre, (inicio, fin) in grupos.items():
+        histogramas = [
+            stats[a].get(f"{indice}_histogram") for a in range(inicio, fin + 1) if a in stats
+        ]
+        conteos = fusionar_histogramas(histogramas)
+        if conteos is None:
+            resultado[nombre] = None
+            continue
+
+        cuantiles = cuantiles_histograma(conteos, PERCENTILES, RANGOS_HISTOGRAMA[indice])
+        resultado[nombre] = {
+            **{f"p{q}": v for q, v in cuantiles.items()},
+            "pixeles": sum(conteos),
+            "anios": sum(1 for h in histogramas if h),
         }
-        for f in datos["features"]
-    ]
+    return resultado
 
 
 def grafico_rango_anios(serie, anios_sel, titulo):
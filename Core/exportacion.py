@@ -0,0 +1,495 @@
+"""
+Exportación de rásteres de índice a ficheros locales.
+
+Una petición de píxeles de toda la cuenca a 30 m supera los límites de GEE
+por petición, así que la zona se divide en una malla de teselas de
+TESELA_EXPORTACION píxeles que se descargan en paralelo (como mucho
+MAX_TESELAS_SIMULTANEAS en memoria a la vez) y se escriben en un array
+memmap en disco. Un manifiesto JSON anota las teselas ya escritas: si la
+exportación se interrumpe, al relanzarla solo se piden las que faltan.
+
+Al terminar se generan vistas generales (cada nivel, la mitad de
+resolución del anterior) y el resultado se entrega como GeoTIFF en teselas
+(EPSG:32719, float32, deflate, NaN fuera de la zona) con las vistas
+generales dentro, escrito tesela a tesela en el mismo directorio: nunca
+hay un nivel entero en memoria.
+
+Un cerrojo de fichero por directorio serializa las exportaciones del mismo
+ráster, ya vengan de varias sesiones o de la línea de comandos.
+
+Uso (desde la raíz del repositorio):
+    python -m Core.exportacion --indice NDVI --anio 2023
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import struct
+import warnings
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from Core.cache import DIRECTORIO_CACHE
+from Core.concurrencia import ejecutar_concurrente
+from Core.local import CRS_LOCAL
+from Core.remoto import compute_pixels, get_info
+
+DIRECTORIO_EXPORTACIONES = os.path.join(DIRECTORIO_CACHE, "exportaciones")
+
+TESELA_EXPORTACION = 512
+MAX_TESELAS_SIMULTANEAS = 4
+NIVELES_VISTA_GENERAL = 4
+TESELA_GEOTIFF = 256
+
+EPSG_LOCAL = int(CRS_LOCAL.split(":")[1])
+
+
+# ===============================
+# MALLA Y MANIFIESTO
+# ===============================
+def firma(anio, indice, escala):
+    """Parámetros de los que depende el ráster exportado"""
+    from Core.datos import NUBOSIDAD_MAX, sensor
+    from Core.zona import huella_zona
+
+    return {
+        "indice": indice,
+        "anio": anio,
+        "escala": escala,
+        "crs": CRS_LOCAL,
+        "zona": huella_zona(),
+        "nubes": NUBOSIDAD_MAX,
+        "sensor": sensor(anio),
+    }
+
+
+def directorio_exportacion(anio, indice, escala):
+    texto = json.dumps(firma(anio, indice, escala), sort_keys=True)
+    nombre = f"{indice}_{anio}_{escala}m_{hashlib.sha1(texto.encode('utf-8')).hexdigest()[:10]}"
+    return os.path.join(DIRECTORIO_EXPORTACIONES, nombre)
+
+
+def _malla(escala):
+    """
+    Origen (esquina superior izquierda) y tamaño en píxeles de la malla que
+    cubre la zona en CRS_LOCAL, ajustada a múltiplos de la escala
+    """
+    from Core.gee_init import asegurar_zona_estudio
+
+    limites = get_info(asegurar_zona_estudio().bounds(1, CRS_LOCAL), "exportacion")
+    anillo = limites["coordinates"][0]
+    xs = [p[0] for p in anillo]
+    ys = [p[1] for p in anillo]
+
+    x0 = math.floor(min(xs) / escala) * escala
+    y1 = math.ceil(max(ys) / escala) * escala
+    return {
+        "x0": x0,
+        "y1": y1,
+        "ancho": math.ceil((max(xs) - x0) / escala),
+        "alto": math.ceil((y1 - min(ys)) / escala),
+    }
+
+
+def _teselas(manifiesto):
+    tesela = manifiesto["tesela"]
+    return [
+        (fila, columna)
+        for fila in range(0, manifiesto["alto"], tesela)
+        for columna in range(0, manifiesto["ancho"], tesela)
+    ]
+
+
+def _leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, "manifiesto.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _guardar_manifiesto(directorio, manifiesto):
+    ruta = os.path.join(directorio, "manifiesto.json")
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+    os.replace(temporal, ruta)
+
+
+@contextmanager
+def _bloqueo(directorio):
+    """Cerrojo exclusivo entre procesos sobre el directorio de una exportación"""
+    with open(os.path.join(directorio, "bloqueo"), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # reintenta 10 s
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def estado_exportacion(anio, indice, escala=30):
+    """Manifiesto de la exportación (teselas hechas, niveles...), o None"""
+    return _leer_manifiesto(directorio_exportacion(anio, indice, escala))
+
+
+# ===============================
+# DESCARGA POR TESELAS
+# ===============================
+def _descargar_tesela(imagen, manifiesto, fila, columna):
+    escala = manifiesto["escala"]
+    h = min(manifiesto["tesela"], manifiesto["alto"] - fila)
+    w = min(manifiesto["tesela"], manifiesto["ancho"] - columna)
+
+    pixeles = compute_pixels({
+        "expression": imagen,
+        "fileFormat": "NUMPY_NDARRAY",
+        "grid": {
+            "dimensions": {"width": w, "height": h},
+            "affineTransform": {
+                "scaleX": escala,
+                "shearX": 0,
+                "translateX": manifiesto["x0"] + columna * escala,
+                "shearY": 0,
+                "scaleY": -escala,
+                "translateY": manifiesto["y1"] - fila * escala,
+            },
+            "crsCode": CRS_LOCAL,
+        },
+    }, "exportacion", indice=manifiesto["indice"], anio=manifiesto["anio"], fila=fila, columna=columna)
+
+    valores = pixeles["valor"].astype(np.float32)
+    valores[pixeles["MASCARA"] == 0] = np.nan
+    return valores
+
+
+def _reducir_nivel(origen, destino, filas=TESELA_EXPORTACION):
+    """Media 2×2 (ignorando NaN) de `origen` en `destino`, por franjas de filas"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # bloques 2×2 todo NaN
+        for fila in range(0, destino.shape[0], filas):
+            bloque = np.asarray(origen[2 * fila:2 * (fila + filas)], dtype=np.float32)
+            h, w = bloque.shape
+            par = np.full((h + h % 2, w + w % 2), np.nan, dtype=np.float32)
+            par[:h, :w] = bloque
+            medias = np.nanmean(par.reshape(par.shape[0] // 2, 2, par.shape[1] // 2, 2), axis=(1, 3))
+            destino[fila:fila + medias.shape[0]] = medias
+
+
+def _ruta_nivel(directorio, nivel):
+    return os.path.join(directorio, f"nivel_{nivel}.npy")
+
+
+def exportar_indice(anio, indice, escala=30, progreso=None):
+    """
+    Descarga el índice del año a un memmap local por teselas y genera sus
+    vistas generales. Reanuda lo que hubiera a medias. `progreso(hechas,
+    total)` se llama tras cada tesela. Devuelve el manifiesto.
+
+    Con el cerrojo del directorio: una segunda exportación del mismo
+    ráster espera y después encuentra el manifiesto al día.
+    """
+    directorio = directorio_exportacion(anio, indice, escala)
+    os.makedirs(directorio, exist_ok=True)
+    with _bloqueo(directorio):
+        return _exportar(directorio, anio, indice, escala, progreso)
+
+
+def _exportar(directorio, anio, indice, escala, progreso):
+    from Core.datos import obtener_indice
+
+    manifiesto = _leer_manifiesto(directorio)
+    if manifiesto is None:
+        manifiesto = {
+            **firma(anio, indice, escala),
+            **_malla(escala),
+            "tesela": TESELA_EXPORTACION,
+            "hechas": [],
+            "niveles": 0,
+            "terminado": False,
+        }
+        np.lib.format.open_memmap(
+            _ruta_nivel(directorio, 0), mode="w+", dtype=np.float32,
+            shape=(manifiesto["alto"], manifiesto["ancho"])
+        )[:] = np.nan
+        _guardar_manifiesto(directorio, manifiesto)
+
+    if manifiesto["terminado"]:
+        return manifiesto
+
+    teselas = _teselas(manifiesto)
+    hechas = {tuple(t) for t in manifiesto["hechas"]}
+    pendientes = [t for t in teselas if t not in hechas]
+
+    if pendientes:
+        # Los píxeles enmascarados llegan como 0: se envía la máscara aparte
+        img = obtener_indice(anio, indice)
+        imagen = (
+            img.unmask(0).rename("valor")
+            .addBands(img.mask().rename("MASCARA").unmask(0))
+            .toFloat()
+        )
+
+        datos = np.load(_ruta_nivel(directorio, 0), mmap_mode="r+")
+        tareas = {t: (_descargar_tesela, imagen, manifiesto, *t) for t in pendientes}
+
+        # Solo el hilo principal escribe: el disco y el manifiesto nunca
+        # quedan a medias de una tesela
+        for resultado in ejecutar_concurrente(tareas, MAX_TESELAS_SIMULTANEAS):
+            if resultado.error is not None:
+                datos.flush()
+                raise resultado.error
+
+            fila, columna = resultado.nombre
+            valores = resultado.valor
+            datos[fila:fila + valores.shape[0], columna:columna + valores.shape[1]] = valores
+            datos.flush()
+
+            manifiesto["hechas"].append([fila, columna])
+            _guardar_manifiesto(directorio, manifiesto)
+            if progreso:
+                progreso(len(manifiesto["hechas"]), len(teselas))
+        del datos
+
+    # Vistas generales: cada nivel, la mitad del anterior
+    anterior = np.load(_ruta_nivel(directorio, 0), mmap_mode="r")
+    for nivel in range(1, NIVELES_VISTA_GENERAL + 1):
+        if min(anterior.shape) < 2:
+            break
+        forma = ((anterior.shape[0] + 1) // 2, (anterior.shape[1] + 1) // 2)
+        destino = np.lib.format.open_memmap(
+            _ruta_nivel(directorio, nivel), mode="w+", dtype=np.float32, shape=forma
+        )
+        _reducir_nivel(anterior, destino)
+        destino.flush()
+        manifiesto["niveles"] = nivel
+        anterior = np.load(_ruta_nivel(directorio, nivel), mmap_mode="r")
+
+    manifiesto["terminado"] = True
+    _guardar_manifiesto(directorio, manifiesto)
+    return manifiesto
+
+
+def leer_nivel(anio, indice, escala=30, nivel=0):
+    """Array (memmap de solo lectura) de un nivel de una exportación terminada"""
+    return np.load(_ruta_nivel(directorio_exportacion(anio, indice, escala), nivel), mmap_mode="r")
+
+
+# ===============================
+# GEOTIFF
+# ===============================
+# Tipos de campo TIFF y su formato en struct
+_ASCII, _SHORT, _LONG, _DOUBLE = 2, 3, 4, 12
+_FORMATOS = {_SHORT: "H", _LONG: "I", _DOUBLE: "d"}
+
+
+def ruta_geotiff(anio, indice, escala=30):
+    return os.path.join(directorio_exportacion(anio, indice, escala), f"{indice}_{anio}_{escala}m.tif")
+
+
+def _escribir_teselas(f, datos, tesela=TESELA_GEOTIFF):
+    """
+    Teselas del nivel comprimidas con deflate, de una en una y de izquierda
+    a derecha y de arriba abajo; los bordes se completan con NaN.
+    Devuelve (posiciones, tamaños) de las teselas en el fichero.
+    """
+    posiciones, tamanos = [], []
+    for fila in range(0, datos.shape[0], tesela):
+        for columna in range(0, datos.shape[1], tesela):
+            bloque = np.full((tesela, tesela), np.nan, dtype="<f4")
+            trozo = datos[fila:fila + tesela, columna:columna + tesela]
+            bloque[:trozo.shape[0], :trozo.shape[1]] = trozo
+            comprimido = zlib.compress(bloque.tobytes(), 6)
+            posiciones.append(f.tell())
+            tamanos.append(len(comprimido))
+            f.write(comprimido)
+    return posiciones, tamanos
+
+
+def _escribir_ifd(f, etiquetas):
+    """
+    Directorio TIFF ({código: (tipo, valores)}) al final del fichero, con
+    los valores que no caben en su entrada justo detrás. Devuelve la
+    posición del directorio y la de su puntero al siguiente.
+    """
+    if f.tell() % 2:
+        f.write(b"\0")  # los directorios empiezan en posición par
+    inicio = f.tell()
+    extra = inicio + 2 + 12 * len(etiquetas) + 4
+
+    entradas, contenidos = [], b""
+    for codigo in sorted(etiquetas):
+        tipo, valores = etiquetas[codigo]
+        if tipo == _ASCII:
+            contenido = valores.encode("ascii") + b"\0"
+        else:
+            contenido = struct.pack(f"<{len(valores)}{_FORMATOS[tipo]}", *valores)
+        cuenta = len(contenido) if tipo == _ASCII else len(valores)
+        if len(contenido) <= 4:
+            campo = contenido.ljust(4, b"\0")
+        else:
+            campo = struct.pack("<I", extra + len(contenidos))
+            contenidos += contenido + b"\0" * (len(contenido) % 2)
+        entradas.append(struct.pack("<HHI", codigo, tipo, cuenta) + campo)
+
+    f.write(struct.pack("<H", len(entradas)) + b"".join(entradas))
+    siguiente = f.tell()
+    f.write(struct.pack("<I", 0) + contenidos)
+    return inicio, siguiente
+
+
+def escribir_geotiff(anio, indice, escala=30):
+    """
+    GeoTIFF de la exportación terminada, en teselas de TESELA_GEOTIFF
+    píxeles y con cada vista general como subfichero de resolución
+    reducida (los lectores como GDAL las usan al alejarse). Se escribe una
+    vez, tesela a tesela desde los memmap, y se reutiliza. Devuelve su ruta.
+    """
+    directorio = directorio_exportacion(anio, indice, escala)
+    ruta = ruta_geotiff(anio, indice, escala)
+    with _bloqueo(directorio):
+        manifiesto = _leer_manifiesto(directorio)
+        if not manifiesto or not manifiesto["terminado"]:
+            raise RuntimeError(f"La exportación de {indice} {anio} no ha terminado")
+        if os.path.exists(ruta):
+            return ruta
+
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(b"II*\0" + struct.pack("<I", 0))
+
+            niveles = []
+            for nivel in range(manifiesto["niveles"] + 1):
+                datos = leer_nivel(anio, indice, escala, nivel)
+                niveles.append((datos.shape, *_escribir_teselas(f, datos)))
+                del datos
+            # TIFF clásico: posiciones de 32 bits
+            if f.tell() > 0xFFFFFFFF - 2 ** 20:
+                raise RuntimeError(f"El GeoTIFF de {indice} {anio} supera los 4 GiB")
+
+            puntero = 4
+            for nivel, ((alto, ancho), posiciones, tamanos) in enumerate(niveles):
+                etiquetas = {
+                    254: (_LONG, [0 if nivel == 0 else 1]),     # NewSubfileType: vista general
+                    256: (_LONG, [ancho]),
+                    257: (_LONG, [alto]),
+                    258: (_SHORT, [32]),                        # BitsPerSample
+                    259: (_SHORT, [8]),                         # Compression: deflate
+                    262: (_SHORT, [1]),                         # Photometric: BlackIsZero
+                    277: (_SHORT, [1]),                         # SamplesPerPixel
+                    284: (_SHORT, [1]),                         # PlanarConfiguration
+                    322: (_LONG, [TESELA_GEOTIFF]),             # TileWidth
+                    323: (_LONG, [TESELA_GEOTIFF]),             # TileLength
+                    324: (_LONG, posiciones),                   # TileOffsets
+                    325: (_LONG, tamanos),                      # TileByteCounts
+                    339: (_SHORT, [3]),                         # SampleFormat: float
+                    42113: (_ASCII, "nan"),                     # GDAL_NODATA
+                }
+                if nivel == 0:
+                    etiquetas.update({
+                        33550: (_DOUBLE, [float(escala), float(escala), 0.0]),   # ModelPixelScale
+                        33922: (_DOUBLE, [0.0, 0.0, 0.0, float(manifiesto["x0"]),
+                                          float(manifiesto["y1"]), 0.0]),       # ModelTiepoint
+                        # GeoKeyDirectory: proyectado, píxel como área, EPSG del CRS local
+                        34735: (_SHORT, [1, 1, 0, 3, 1024, 0, 1, 1, 1025, 0, 1, 1,
+                                         3072, 0, 1, EPSG_LOCAL]),
+                    })
+                inicio, siguiente = _escribir_ifd(f, etiquetas)
+                f.seek(puntero)
+                f.write(struct.pack("<I", inicio))
+                f.seek(0, os.SEEK_END)
+                puntero = siguiente
+        os.replace(temporal, ruta)
+    return ruta
+
+
+def _leer_geotiff(anio, indice, escala):
+    # st.download_button necesita el contenido: se lee del fichero ya escrito
+    with open(escribir_geotiff(anio, indice, escala), "rb") as f:
+        return f.read()
+
+
+def seccion_descarga(anio, indice, clave, escala=30):
+    """Botón para exportar el índice del año y, al terminar, para descargarlo"""
+    import streamlit as st
+
+    manifiesto = estado_exportacion(anio, indice, escala)
+
+    if not manifiesto or not manifiesto["terminado"]:
+        a_medias = bool(manifiesto and manifiesto["hechas"])
+        etiqueta = "Reanudar exportación" if a_medias else "Exportar GeoTIFF"
+        if not st.button(etiqueta, key=f"exportar_{clave}"):
+            if a_medias:
+                st.caption(f"Exportación interrumpida: {len(manifiesto['hechas'])} teselas ya descargadas.")
+            return
+
+        barra = st.progress(0.0, text="Descargando teselas...")
+        try:
+            manifiesto = exportar_indice(
+                anio, indice, escala,
+                progreso=lambda hechas, total: barra.progress(
+                    hechas / total, text=f"Teselas {hechas}/{total}"
+                )
+            )
+        except Exception as e:
+            st.error(f"Exportación interrumpida (se reanudará donde quedó): {e}")
+            return
+        barra.empty()
+
+    # El GeoTIFF se escribe (una vez) al pulsar, no en cada ejecución de la página
+    st.download_button(
+        f"Descargar {indice} {anio} (GeoTIFF)",
+        lambda: _leer_geotiff(anio, indice, escala),
+        file_name=f"{indice}_{anio}_{escala}m.tif",
+        mime="image/tiff",
+        on_click="ignore",
+        key=f"descargar_{clave}"
+    )
+    st.caption(
+        f"{manifiesto['ancho']} × {manifiesto['alto']} píxeles de {escala} m en {CRS_LOCAL}; "
+        f"GeoTIFF en teselas con {manifiesto['niveles']} vistas generales."
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación de un índice a GeoTIFF")
+    parser.add_argument("--indice", required=True)
+    parser.add_argument("--anio", type=int, required=True)
+    parser.add_argument("--escala", type=int, default=30)
+    parser.add_argument("--salida", help="ruta del GeoTIFF (por defecto, en el directorio de exportación)")
+    args = parser.parse_args()
+
+    def progreso(hechas, total):
+        print(f"  teselas {hechas}/{total}")
+
+    manifiesto = exportar_indice(args.anio, args.indice, args.escala, progreso)
+    salida = escribir_geotiff(args.anio, args.indice, args.escala)
+    if args.salida:
+        shutil.copyfile(salida, args.salida)
+        salida = args.salida
+    print(f"{manifiesto['ancho']} × {manifiesto['alto']} píxeles, {manifiesto['niveles']} vistas generales -> {salida}")
+
+
+if __name__ == "__main__":
+    main()
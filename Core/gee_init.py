@@ -1,11 +1,33 @@
-import ee
 import os
 import json
+import threading
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# `ee` se importa al inicializar: las páginas que no hablan con GEE no lo cargan
+
+def _escribir_credenciales(credentials):
+    """Escribe el fichero de credenciales solo si falta o ha cambiado"""
+    cred_dir = os.path.join(os.path.expanduser("~"), ".config", "earthengine")
+    ruta = os.path.join(cred_dir, "credentials")
+
+    try:
+        with open(ruta) as f:
+            if json.load(f) == credentials:
+                return
+    except (FileNotFoundError, ValueError):
+        pass
+
+    os.makedirs(cred_dir, exist_ok=True)
+    with open(ruta, "w") as f:
+        json.dump(credentials, f)
+
 
 def inicializar_gee():
     """Inicializa Google Earth Engine con credenciales OAuth2"""
     try:
+        import ee
+
         client_id = os.getenv('EE_CLIENT_ID') or os.getenv('CLIENT_ID')
         client_secret = os.getenv('EE_CLIENT_SECRET') or os.getenv('CLIENT_SECRET')
         refresh_token = os.getenv('EE_REFRESH_TOKEN') or os.getenv('REFRESH_TOKEN')
@@ -18,11 +40,7 @@ def inicializar_gee():
                 "type": "authorized_user"
             }
 
-            cred_dir = os.path.join(os.path.expanduser("~"), ".config", "earthengine")
-            os.makedirs(cred_dir, exist_ok=True)
-
-            with open(os.path.join(cred_dir, "credentials"), "w") as f:
-                json.dump(credentials, f)
+            _escribir_credenciales(credentials)
 
         ee.Initialize(project="fourth-return-458106-r5")
 
@@ -31,26 +49,54 @@ def inicializar_gee():
 
 
 def obtener_zona_estudio():
-    """Obtiene la geometría de la zona de estudio desde GEE"""
+    """
+    Geometría de la zona de estudio como literal del lado del cliente.
+    El asset solo se descarga la primera vez o cuando cambia (Core/zona.py).
+    """
+    from Core.zona import zona_estudio
+
     try:
-        return ee.FeatureCollection(
-            "projects/fourth-return-458106-r5/assets/uchumayo"
-        ).geometry()
+        return zona_estudio()
     except Exception as e:
         raise RuntimeError(f"Error al cargar zona de estudio: {e}")
 
 
-def asegurar_zona_estudio():
+_gee_listo = False
+_gee_lock = threading.Lock()
+
+
+def asegurar_gee():
     """
-    Asegura que la zona de estudio esté cargada en session_state.
-    Llama a esta función al inicio de cada página de Streamlit.
+    Inicializa GEE una sola vez por proceso: el cliente lo comparten todas
+    las sesiones, páginas y hilos de trabajo.
     """
-    if "zona_estudio" not in st.session_state:
-        try:
+    global _gee_listo
+    with _gee_lock:
+        if not _gee_listo:
             inicializar_gee()
-            st.session_state["zona_estudio"] = obtener_zona_estudio()
-        except Exception as e:
-            st.error(f"Error al inicializar el sistema: {str(e)}")
-            st.stop()
-    
-    return st.session_state["zona_estudio"]
\ No newline at end of file
+            _gee_listo = True
+
+
+def zona_estudio_proceso():
+    """
+    Zona de estudio para usos fuera de una sesión de Streamlit (línea de
+    comandos, servicios).
+    """
+    asegurar_gee()
+    return obtener_zona_estudio()
+
+
+def asegurar_zona_estudio():
+    """
+    Asegura que GEE esté inicializado y devuelve la zona de estudio.
+    Llama a esta función al inicio de cada página de Streamlit; tras la
+    primera vez en el proceso no cuesta ninguna llamada.
+    """
+    if get_script_run_ctx() is None:
+        return zona_estudio_proceso()
+
+    try:
+        return zona_estudio_proceso()
+    except Exception as e:
+        st.error(f"Error al inicializar el sistema: {str(e)}")
+        st.stop()
\ No newline at end of file
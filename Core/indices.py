@@ -32,3 +32,49 @@ def calcular_indice(img, nombre):
         return img.normalizedDifference(["GREEN", "SWIR1"])
 
     raise ValueError(f"Índice no soportado: {nombre}")
+
+
+NOMBRES_INDICES = ["NDVI", "SAVI", "EVI", "GNDVI", "LSWI", "NDWI", "MNDWI"]
+
+INDICES = {
+    nombre: (lambda img, nombre=nombre: calcular_indice(img, nombre))
+    for nombre in NOMBRES_INDICES
+}
+
+VIS_PARAMS = {
+    "NDVI": {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
+    "SAVI": {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
+    "EVI":  {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
+    "GNDVI":{"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
+    "LSWI": {"min": -0.5, "max": 0.8, "palette": ["brown", "white", "blue"]},
+    "NDWI": {"min": -0.5, "max": 0.8, "palette": ["white", "cyan", "blue"]},
+    "MNDWI":{"min": -0.5, "max": 0.8, "palette": ["white", "lightblue", "darkblue"]}
+}
+
+# Distribución de píxeles: percentiles por año e histograma de intervalos
+# fijos, con el mismo rango todos los años para que se sumen sin más. Las
+# bandas SR llegan sin reescalar: las diferencias normalizadas quedan en
+# [-1, 1], SAVI en ±1.5 y EVI no tiene cota, así que los valores fuera del
+# rango se cuentan en los intervalos de los extremos
+PERCENTILES = [5, 25, 50, 75, 95]
+INTERVALOS_HISTOGRAMA = 100
+RANGOS_HISTOGRAMA = {
+    "NDVI": (-1.0, 1.0),
+    "SAVI": (-1.5, 1.5),
+    "EVI": (-2.5, 2.5),
+    "GNDVI": (-1.0, 1.0),
+    "LSWI": (-1.0, 1.0),
+    "NDWI": (-1.0, 1.0),
+    "MNDWI": (-1.0, 1.0),
+}
+
+
+def imagen_indices(img, nombres=None):
+    """Imagen multibanda con una banda por índice (nombrada como el índice)"""
+    nombres = nombres or NOMBRES_INDICES
+
+    salida = calcular_indice(img, nombres[0]).rename(nombres[0])
+    for nombre in nombres[1:]:
+        salida = salida.addBands(calcular_indice(img, nombre).rename(nombre))
+
+    return salida
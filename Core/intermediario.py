@@ -0,0 +1,206 @@
+"""
+Intermediario de las peticiones a GEE, compartido por todas las sesiones
+del proceso.
+
+  - Peticiones idénticas en vuelo (mismo grafo, mismo tipo) se funden en
+    una: la primera la lanza y las demás esperan su resultado.
+  - Como mucho MAX_PETICIONES idas y vueltas simultáneas; el resto espera
+    turno en cola.
+  - Los errores transitorios (429, 5xx, cuota, tiempo agotado) se reintentan
+    con espera exponencial y jitter completo; los demás se propagan.
+
+Las métricas (cola, en curso, fusionadas, reintentos...) se ven en la
+página de diagnóstico y en la exportación de Prometheus. Vaciarlas desde la
+página solo mueve la referencia: los contadores de Prometheus no retroceden.
+"""
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+MAX_PETICIONES = int(os.getenv("LANDSAT_MAX_PETICIONES", "8"))
+MAX_REINTENTOS = int(os.getenv("LANDSAT_MAX_REINTENTOS", "4"))
+
+# Espera antes del reintento n: uniforme entre 0 y min(ESPERA_MAXIMA, ESPERA_BASE · 2^n)
+ESPERA_BASE = float(os.getenv("LANDSAT_ESPERA_BASE", "0.5"))
+ESPERA_MAXIMA = 30.0
+
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+# GEE no siempre adjunta el código HTTP: también se reconoce por el mensaje.
+# "Computation timed out" o "memory limit exceeded" no están: repetir la
+# misma petición daría el mismo error
+_MENSAJE_TRANSITORIO = re.compile(
+    r"\b(429|500|502|503|504)\b|too many (concurrent|requests)|rate limit|quota|"
+    r"unavailable|internal error|deadline|try again",
+    re.IGNORECASE
+)
+
+
+def es_transitorio(error):
+    """Si merece la pena reintentar: limitación de cuota o fallo del servidor"""
+    codigo = getattr(error, "status_code", None)
+    if isinstance(codigo, int):
+        return codigo in CODIGOS_TRANSITORIOS
+    respuesta = getattr(error, "resp", None)  # googleapiclient.errors.HttpError
+    if respuesta is not None and getattr(respuesta, "status", None) is not None:
+        return int(respuesta.status) in CODIGOS_TRANSITORIOS
+    return bool(_MENSAJE_TRANSITORIO.search(str(error)))
+
+
+class Intermediario:
+
+    def __init__(self, max_peticiones=MAX_PETICIONES, max_reintentos=MAX_REINTENTOS,
+                 espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA):
+        self.max_peticiones = max_peticiones
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self._turnos = threading.BoundedSemaphore(max_peticiones)
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self._contadores = dict.fromkeys(
+            ("peticiones", "fusionadas", "reintentos", "transitorios", "fallidas"), 0
+        )
+        self._base = dict(self._contadores)
+        self._en_cola = 0
+        self._en_curso = 0
+        self._max_cola = 0
+        self._max_en_curso = 0
+
+    def _sumar(self, contador, n=1):
+        with self._lock:
+            self._contadores[contador] += n
+
+    def ejecutar(self, clave, llamada):
+        """
+        Resultado de `llamada()`. Si ya hay una petición con la misma `clave`
+        en vuelo se espera la suya; con clave None no se funde con ninguna.
+        """
+        if clave is None:
+            return self._con_reintentos(llamada)
+
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = self._en_vuelo[clave] = Future()
+            else:
+                self._contadores["fusionadas"] += 1
+
+        if not lider:
+            return futuro.result()
+
+        try:
+            futuro.set_result(self._con_reintentos(llamada))
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            # Fuera del registro en cuanto termina: una petición posterior
+            # vuelve a salir (de repetirla ya se encargan las cachés)
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+        return futuro.result()
+
+    def _con_reintentos(self, llamada):
+        self._sumar("peticiones")
+        intento = 0
+        while True:
+            try:
+                with self._turno():
+                    return llamada()
+            except Exception as e:
+                if not es_transitorio(e):
+                    raise
+                self._sumar("transitorios")
+                if intento >= self.max_reintentos:
+                    self._sumar("fallidas")
+                    raise
+            # La espera se hace sin ocupar turno
+            time.sleep(random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento)))
+            intento += 1
+            self._sumar("reintentos")
+
+    @contextmanager
+    def _turno(self):
+        """Uno de los MAX_PETICIONES huecos, contando la cola mientras se espera"""
+        with self._lock:
+            self._en_cola += 1
+            self._max_cola = max(self._max_cola, self._en_cola)
+        self._turnos.acquire()
+        with self._lock:
+            self._en_cola -= 1
+            self._en_curso += 1
+            self._max_en_curso = max(self._max_en_curso, self._en_curso)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+            self._turnos.release()
+
+    def metricas(self):
+        """Contadores desde el último reinicio y estado actual de la cola"""
+        with self._lock:
+            return {
+                **{c: n - self._base[c] for c, n in self._contadores.items()},
+                "en_cola": self._en_cola,
+                "en_curso": self._en_curso,
+                "max_cola": self._max_cola,
+                "max_en_curso": self._max_en_curso,
+                "en_vuelo": len(self._en_vuelo),
+                "limite": self.max_peticiones,
+            }
+
+    def totales(self):
+        """Contadores desde el arranque del proceso, que nunca se reinician"""
+        with self._lock:
+            return dict(self._contadores)
+
+    def reiniciar_metricas(self):
+        with self._lock:
+            self._base = dict(self._contadores)
+            self._max_cola = self._en_cola
+            self._max_en_curso = self._en_curso
+
+
+_intermediario = None
+_intermediario_lock = threading.Lock()
+
+
+def intermediario():
+    """Intermediario del proceso (uno para todas las sesiones)"""
+    global _intermediario
+    with _intermediario_lock:
+        if _intermediario is None:
+            _intermediario = Intermediario()
+        return _intermediario
+
+
+def exportar_prometheus():
+    """Métricas del intermediario en formato de texto de Prometheus"""
+    metricas = {**intermediario().metricas(), **intermediario().totales()}
+    descripciones = {
+        "peticiones": ("counter", "Peticiones lanzadas a GEE (sin contar reintentos)."),
+        "fusionadas": ("counter", "Peticiones resueltas con otra idéntica ya en vuelo."),
+        "reintentos": ("counter", "Reintentos tras un error transitorio."),
+        "transitorios": ("counter", "Errores transitorios (429, 5xx, cuota) recibidos."),
+        "fallidas": ("counter", "Peticiones que agotaron los reintentos."),
+        "en_cola": ("gauge", "Peticiones esperando turno."),
+        "en_curso": ("gauge", "Idas y vueltas en curso."),
+        "max_cola": ("gauge", "Mayor cola observada."),
+        "max_en_curso": ("gauge", "Máximo de idas y vueltas simultáneas observado."),
+    }
+    lineas = []
+    for nombre, (tipo, ayuda) in descripciones.items():
+        metrica = f"landsat_ee_{nombre}" + ("_total" if tipo == "counter" else "")
+        lineas += [
+            f"# HELP {metrica} {ayuda}",
+            f"# TYPE {metrica} {tipo}",
+            f"{metrica} {metricas[nombre]}",
+        ]
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,126 @@
+import numpy as np
+
+from Core.indices import NOMBRES_INDICES
+
+# Píxeles por bloque: 7 temporales float32 de este tamaño caben en la caché L2/L3
+BLOQUE = 1 << 16
+
+
+def reservar_salidas(forma, nombres=None):
+    """Buffers float32 para indices_fusionados, uno por índice"""
+    return {n: np.empty(forma, dtype=np.float32) for n in (nombres or NOMBRES_INDICES)}
+
+
+def _dividir(numerador, denominador, salida):
+    # Denominador nulo -> NaN (píxel sin dato); los NaN de entrada se propagan
+    salida.fill(np.nan)
+    np.divide(numerador, denominador, out=salida, where=denominador != 0)
+
+
+def _cociente(numerador, denominador):
+    salida = np.empty(np.shape(numerador), dtype=np.float32)
+    _dividir(numerador, denominador, salida)
+    return salida
+
+
+def _normalizada(a, b):
+    return _cociente(a - b, a + b)
+
+
+# Las fórmulas de Core/indices.calcular_indice escritas con NumPy, índice a
+# índice: referencia directa para comprobar indices_fusionados
+FORMULAS = {
+    "NDVI": lambda b: _normalizada(b["NIR"], b["RED"]),
+    "SAVI": lambda b: _cociente(b["NIR"] - b["RED"], b["NIR"] + b["RED"] + 0.5) * np.float32(1.5),
+    "EVI": lambda b: _cociente(
+        b["NIR"] - b["RED"], b["NIR"] + 6 * b["RED"] - 7.5 * b["BLUE"] + 1
+    ) * np.float32(2.5),
+    "GNDVI": lambda b: _normalizada(b["NIR"], b["GREEN"]),
+    "LSWI": lambda b: _normalizada(b["NIR"], b["SWIR1"]),
+    "NDWI": lambda b: _normalizada(b["GREEN"], b["NIR"]),
+    "MNDWI": lambda b: _normalizada(b["GREEN"], b["SWIR1"]),
+}
+
+
+def indice_directo(bandas, nombre):
+    """Un índice con su fórmula completa (sin bloques ni términos compartidos)"""
+    if nombre not in FORMULAS:
+        raise ValueError(f"Índice no soportado: {nombre}")
+    return FORMULAS[nombre]({b: np.asarray(v, dtype=np.float32) for b, v in bandas.items()})
+
+
+def indices_fusionados(bandas, salidas, bloque=BLOQUE):
+    """
+    Calcula los 7 índices en una sola pasada por bloques sobre las bandas
+    (dict {banda: array}, todas de la misma forma) y escribe cada uno en
+    `salidas[índice]`, un buffer float32 de esa forma (ver reservar_salidas).
+
+    Se reutilizan los términos comunes: NIR-RED y NIR+RED (NDVI, SAVI, EVI)
+    y NDWI = -GNDVI. Solo se reservan 4 temporales del tamaño del bloque.
+    """
+    azul, verde, rojo, nir, swir1 = (
+        np.ravel(bandas[b]) for b in ("BLUE", "GREEN", "RED", "NIR", "SWIR1")
+    )
+    for nombre, salida in salidas.items():
+        if salida.dtype != np.float32 or not salida.flags.c_contiguous:
+            raise ValueError(f"El buffer de {nombre} debe ser float32 y contiguo")
+    planas = {n: s.reshape(-1) for n, s in salidas.items()}
+    total = nir.size
+
+    dif = np.empty(bloque, dtype=np.float32)
+    suma = np.empty(bloque, dtype=np.float32)
+    aux = np.empty(bloque, dtype=np.float32)
+    res = np.empty(bloque, dtype=np.float32)
+
+    for ini in range(0, total, bloque):
+        fin = min(ini + bloque, total)
+        n = fin - ini
+        d, s, a, r = dif[:n], suma[:n], aux[:n], res[:n]
+
+        N = nir[ini:fin]
+        R = rojo[ini:fin]
+        G = verde[ini:fin]
+        B = azul[ini:fin]
+        S1 = swir1[ini:fin]
+
+        np.subtract(N, R, out=d)
+        np.add(N, R, out=s)
+
+        if "NDVI" in planas:
+            _dividir(d, s, planas["NDVI"][ini:fin])
+
+        if "SAVI" in planas:
+            np.add(s, 0.5, out=a)
+            _dividir(d, a, r)
+            np.multiply(r, 1.5, out=planas["SAVI"][ini:fin])
+
+        if "EVI" in planas:
+            # NIR + 6*RED - 7.5*BLUE + 1
+            np.multiply(R, 6.0, out=a)
+            a += N
+            np.multiply(B, 7.5, out=r)
+            a -= r
+            a += 1.0
+            _dividir(d, a, r)
+            np.multiply(r, 2.5, out=planas["EVI"][ini:fin])
+
+        if "GNDVI" in planas or "NDWI" in planas:
+            np.subtract(N, G, out=d)
+            np.add(N, G, out=s)
+            _dividir(d, s, r)
+            if "GNDVI" in planas:
+                planas["GNDVI"][ini:fin] = r
+            if "NDWI" in planas:
+                np.negative(r, out=planas["NDWI"][ini:fin])
+
+        if "LSWI" in planas:
+            np.subtract(N, S1, out=d)
+            np.add(N, S1, out=s)
+            _dividir(d, s, planas["LSWI"][ini:fin])
+
+        if "MNDWI" in planas:
+            np.subtract(G, S1, out=d)
+            np.add(G, S1, out=s)
+            _dividir(d, s, planas["MNDWI"][ini:fin])
+
+    return salidas
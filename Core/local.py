@@ -0,0 +1,222 @@
+import math
+import os
+
+import numpy as np
+
+from Core.cache import DIRECTORIO_CACHE
+from Core.indices import INTERVALOS_HISTOGRAMA, NOMBRES_INDICES, PERCENTILES, RANGOS_HISTOGRAMA
+from Core.kernel import indices_fusionados, reservar_salidas
+from Core.remoto import compute_pixels, get_info
+
+BANDAS = ["BLUE","GREEN","RED","NIR","SWIR1","SWIR2"]
+
+# EPSG:32719 (UTM 19S) cubre la cuenca del Chili; el bloque limita el
+# tamaño de cada petición de píxeles
+CRS_LOCAL = "EPSG:32719"
+BLOQUE_DESCARGA = 512
+
+
+def _resumir(indice, valores):
+    validos = valores[~np.isnan(valores)]
+    rango = list(RANGOS_HISTOGRAMA[indice])
+
+    if validos.size == 0:
+        claves = ["mean", "min", "max", "histogram"] + [f"p{p}" for p in PERCENTILES]
+        return {**{f"{indice}_{k}": None for k in claves}, f"{indice}_histogram_rango": rango}
+
+    # Como en GEE: lo que se sale del rango cuenta en los intervalos de los extremos
+    conteos, _ = np.histogram(
+        np.clip(validos, *rango), bins=INTERVALOS_HISTOGRAMA, range=tuple(rango)
+    )
+
+    return {
+        f"{indice}_mean": float(validos.mean(dtype=np.float64)),
+        f"{indice}_min": float(validos.min()),
+        f"{indice}_max": float(validos.max()),
+        **{
+            f"{indice}_p{p}": float(v)
+            for p, v in zip(PERCENTILES, np.percentile(validos, PERCENTILES))
+        },
+        f"{indice}_histogram": conteos.tolist(),
+        f"{indice}_histogram_rango": rango,
+    }
+
+
+class AlmacenBandas:
+    """
+    Cubos de bandas por año en disco (float32, forma (6, alto, ancho)),
+    con NaN fuera de la zona de estudio. Se leen como memmap.
+    """
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or os.path.join(DIRECTORIO_CACHE, "bandas")
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def ruta(self, anio):
+        return os.path.join(self.directorio, f"{anio}.npy")
+
+    def existe(self, anio):
+        return os.path.exists(self.ruta(anio))
+
+    def anios(self):
+        return sorted(
+            int(nombre[:-4]) for nombre in os.listdir(self.directorio)
+            if nombre.endswith(".npy") and nombre[:-4].isdigit()
+        )
+
+    def guardar(self, anio, bandas):
+        """`bandas`: array (6, alto, ancho) o dict {banda: array 2D}"""
+        if isinstance(bandas, dict):
+            bandas = np.stack([bandas[b] for b in BANDAS])
+
+        bandas = np.asarray(bandas, dtype=np.float32)
+        if bandas.ndim != 3 or bandas.shape[0] != len(BANDAS):
+            raise ValueError(f"Se esperaba un cubo (6, alto, ancho), no {bandas.shape}")
+
+        # Escritura atómica: otro proceso nunca ve un cubo a medias
+        temporal = self.ruta(anio) + ".tmp.npy"
+        np.save(temporal, bandas)
+        os.replace(temporal, self.ruta(anio))
+
+    def cargar(self, anio):
+        cubo = np.load(self.ruta(anio), mmap_mode="r")
+        return {b: cubo[i] for i, b in enumerate(BANDAS)}
+
+
+class MotorLocal:
+    """Índices, estadísticas, histogramas y series calculados con NumPy"""
+
+    def __init__(self, almacen=None, descargar=None):
+        self.almacen = almacen or AlmacenBandas()
+        # Función anio -> cubo de bandas; None para trabajar solo con lo guardado
+        self.descargar = descargar
+        self._stats = {}
+
+    def bandas(self, anio):
+        if not self.almacen.existe(anio):
+            if self.descargar is None:
+                raise KeyError(f"No hay bandas locales para {anio}")
+            self.almacen.guardar(anio, self.descargar(anio))
+            self._stats.pop(anio, None)
+        return self.almacen.cargar(anio)
+
+    def indice(self, anio, indice):
+        """Un solo índice, con el kernel por bloques (Core/kernel.py)"""
+        if indice not in NOMBRES_INDICES:
+            raise ValueError(f"Índice no soportado: {indice}")
+        bandas = self.bandas(anio)
+        return indices_fusionados(bandas, reservar_salidas(bandas["NIR"].shape, [indice]))[indice]
+
+    def indices(self, anio, salidas=None):
+        """Los 7 índices del año en una pasada (Core/kernel.py)"""
+        bandas = self.bandas(anio)
+        if salidas is None:
+            salidas = reservar_salidas(bandas["NIR"].shape)
+        return indices_fusionados(bandas, salidas)
+
+    def estadisticas(self, anio, indice):
+        """Mismo formato que datos.estadisticas_indice"""
+        return _resumir(indice, self.indice(anio, indice))
+
+    def estadisticas_todos(self, anio):
+        """{índice: estadísticas} de los 7 índices, calculados en una pasada"""
+        if anio not in self._stats:
+            self._stats[anio] = {
+                nombre: _resumir(nombre, valores)
+                for nombre, valores in self.indices(anio).items()
+            }
+        return self._stats[anio]
+
+    def histograma(self, anio, indice, bins=50, rango=(-1.0, 1.0)):
+        valores = self.indice(anio, indice)
+        conteos, bordes = np.histogram(valores[~np.isnan(valores)], bins=bins, range=rango)
+        return conteos, bordes
+
+    def serie(self, indice, inicio=2000, fin=2025):
+        """Mismo formato que datos.serie_temporal; años sin bandas -> None"""
+        serie = []
+        for anio in range(inicio, fin + 1):
+            try:
+                valor = self.estadisticas_todos(anio)[indice][f"{indice}_mean"]
+            except KeyError:
+                valor = None
+            serie.append({"Año": anio, "Valor": valor})
+        return serie
+
+
+def descargar_bandas(anio, escala=30):
+    """
+    Descarga de GEE el cubo de seis bandas del año para la zona de estudio,
+    por bloques de BLOQUE_DESCARGA píxeles.
+    """
+    import ee
+    from Core.datos import composicion_anual
+    from Core.gee_init import asegurar_zona_estudio
+
+    imagen = composicion_anual(anio)
+    # Los píxeles enmascarados llegan como 0: se envía la máscara aparte
+    mascara = imagen.mask().reduce(ee.Reducer.min()).rename("MASCARA")
+    imagen = imagen.unmask(0).addBands(mascara.unmask(0)).toFloat()
+
+    limites = get_info(
+        asegurar_zona_estudio().bounds(1, CRS_LOCAL), "descargar_bandas", anio=anio
+    )
+    anillo = limites["coordinates"][0]
+    xs = [p[0] for p in anillo]
+    ys = [p[1] for p in anillo]
+    x0, y1 = min(xs), max(ys)
+    ancho = math.ceil((max(xs) - x0) / escala)
+    alto = math.ceil((y1 - min(ys)) / escala)
+
+    cubo = np.full((len(BANDAS), alto, ancho), np.nan, dtype=np.float32)
+
+    for fila in range(0, alto, BLOQUE_DESCARGA):
+        for columna in range(0, ancho, BLOQUE_DESCARGA):
+            h = min(BLOQUE_DESCARGA, alto - fila)
+            w = min(BLOQUE_DESCARGA, ancho - columna)
+
+            pixeles = compute_pixels({
+                "expression": imagen,
+                "fileFormat": "NUMPY_NDARRAY",
+                "grid": {
+                    "dimensions": {"width": w, "height": h},
+                    "affineTransform": {
+                        "scaleX": escala,
+                        "shearX": 0,
+                        "translateX": x0 + columna * escala,
+                        "shearY": 0,
+                        "scaleY": -escala,
+                        "translateY": y1 - fila * escala,
+                    },
+                    "crsCode": CRS_LOCAL,
+                },
+            }, "descargar_bandas", anio=anio, fila=fila, columna=columna)
+
+            fuera = pixeles["MASCARA"] == 0
+            for i, banda in enumerate(BANDAS):
+                bloque = pixeles[banda].astype(np.float32)
+                bloque[fuera] = np.nan
+                cubo[i, fila:fila + h, columna:columna + w] = bloque
+
+    return cubo
+
+
+_motor = None
+
+
+def motor_local():
+    """Motor local del proceso, que descarga de GEE los años que falten"""
+    global _motor
+    if _motor is None:
+        from Core.datos import NUBOSIDAD_MAX
+        from Core.gee_init import asegurar_zona_estudio
+        from Core.zona import huella_zona
+
+        # Un almacén por zona y umbral de nubes, para no mezclar cubos
+        asegurar_zona_estudio()
+        huella = huella_zona()
+        almacen = AlmacenBandas(
+            os.path.join(DIRECTORIO_CACHE, "bandas", f"{huella}_{NUBOSIDAD_MAX}")
+        )
+        _motor = MotorLocal(almacen, descargar=descargar_bandas)
+    return _motor
@@ -0,0 +1,270 @@
+"""
+Composiciones anuales materializadas.
+
+La mediana anual de seis bandas (filtro de fechas, de nubes y median()) es
+la parte más cara de casi cualquier petición. Este módulo la exporta una vez
+por año como asset de GEE y la anota en un registro local; con
+LANDSAT_MATERIALIZAR=1, índices, estadísticas y teselas parten del asset en
+lugar de recalcular la mediana.
+
+Cada composición lleva una firma (año, sensor, umbral de nubes, versión de
+la máscara del sensor, zona, escala) que forma parte del id del asset: al
+cambiar el umbral de nubes se reconstruyen todos los años, y al cambiar la
+máscara de un sensor, solo los años de ese sensor.
+
+Uso (desde la raíz del repositorio):
+    python -m Core.materializado --inicio 2000 --fin 2025 --esperar
+    python -m Core.materializado --estado
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import ee
+
+from Core.cache import DIRECTORIO_CACHE
+from Core.remoto import get_info
+
+MATERIALIZAR = os.getenv("LANDSAT_MATERIALIZAR") == "1"
+CARPETA_ACTIVOS = os.getenv(
+    "LANDSAT_CARPETA_ACTIVOS", "projects/fourth-return-458106-r5/assets/composiciones"
+)
+RUTA_REGISTRO = os.path.join(DIRECTORIO_CACHE, "composiciones.json")
+
+# Súbase la versión de un sensor al cambiar su máscara o su receta: solo se
+# reconstruyen los años de ese sensor
+VERSIONES_SENSOR = {"LE07": 1, "LC08": 1}
+
+CRS_EXPORTACION = "EPSG:32719"
+ESPERA_SONDEO = 30
+
+
+def firma(anio):
+    """Parámetros de los que depende la composición del año"""
+    from Core.datos import ESCALA, NUBOSIDAD_MAX, sensor
+    from Core.zona import huella_zona
+
+    return {
+        "anio": anio,
+        "sensor": sensor(anio),
+        "nubes": NUBOSIDAD_MAX,
+        "version": VERSIONES_SENSOR[sensor(anio)],
+        "zona": huella_zona(),
+        "escala": ESCALA,
+    }
+
+
+def id_composicion(anio, carpeta=CARPETA_ACTIVOS):
+    """Id del asset para la firma actual del año"""
+    texto = json.dumps(firma(anio), sort_keys=True)
+    return f"{carpeta}/composicion_{anio}_{hashlib.sha1(texto.encode('utf-8')).hexdigest()[:10]}"
+
+
+# ===============================
+# REGISTRO LOCAL
+# ===============================
+class RegistroComposiciones:
+    """
+    {año: {id, firma, estado, tarea, creado}} en un JSON. Se relee cuando el
+    fichero cambia, así que la app ve lo que va publicando la línea de comandos.
+    """
+
+    def __init__(self, ruta=RUTA_REGISTRO):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._mtime = None
+
+    def entradas(self):
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.ruta)
+            except FileNotFoundError:
+                return {}
+            if mtime != self._mtime:
+                with open(self.ruta, encoding="utf-8") as f:
+                    self._entradas = {int(a): e for a, e in json.load(f).items()}
+                self._mtime = mtime
+            return dict(self._entradas)
+
+    def actualizar(self, anio, entrada):
+        entradas = self.entradas()
+        entradas[anio] = entrada
+        with self._lock:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            temporal = self.ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({str(a): e for a, e in sorted(entradas.items())}, f, indent=2)
+            os.replace(temporal, self.ruta)
+
+    def origen(self, anio, id_esperado):
+        """Id del asset si la composición del año está lista y al día"""
+        entrada = self.entradas().get(anio)
+        if entrada and entrada["estado"] == "listo" and entrada["id"] == id_esperado:
+            return entrada["id"]
+        return None
+
+
+_registro = None
+
+
+def registro_composiciones():
+    global _registro
+    if _registro is None:
+        _registro = RegistroComposiciones()
+    return _registro
+
+
+def origen_composicion(anio):
+    """Asset de la composición del año, o None para calcular la mediana"""
+    if not MATERIALIZAR:
+        return None
+    return registro_composiciones().origen(anio, id_composicion(anio))
+
+
+# ===============================
+# PUBLICACIÓN
+# ===============================
+def publicar(anio, registro=None, carpeta=CARPETA_ACTIVOS):
+    """
+    Lanza la exportación del año si no está lista ni en curso con la firma
+    actual. Devuelve el estado del año tras la llamada.
+    """
+    from Core.datos import BANDAS, ESCALA, composicion_periodo
+    from Core.gee_init import asegurar_zona_estudio
+
+    registro = registro or registro_composiciones()
+    destino = id_composicion(anio, carpeta)
+
+    entrada = registro.entradas().get(anio)
+    if entrada and entrada["id"] == destino and entrada["estado"] in ("listo", "en_curso"):
+        return entrada["estado"]
+
+    coleccion, imagen = composicion_periodo(f"{anio}-01-01", f"{anio}-12-31", anio)
+    if get_info(coleccion.size(), "materializar", anio=anio) == 0:
+        registro.actualizar(anio, {"id": destino, "firma": firma(anio), "estado": "sin_escenas"})
+        return "sin_escenas"
+
+    tarea = ee.batch.Export.image.toAsset(
+        image=imagen.select(BANDAS).toFloat().set("firma", json.dumps(firma(anio))),
+        description=f"composicion_{anio}",
+        assetId=destino,
+        region=asegurar_zona_estudio(),
+        scale=ESCALA,
+        crs=CRS_EXPORTACION,
+        maxPixels=1e10,
+    )
+    tarea.start()
+
+    registro.actualizar(anio, {
+        "id": destino,
+        "firma": firma(anio),
+        "estado": "en_curso",
+        "tarea": tarea.id,
+        "creado": time.time(),
+        "anteriores": _anteriores(entrada, destino),
+    })
+    return "en_curso"
+
+
+def _sustituidos(entrada):
+    """Ids que la entrada sustituye (los registros antiguos guardan uno en "anterior")"""
+    anteriores = list(entrada.get("anteriores", []))
+    if entrada.get("anterior"):
+        anteriores.append(entrada["anterior"])
+    return anteriores
+
+
+def _anteriores(entrada, destino):
+    """
+    Ids sustituidos por `destino`. Se acumulan: si se republica sobre una
+    exportación aún en curso, el asset listo que esta iba a sustituir no se
+    pierde del registro y borrar_obsoletos lo sigue encontrando.
+    """
+    if not entrada:
+        return []
+    anteriores = _sustituidos(entrada) + [entrada["id"]]
+    return [a for i, a in enumerate(anteriores) if a != destino and a not in anteriores[:i]]
+
+
+def sondear(registro=None):
+    """Actualiza las exportaciones en curso; devuelve cuántas siguen en curso"""
+    registro = registro or registro_composiciones()
+    en_curso = {a: e for a, e in registro.entradas().items() if e["estado"] == "en_curso"}
+    if not en_curso:
+        return 0
+
+    estados = ee.data.getTaskStatus([e["tarea"] for e in en_curso.values()])
+    pendientes = 0
+    for (anio, entrada), estado in zip(en_curso.items(), estados):
+        if estado["state"] == "COMPLETED":
+            registro.actualizar(anio, {**entrada, "estado": "listo"})
+        elif estado["state"] in ("FAILED", "CANCELLED"):
+            registro.actualizar(anio, {**entrada, "estado": "error",
+                                       "error": estado.get("error_message")})
+        else:
+            pendientes += 1
+    return pendientes
+
+
+def borrar_obsoletos(registro=None):
+    """Borra los assets sustituidos por una firma nueva ya lista"""
+    registro = registro or registro_composiciones()
+    borrados = []
+    for anio, entrada in registro.entradas().items():
+        anteriores = _sustituidos(entrada)
+        if entrada["estado"] == "listo" and anteriores:
+            for anterior in anteriores:
+                try:
+                    ee.data.deleteAsset(anterior)
+                except ee.EEException:
+                    pass  # ya no existía, o su exportación no llegó a terminar
+                borrados.append(anterior)
+            registro.actualizar(anio, {**entrada, "anterior": None, "anteriores": []})
+    return borrados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Composiciones anuales materializadas")
+    parser.add_argument("--inicio", type=int, default=2000)
+    parser.add_argument("--fin", type=int, default=2025)
+    parser.add_argument("--esperar", action="store_true",
+                        help="sondea hasta que terminen todas las exportaciones")
+    parser.add_argument("--estado", action="store_true", help="solo muestra el registro")
+    parser.add_argument("--borrar-obsoletos", action="store_true",
+                        help="borra los assets de firmas anteriores ya sustituidas")
+    args = parser.parse_args()
+
+    from Core.gee_init import asegurar_zona_estudio
+
+    asegurar_zona_estudio()
+    registro = registro_composiciones()
+
+    if not args.estado:
+        for anio in range(args.inicio, args.fin + 1):
+            print(f"  {anio}: {publicar(anio, registro)}")
+
+    pendientes = sondear(registro)
+    while args.esperar and pendientes:
+        print(f"{pendientes} exportaciones en curso...")
+        time.sleep(ESPERA_SONDEO)
+        pendientes = sondear(registro)
+
+    if args.borrar_obsoletos:
+        for asset in borrar_obsoletos(registro):
+            print(f"  borrado {asset}")
+
+    for anio, entrada in sorted(registro.entradas().items()):
+        al_dia = entrada["id"] == id_composicion(anio)
+        print(f"{anio}: {entrada['estado']}{'' if al_dia else ' (firma antigua)'}  {entrada['id']}")
+
+    if any(e["estado"] == "error" for e in registro.entradas().values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
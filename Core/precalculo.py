@@ -0,0 +1,189 @@
+"""
+Precálculo de la tabla completa año × índice de estadísticas.
+
+Guarda un fichero Parquet por año en DIRECTORIO_TABLA, con la distribución
+de cada índice (percentiles e histograma) además de mean/min/max. Al
+relanzarlo solo se calculan los años que faltan o que están obsoletos (otra
+zona, otro umbral de nubes, el año en curso, más antiguos que
+--max-edad-dias, o escritos sin las columnas actuales), así que sirve tanto
+para reanudar una ejecución interrumpida como para añadir un año nuevo.
+
+Uso (desde la raíz del repositorio):
+    python -m Core.precalculo --inicio 2000 --fin 2025 --workers 4
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from Core.cache import DIRECTORIO_CACHE
+from Core.gee_init import asegurar_zona_estudio
+from Core.indices import NOMBRES_INDICES, PERCENTILES, RANGOS_HISTOGRAMA
+from Core.zona import huella_zona
+
+DIRECTORIO_TABLA = os.getenv("LANDSAT_TABLA_DIR") or os.path.join(DIRECTORIO_CACHE, "estadisticas")
+
+# El año en curso sigue recibiendo escenas: se recalcula pasado este plazo
+EDAD_MAX_ANIO_ACTUAL = 7 * 24 * 3600
+
+COLUMNAS_PERCENTILES = [f"p{p}" for p in PERCENTILES]
+COLUMNAS = (
+    ["indice", "anio", "mean", "min", "max"] + COLUMNAS_PERCENTILES
+    + ["histograma", "rango_histograma", "huella", "nubes", "escala", "sensor", "calculado"]
+)
+
+
+def _ruta(anio, directorio):
+    return os.path.join(directorio, f"{anio}.parquet")
+
+
+def configuracion_actual():
+    """Parámetros que invalidan la tabla si cambian"""
+    from Core.datos import ESCALA, NUBOSIDAD_MAX
+
+    asegurar_zona_estudio()
+    return {
+        "huella": huella_zona(),
+        "nubes": NUBOSIDAD_MAX,
+        "escala": ESCALA,
+    }
+
+
+def leer_tabla(directorio=DIRECTORIO_TABLA, configuracion=None):
+    """
+    Toda la tabla como DataFrame (vacío si no existe). Con `configuracion`,
+    solo las filas calculadas con esos parámetros.
+    """
+    if not os.path.isdir(directorio):
+        return pd.DataFrame(columns=COLUMNAS)
+
+    partes = [
+        pd.read_parquet(os.path.join(directorio, nombre))
+        for nombre in sorted(os.listdir(directorio))
+        if nombre.endswith(".parquet")
+    ]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    tabla = pd.concat(partes, ignore_index=True)
+    if configuracion:
+        for columna, valor in configuracion.items():
+            tabla = tabla[tabla[columna] == valor]
+    return tabla
+
+
+def obsoleto(anio, directorio, configuracion, max_edad=None):
+    """True si el año falta en la tabla o hay que recalcularlo"""
+    ruta = _ruta(anio, directorio)
+    if not os.path.exists(ruta):
+        return True
+
+    parte = pd.read_parquet(ruta)
+    if len(parte) < len(NOMBRES_INDICES) or not set(COLUMNAS) <= set(parte.columns):
+        return True
+    if any((parte[c] != v).any() for c, v in configuracion.items()):
+        return True
+    # Histogramas de otro rango no se pueden sumar con los nuevos
+    rangos = zip(parte["indice"], parte["rango_histograma"])
+    if any(list(rango) != list(RANGOS_HISTOGRAMA[indice]) for indice, rango in rangos):
+        return True
+
+    edad = time.time() - parte["calculado"].min()
+    if max_edad is not None and edad > max_edad:
+        return True
+    if anio >= datetime.date.today().year and edad > EDAD_MAX_ANIO_ACTUAL:
+        return True
+    return False
+
+
+def calcular_anio(anio, directorio, configuracion):
+    """
+    Calcula los 7 índices del año (una reducción) y escribe su fichero. El
+    año se vuelve a reducir aunque esté en el almacén persistente (por eso
+    toca recalcularlo), y el almacén queda con los mismos valores que la tabla.
+    """
+    from Core.datos import estadisticas_todos_indices, sensor
+
+    stats = estadisticas_todos_indices(anio, recalcular=True)
+    ahora = time.time()
+
+    filas = [
+        {
+            "indice": indice,
+            "anio": anio,
+            "mean": stats[indice].get(f"{indice}_mean"),
+            "min": stats[indice].get(f"{indice}_min"),
+            "max": stats[indice].get(f"{indice}_max"),
+            **{c: stats[indice].get(f"{indice}_{c}") for c in COLUMNAS_PERCENTILES},
+            "histograma": stats[indice].get(f"{indice}_histogram"),
+            "rango_histograma": stats[indice].get(f"{indice}_histogram_rango"),
+            **configuracion,
+            "sensor": sensor(anio),
+            "calculado": ahora,
+        }
+        for indice in NOMBRES_INDICES
+    ]
+
+    # Escritura atómica: una interrupción nunca deja un fichero a medias
+    ruta = _ruta(anio, directorio)
+    temporal = ruta + ".tmp"
+    pd.DataFrame(filas, columns=COLUMNAS).to_parquet(temporal, index=False)
+    os.replace(temporal, ruta)
+    return anio
+
+
+def precalcular(inicio, fin, workers=4, directorio=DIRECTORIO_TABLA, forzar=False, max_edad=None):
+    os.makedirs(directorio, exist_ok=True)
+    configuracion = configuracion_actual()
+
+    pendientes = [
+        anio for anio in range(inicio, fin + 1)
+        if forzar or obsoleto(anio, directorio, configuracion, max_edad)
+    ]
+    print(f"{fin - inicio + 1 - len(pendientes)} años al día, {len(pendientes)} por calcular")
+
+    fallidos = []
+    with ThreadPoolExecutor(max_workers=workers) as ejecutor:
+        futuros = {
+            ejecutor.submit(calcular_anio, anio, directorio, configuracion): anio
+            for anio in pendientes
+        }
+        for futuro in as_completed(futuros):
+            anio = futuros[futuro]
+            try:
+                futuro.result()
+                print(f"  {anio}: ok")
+            except Exception as e:
+                fallidos.append(anio)
+                print(f"  {anio}: error – {e}", file=sys.stderr)
+
+    return fallidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precálculo de estadísticas año × índice")
+    parser.add_argument("--inicio", type=int, default=2000)
+    parser.add_argument("--fin", type=int, default=2025)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--directorio", default=DIRECTORIO_TABLA)
+    parser.add_argument("--forzar", action="store_true", help="recalcula todos los años")
+    parser.add_argument("--max-edad-dias", type=float, default=None,
+                        help="recalcula los años calculados hace más de N días")
+    args = parser.parse_args()
+
+    max_edad = args.max_edad_dias * 24 * 3600 if args.max_edad_dias is not None else None
+    fallidos = precalcular(
+        args.inicio, args.fin, args.workers, args.directorio, args.forzar, max_edad
+    )
+
+    if fallidos:
+        print(f"Años con error (se reintentarán en la próxima ejecución): {sorted(fallidos)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import itertools
+import json
+import os
+
+from Core import trazas
+from Core.intermediario import intermediario
+
+# Medir una respuesta de getInfo o getAsset obliga a serializarla otra vez:
+# solo se mide una de cada MUESTREO_BYTES (las demás quedan con bytes None)
+MUESTREO_BYTES = int(os.getenv("LANDSAT_MUESTREO_BYTES", "10"))
+_llamadas_json = itertools.count()
+
+# ===============================
+# LLAMADAS REMOTAS A GEE
+# ===============================
+# Todo getInfo / getMapId / computePixels / getAsset de la aplicación pasa por aquí,
+# de modo que cada ida y vuelta queda trazada (ver Core/trazas.py) y pasa por
+# el intermediario (Core/intermediario.py): peticiones idénticas en vuelo se
+# funden, hay un tope de peticiones simultáneas y los 429/5xx se reintentan.
+# Cada intento queda trazado; las peticiones fundidas, no.
+
+
+def _serializar(objeto):
+    """Grafo de un objeto de ee (o de un dict que los contiene) como texto"""
+    return json.dumps(objeto, default=lambda o: o.serialize(), sort_keys=True)
+
+
+def _bytes_muestreados(resultado):
+    """Tamaño en JSON de una de cada MUESTREO_BYTES respuestas; None para el resto"""
+    if MUESTREO_BYTES <= 0 or next(_llamadas_json) % MUESTREO_BYTES:
+        return None
+    return len(json.dumps(resultado, default=str))
+
+
+def get_info(objeto, funcion, **argumentos):
+    """objeto.getInfo(), trazado como llamada de `funcion` con `argumentos`"""
+    def llamada():
+        with trazas.medir("getInfo", funcion, **argumentos) as traza:
+            resultado = objeto.getInfo()
+            traza.bytes = _bytes_muestreados(resultado)
+        return resultado
+
+    return intermediario().ejecutar(("getInfo", objeto.serialize()), llamada)
+
+
+def get_map_id(imagen, vis_params, funcion, **argumentos):
+    """imagen.getMapId(vis_params), trazado"""
+    def llamada():
+        with trazas.medir("getMapId", funcion, **argumentos) as traza:
+            resultado = imagen.getMapId(vis_params)
+            traza.bytes = len(resultado["tile_fetcher"].url_format)
+        return resultado
+
+    clave = ("getMapId", imagen.serialize(), _serializar(vis_params))
+    return intermediario().ejecutar(clave, llamada)
+
+
+def get_asset(asset_id, funcion, **argumentos):
+    """ee.data.getAsset(asset_id): metadatos del asset, trazado"""
+    import ee
+
+    def llamada():
+        with trazas.medir("getAsset", funcion, asset=asset_id, **argumentos) as traza:
+            resultado = ee.data.getAsset(asset_id)
+            traza.bytes = _bytes_muestreados(resultado)
+        return resultado
+
+    return intermediario().ejecutar(("getAsset", asset_id), llamada)
+
+
+def compute_pixels(peticion, funcion, **argumentos):
+    """ee.data.computePixels(peticion), trazado"""
+    import ee
+
+    def llamada():
+        with trazas.medir("computePixels", funcion, **argumentos) as traza:
+            resultado = ee.data.computePixels(peticion)
+            traza.bytes = getattr(resultado, "nbytes", 0)
+        return resultado
+
+    return intermediario().ejecutar(("computePixels", _serializar(peticion)), llamada)
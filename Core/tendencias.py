@@ -0,0 +1,69 @@
+import ee
+import streamlit as st
+from Core.datos import composicion_servidor, obtener_indice
+from Core.gee_init import asegurar_zona_estudio
+from Core.indices import INDICES
+
+# Pendientes en unidades de índice por año; anomalías en desviaciones típicas
+VIS_TENDENCIA = {"min": -0.02, "max": 0.02, "palette": ["darkred", "white", "darkgreen"]}
+VIS_ANOMALIA = {"min": -2.5, "max": 2.5, "palette": ["darkred", "white", "darkgreen"]}
+
+
+def coleccion_anual(indice, inicio=2000, fin=2025):
+    """
+    ImageCollection con una imagen por año y dos bandas: "t" (el año) y el
+    índice. Los años sin escenas aportan una imagen enmascarada.
+    """
+    zona_estudio = asegurar_zona_estudio()
+
+    def anual(anio):
+        coleccion, img = composicion_servidor(anio, zona_estudio)
+
+        tiempo = ee.Image.constant(ee.Number(anio)).toFloat().rename("t")
+        valor = INDICES[indice](img).rename(indice).toFloat()
+        vacia = ee.Image.constant([0, 0]).toFloat().rename(["t", indice]).updateMask(0)
+
+        return ee.Image(
+            ee.Algorithms.If(coleccion.size().gt(0), tiempo.addBands(valor), vacia)
+        ).set("anio", anio)
+
+    return ee.ImageCollection.fromImages(ee.List.sequence(inicio, fin).map(anual))
+
+
+@st.cache_data(show_spinner=False)
+def tendencia_lineal(indice, inicio=2000, fin=2025):
+    """Pendiente (por año) e intercepto por píxel, con una reducción linearFit"""
+    ajuste = coleccion_anual(indice, inicio, fin).select(["t", indice]).reduce(
+        ee.Reducer.linearFit()
+    )
+    return ajuste.rename(["pendiente", "intercepto"]).clip(asegurar_zona_estudio())
+
+
+@st.cache_data(show_spinner=False)
+def tendencia_sen(indice, inicio=2000, fin=2025):
+    """Pendiente de Sen (mediana de pendientes), robusta a años atípicos"""
+    ajuste = coleccion_anual(indice, inicio, fin).select(["t", indice]).reduce(
+        ee.Reducer.sensSlope()
+    )
+    return ajuste.rename(["pendiente", "intercepto"]).clip(asegurar_zona_estudio())
+
+
+@st.cache_data(show_spinner=False)
+def anomalia_z(anio, indice, inicio=2000, fin=2025):
+    """
+    Puntuación z por píxel del año respecto al periodo: media y desviación
+    típica salen de una sola reducción sobre la colección anual.
+    """
+    referencia = coleccion_anual(indice, inicio, fin).select(indice).reduce(
+        ee.Reducer.mean().combine(ee.Reducer.stdDev(), "", True)
+    )
+    media = referencia.select(f"{indice}_mean")
+    desviacion = referencia.select(f"{indice}_stdDev")
+
+    return (
+        obtener_indice(anio, indice)
+        .subtract(media)
+        .divide(desviacion)
+        .rename("z")
+        .clip(asegurar_zona_estudio())
+    )
@@ -0,0 +1,473 @@
+"""
+Proxy local de teselas con caché en disco.
+
+Sirve /tiles/{indice}/{anio}/{version}/{z}/{x}/{y}.png desde una caché LRU
+en disco acotada por tamaño y, si la tesela falta, la pide a GEE
+reutilizando conexiones. Los map IDs se memorizan y se renuevan solos al
+caducar. La versión (ver version_capa) cambia con el origen de la
+composición, la visualización, el umbral de nubes o la zona, de modo que
+las teselas viejas no se vuelven a servir; además caducan a los TTL_TESELAS.
+
+El proxy escucha solo en 127.0.0.1: otro equipo que llegase a él gastaría
+la cuota de GEE de la app. Para exponerlo hay que pedirlo con
+LANDSAT_PROXY_HOST=0.0.0.0 (o --host).
+
+Las páginas, con o sin proxy, obtienen sus plantillas a través de MapIds:
+un cambio puramente visual (opacidad, capa mostrada) no vuelve a pedir un
+map ID a GEE mientras el anterior siga vigente.
+
+Se activa en las páginas con LANDSAT_PROXY_TESELAS=1 (arranca dentro del
+proceso de la app) o se lanza aparte:
+    python -m Core.teselas servir --puerto 8765 [--host 0.0.0.0]
+    python -m Core.teselas precargar --indices NDVI,EVI --anios 2020-2025 --zooms 10-13
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Core.cache import DIRECTORIO_CACHE
+
+PROXY_ACTIVO = os.getenv("LANDSAT_PROXY_TESELAS") == "1"
+PUERTO = int(os.getenv("LANDSAT_PROXY_PUERTO", "8765"))
+HOST = os.getenv("LANDSAT_PROXY_HOST", "127.0.0.1")
+# URL con la que el navegador llega al proxy (detrás de un proxy inverso, p. ej.)
+URL_PUBLICA = os.getenv("LANDSAT_PROXY_URL") or f"http://localhost:{PUERTO}"
+
+DIRECTORIO_TESELAS = os.path.join(DIRECTORIO_CACHE, "teselas")
+MAX_BYTES_TESELAS = 1024 * 1024 * 1024  # 1 GB
+TTL_MAP_ID = 3600
+TTL_TESELAS = float(os.getenv("LANDSAT_TTL_TESELAS", str(7 * 24 * 3600)))
+MAX_CONEXIONES = 16
+
+ZOOMS_PRECARGA = (10, 11, 12, 13)
+
+_RUTA = re.compile(r"^/tiles/(\w+)/(\d{4})/(\w+)/(\d+)/(\d+)/(\d+)\.png$")
+
+
+class CacheTeselas:
+    """
+    Teselas PNG en disco. La fecha de modificación es la de descarga (caducan
+    pasados `ttl` segundos) y la de acceso, la del último uso: se desalojan
+    las de uso más antiguo.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_TESELAS, max_bytes=MAX_BYTES_TESELAS, ttl=TTL_TESELAS):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        self._total = sum(os.path.getsize(r) for r, _ in self._ficheros())
+
+    def _ficheros(self):
+        for raiz, _, nombres in os.walk(self.directorio):
+            for nombre in nombres:
+                if nombre.endswith(".png"):
+                    ruta = os.path.join(raiz, nombre)
+                    try:
+                        yield ruta, os.path.getatime(ruta)
+                    except FileNotFoundError:
+                        pass
+
+    def ruta(self, indice, anio, version, z, x, y):
+        return os.path.join(
+            self.directorio, indice, str(anio), version, str(z), str(x), f"{y}.png"
+        )
+
+    def leer(self, *clave):
+        ruta = self.ruta(*clave)
+        try:
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            descargada = os.path.getmtime(ruta)
+        except FileNotFoundError:
+            return None
+        if time.time() - descargada > self.ttl:
+            return None
+        os.utime(ruta, (time.time(), descargada))  # uso para el LRU, sin tocar la descarga
+        return datos
+
+    def escribir(self, datos, *clave):
+        ruta = self.ruta(*clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+
+        with self._lock:
+            self._total += len(datos)
+            if self._total > self.max_bytes:
+                self._desalojar()
+
+    def _desalojar(self):
+        # Se baja al 90 % para no desalojar en cada escritura
+        ficheros = sorted(self._ficheros(), key=lambda f: f[1])
+        self._total = sum(os.path.getsize(r) for r, _ in ficheros)
+        for ruta, _ in ficheros:
+            if self._total <= self.max_bytes * 0.9:
+                break
+            try:
+                tamano = os.path.getsize(ruta)
+                os.remove(ruta)
+                self._total -= tamano
+            except FileNotFoundError:
+                pass
+
+
+class MapIds:
+    """
+    Plantillas de teselas memorizadas por clave hasta que caducan (`ttl`).
+    La creación va fuera del cerrojo para no serializar getMapId de claves
+    distintas pedidos en paralelo.
+    """
+
+    def __init__(self, ttl=TTL_MAP_ID):
+        self.ttl = ttl
+        self._plantillas = {}
+        self._lock = threading.Lock()
+        self.contadores = {"aciertos": 0, "fallos": 0, "renovaciones": 0}
+
+    def obtener(self, clave, crear, renovar=False):
+        """Plantilla vigente para `clave`; si falta o caducó, llama a `crear()`"""
+        with self._lock:
+            plantilla, instante = self._plantillas.get(clave, (None, 0))
+            if not renovar and plantilla is not None and time.time() - instante <= self.ttl:
+                self.contadores["aciertos"] += 1
+                return plantilla
+            self.contadores["renovaciones" if plantilla is not None else "fallos"] += 1
+
+        plantilla = crear()
+        with self._lock:
+            self._plantillas[clave] = (plantilla, time.time())
+        return plantilla
+
+    def vigencia(self, clave):
+        """Segundos que le quedan a la plantilla de `clave` (0 si no está)"""
+        with self._lock:
+            plantilla, instante = self._plantillas.get(clave, (None, 0))
+        if plantilla is None:
+            return 0.0
+        return max(0.0, instante + self.ttl - time.time())
+
+    def limpiar(self):
+        with self._lock:
+            self._plantillas.clear()
+
+
+def huella_vis(vis):
+    """Parámetros de visualización como texto estable, para usarlos en claves"""
+    return json.dumps(vis, sort_keys=True)
+
+
+def version_capa(indice, anio):
+    """
+    Huella de lo que decide los píxeles de la capa: origen de la composición
+    (asset materializado o mediana), visualización, umbral de nubes y zona
+    """
+    from Core.datos import NUBOSIDAD_MAX
+    from Core.indices import VIS_PARAMS
+    from Core.materializado import origen_composicion
+    from Core.zona import huella_zona
+
+    texto = json.dumps(
+        [origen_composicion(anio), huella_vis(VIS_PARAMS[indice]), NUBOSIDAD_MAX, huella_zona()]
+    )
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def _crear_url_map_id(indice, anio, funcion="teselas"):
+    """Plantilla de teselas de GEE para el índice y año (un getMapId)"""
+    from Core.datos import obtener_indice
+    from Core.indices import VIS_PARAMS
+    from Core.remoto import get_map_id
+
+    tiles = get_map_id(
+        obtener_indice(anio, indice), VIS_PARAMS[indice], funcion, anio=anio, indice=indice
+    )
+    return tiles["tile_fetcher"].url_format
+
+
+_map_ids = None
+_map_ids_lock = threading.Lock()
+
+
+def map_ids():
+    """Memoria de map IDs única del proceso, compartida por todas las sesiones"""
+    global _map_ids
+    with _map_ids_lock:
+        if _map_ids is None:
+            _map_ids = MapIds()
+        return _map_ids
+
+
+def _clave_map_id(indice, anio):
+    # Si la composición del año se materializa (o cambian la visualización,
+    # las nubes o la zona), la plantilla anterior deja de valer
+    return ("indice", indice, anio, version_capa(indice, anio))
+
+
+def url_map_id(indice, anio, funcion="teselas"):
+    """Plantilla de GEE para el índice y año, memorizada hasta que caduca"""
+    return map_ids().obtener(
+        _clave_map_id(indice, anio), lambda: _crear_url_map_id(indice, anio, funcion)
+    )
+
+
+def vigencia_map_id(indice, anio):
+    """Segundos que le quedan a la plantilla de url_map_id del índice y año"""
+    return map_ids().vigencia(_clave_map_id(indice, anio))
+
+
+def url_imagen(clave, imagen, vis, funcion, **argumentos):
+    """
+    Plantilla de una imagen cualquiera (tendencias, anomalías...). `clave`
+    debe identificar la imagen; los parámetros de visualización se añaden.
+    """
+    from Core.remoto import get_map_id
+
+    return map_ids().obtener(
+        (*clave, huella_vis(vis)),
+        lambda: get_map_id(imagen, vis, funcion, **argumentos)["tile_fetcher"].url_format
+    )
+
+
+class ProxyTeselas:
+    """
+    `resolver(indice, anio)` devuelve la plantilla de URL de origen con
+    {z}/{x}/{y}; por defecto, un getMapId sin memorizar (el proxy lleva su
+    propia memoria para poder renovarla). En pruebas puede apuntar a un
+    servidor de teselas local. `version(indice, anio)` separa en la caché
+    (y en la memoria de map IDs) las teselas de cada versión de la capa.
+    """
+
+    def __init__(self, cache=None, resolver=_crear_url_map_id, puerto=PUERTO,
+                 url_publica=URL_PUBLICA, ttl_map_id=TTL_MAP_ID, host=HOST,
+                 version=version_capa):
+        self.cache = cache or CacheTeselas()
+        self.resolver = resolver
+        self.version = version
+        self.puerto = puerto
+        self.host = host
+        self.url_publica = url_publica
+
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONEXIONES)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+
+        self.map_ids = MapIds(ttl_map_id)
+        self._servidor = None
+        self.contadores = {"aciertos": 0, "fallos": 0, "renovaciones": 0}
+
+    def url(self, indice, anio):
+        """
+        Plantilla para folium que apunta a este proxy. Lleva la versión de la
+        capa: al cambiar, el navegador tampoco reutiliza las teselas viejas
+        """
+        version = self.version(indice, anio)
+        return f"{self.url_publica}/tiles/{indice}/{anio}/{version}/{{z}}/{{x}}/{{y}}.png"
+
+    def _plantilla(self, indice, anio, version, renovar=False):
+        if renovar:
+            self.contadores["renovaciones"] += 1
+        return self.map_ids.obtener(
+            (indice, anio, version), lambda: self.resolver(indice, anio), renovar
+        )
+
+    def tesela(self, indice, anio, z, x, y):
+        """(código HTTP, bytes PNG) de la versión actual, desde la caché o el origen"""
+        version = self.version(indice, anio)
+        datos = self.cache.leer(indice, anio, version, z, x, y)
+        if datos is not None:
+            self.contadores["aciertos"] += 1
+            return 200, datos
+
+        self.contadores["fallos"] += 1
+        respuesta = self._descargar(self._plantilla(indice, anio, version), z, x, y)
+
+        # Un 4xx (salvo 429) suele ser un map ID caducado: se renueva una vez
+        if 400 <= respuesta.status_code < 500 and respuesta.status_code != 429:
+            respuesta = self._descargar(
+                self._plantilla(indice, anio, version, renovar=True), z, x, y
+            )
+
+        if respuesta.status_code != 200:
+            return respuesta.status_code, b""
+
+        self.cache.escribir(respuesta.content, indice, anio, version, z, x, y)
+        return 200, respuesta.content
+
+    def _descargar(self, plantilla, z, x, y):
+        return self.sesion.get(plantilla.format(z=z, x=x, y=y), timeout=30)
+
+    # ===============================
+    # PRECARGA
+    # ===============================
+    def precargar(self, indice, anio, limites, zooms=ZOOMS_PRECARGA, workers=MAX_CONEXIONES):
+        """
+        Descarga todas las teselas que cubren `limites` (oeste, sur, este,
+        norte en grados) en los niveles `zooms`. Devuelve cuántas se sirvieron.
+        """
+        teselas = [(z, x, y) for z in zooms for x, y in teselas_cubiertas(limites, z)]
+        with ThreadPoolExecutor(max_workers=workers) as ejecutor:
+            codigos = list(ejecutor.map(lambda t: self.tesela(indice, anio, *t)[0], teselas))
+        return sum(1 for c in codigos if c == 200)
+
+    # ===============================
+    # SERVIDOR HTTP
+    # ===============================
+    def iniciar(self):
+        """Arranca el servidor en un hilo de fondo (idempotente)"""
+        if self._servidor is not None:
+            return self
+
+        proxy = self
+
+        class Manejador(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                coincidencia = _RUTA.match(self.path.split("?")[0])
+                if not coincidencia:
+                    self.send_error(404)
+                    return
+
+                # La versión de la ruta solo distingue URLs en el navegador:
+                # siempre se sirve la actual
+                indice, anio, _, z, x, y = coincidencia.groups()
+                try:
+                    codigo, datos = proxy.tesela(indice, int(anio), int(z), int(x), int(y))
+                except Exception as e:
+                    self.send_error(502, str(e))
+                    return
+
+                if codigo != 200:
+                    self.send_error(codigo)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(datos)))
+                self.send_header("Cache-Control", f"public, max-age={int(min(86400, proxy.cache.ttl))}")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(
+            target=self._servidor.serve_forever, name="proxy-teselas", daemon=True
+        ).start()
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+def teselas_cubiertas(limites, zoom):
+    """(x, y) de las teselas XYZ que cubren los límites en grados"""
+    oeste, sur, este, norte = limites
+    n = 2 ** zoom
+
+    def xy(lon, lat):
+        lat = math.radians(max(min(lat, 85.0511), -85.0511))
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x0, y0 = xy(oeste, norte)
+    x1, y1 = xy(este, sur)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def limites_zona():
+    """(oeste, sur, este, norte) de la zona de estudio, sin llamadas a GEE"""
+    from Core.gee_init import asegurar_zona_estudio
+    from Core.zona import limites_zona_estudio
+
+    asegurar_zona_estudio()
+    return limites_zona_estudio()
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def proxy_teselas():
+    """Proxy único del proceso, arrancado la primera vez que se pide"""
+    global _proxy
+    with _proxy_lock:
+        if _proxy is None:
+            _proxy = ProxyTeselas().iniciar()
+        return _proxy
+
+
+def url_teselas(anio, indice, funcion):
+    """
+    Plantilla de teselas para folium: la del proxy si está activo, si no
+    la de GEE directamente.
+    """
+    if PROXY_ACTIVO:
+        return proxy_teselas().url(indice, anio)
+    return url_map_id(indice, anio, funcion)
+
+
+def _rango(texto):
+    if "-" in texto:
+        inicio, fin = texto.split("-")
+        return list(range(int(inicio), int(fin) + 1))
+    return [int(v) for v in texto.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy local de teselas de GEE")
+    sub = parser.add_subparsers(dest="orden", required=True)
+
+    servir = sub.add_parser("servir", help="sirve teselas en primer plano")
+    servir.add_argument("--puerto", type=int, default=PUERTO)
+    servir.add_argument("--host", default=HOST,
+                        help="interfaz de escucha; 0.0.0.0 lo expone a la red (y a la cuota de GEE)")
+
+    precarga = sub.add_parser("precargar", help="llena la caché para la zona de estudio")
+    precarga.add_argument("--indices", default="NDVI")
+    precarga.add_argument("--anios", default="2025", help="p. ej. 2020-2025 o 2018,2022")
+    precarga.add_argument("--zooms", default="10-13")
+
+    args = parser.parse_args()
+
+    if args.orden == "servir":
+        proxy = ProxyTeselas(puerto=args.puerto, host=args.host).iniciar()
+        print(f"Proxy de teselas en http://{args.host}:{args.puerto}/tiles/...")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            proxy.detener()
+        return
+
+    proxy = ProxyTeselas()
+    limites = limites_zona()
+    for indice in args.indices.split(","):
+        for anio in _rango(args.anios):
+            servidas = proxy.precargar(indice, anio, limites, _rango(args.zooms))
+            print(f"{indice} {anio}: {servidas} teselas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+# Últimas trazas que se conservan por proceso
+MAX_TRAZAS = 5000
+
+CUANTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass
+class Traza:
+    tipo: str                  # getInfo, getMapId, computePixels, cache
+    funcion: str               # función de Core o página que hizo la llamada
+    argumentos: dict = field(default_factory=dict)
+    instante: float = 0.0
+    duracion: float = 0.0
+    bytes: int = None          # tamaño de la respuesta; None si no se midió
+    cache: str = None          # "acierto" / "fallo" en las consultas al almacén
+    error: str = None
+
+
+_trazas = deque(maxlen=MAX_TRAZAS)
+_lock = threading.Lock()
+
+# Totales por (tipo, función) desde que arrancó el proceso. A diferencia de
+# las trazas, no se descartan ni se vacían: son los contadores de Prometheus
+_acumulados = {}
+
+
+def registrar(traza):
+    with _lock:
+        _trazas.append(traza)
+
+        total = _acumulados.get((traza.tipo, traza.funcion))
+        if total is None:
+            total = _acumulados[(traza.tipo, traza.funcion)] = dict.fromkeys(
+                ("llamadas", "errores", "aciertos_cache", "fallos_cache", "bytes", "medidas", "segundos"), 0
+            )
+        total["llamadas"] += 1
+        total["errores"] += bool(traza.error)
+        total["aciertos_cache"] += traza.cache == "acierto"
+        total["fallos_cache"] += traza.cache == "fallo"
+        total["segundos"] += traza.duracion
+        if traza.bytes is not None:
+            total["bytes"] += traza.bytes
+            total["medidas"] += 1
+
+
+def acumulados():
+    """{(tipo, función): totales} desde el arranque; limpiar() no los toca"""
+    with _lock:
+        return {clave: dict(total) for clave, total in _acumulados.items()}
+
+
+@contextmanager
+def medir(tipo, funcion, **argumentos):
+    """
+    Mide el bloque como una llamada de `tipo`. El bloque puede completar la
+    traza (bytes, cache); si lanza una excepción, se anota y se relanza.
+    """
+    traza = Traza(tipo, funcion, argumentos, instante=time.time())
+    inicio = time.perf_counter()
+    try:
+        yield traza
+    except Exception as e:
+        traza.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        traza.duracion = time.perf_counter() - inicio
+        registrar(traza)
+
+
+def trazas():
+    with _lock:
+        return list(_trazas)
+
+
+def limpiar():
+    """Vacía las trazas recientes (los totales acumulados se conservan)"""
+    with _lock:
+        _trazas.clear()
+
+
+def _cuantil(ordenados, q):
+    if not ordenados:
+        return None
+    return ordenados[min(int(q * len(ordenados)), len(ordenados) - 1)]
+
+
+def resumen():
+    """Una fila por (tipo, función) con recuentos y percentiles de duración"""
+    grupos = {}
+    for t in trazas():
+        grupos.setdefault((t.tipo, t.funcion), []).append(t)
+
+    filas = []
+    for (tipo, funcion), grupo in sorted(grupos.items()):
+        duraciones = sorted(t.duracion for t in grupo)
+        fila = {
+            "tipo": tipo,
+            "funcion": funcion,
+            "llamadas": len(grupo),
+            "errores": sum(1 for t in grupo if t.error),
+            "aciertos_cache": sum(1 for t in grupo if t.cache == "acierto"),
+            "fallos_cache": sum(1 for t in grupo if t.cache == "fallo"),
+            "bytes": sum(t.bytes for t in grupo if t.bytes is not None),
+            "respuestas_medidas": sum(1 for t in grupo if t.bytes is not None),
+            "total_s": round(sum(duraciones), 4),
+        }
+        for q in CUANTILES:
+            fila[f"p{int(q * 100)}_s"] = round(_cuantil(duraciones, q), 4)
+        filas.append(fila)
+    return filas
+
+
+def exportar_json():
+    return json.dumps(
+        {"resumen": resumen(), "trazas": [asdict(t) for t in trazas()]},
+        ensure_ascii=False,
+        default=str,
+        indent=2
+    )
+
+
+def exportar_prometheus():
+    """
+    Métricas en formato de texto de Prometheus. Los contadores y la suma y
+    cuenta del summary salen de los totales acumulados (monótonos); los
+    cuantiles, de las trazas recientes.
+    """
+    totales = sorted(acumulados().items())
+    recientes = {(f["tipo"], f["funcion"]): f for f in resumen()}
+
+    def etiquetas(clave, **extra):
+        pares = {"tipo": clave[0], "funcion": clave[1], **extra}
+        return ",".join(f'{k}="{v}"' for k, v in pares.items())
+
+    lineas = []
+    contadores = [
+        ("landsat_ee_llamadas_total", "llamadas", "Llamadas por tipo y función."),
+        ("landsat_ee_errores_total", "errores", "Llamadas terminadas con error."),
+        ("landsat_ee_bytes_total", "bytes",
+         "Tamaño de las respuestas medidas (getInfo y getAsset se miden por muestreo)."),
+        ("landsat_ee_respuestas_medidas_total", "medidas",
+         "Respuestas cuyo tamaño se midió (divisor de landsat_ee_bytes_total)."),
+    ]
+    for metrica, campo, ayuda in contadores:
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} counter"]
+        for clave, total in totales:
+            lineas.append(f"{metrica}{{{etiquetas(clave)}}} {total[campo]}")
+
+    lineas += [
+        "# HELP landsat_cache_consultas_total Consultas al almacén persistente.",
+        "# TYPE landsat_cache_consultas_total counter",
+    ]
+    for clave, total in totales:
+        if clave[0] == "cache":
+            for resultado in ("acierto", "fallo"):
+                valor = total["aciertos_cache"] if resultado == "acierto" else total["fallos_cache"]
+                lineas.append(
+                    f"landsat_cache_consultas_total{{{etiquetas(clave, resultado=resultado)}}} {valor}"
+                )
+
+    lineas += [
+        "# HELP landsat_ee_duracion_segundos Duración de las llamadas (cuantiles de las recientes).",
+        "# TYPE landsat_ee_duracion_segundos summary",
+    ]
+    for clave, total in totales:
+        fila = recientes.get(clave)
+        if fila is not None:
+            for q in CUANTILES:
+                lineas.append(
+                    f"landsat_ee_duracion_segundos{{{etiquetas(clave, quantile=q)}}} "
+                    f"{fila[f'p{int(q * 100)}_s']}"
+                )
+        lineas.append(f"landsat_ee_duracion_segundos_sum{{{etiquetas(clave)}}} {round(total['segundos'], 4)}")
+        lineas.append(f"landsat_ee_duracion_segundos_count{{{etiquetas(clave)}}} {total['llamadas']}")
+
+    return "\n".join(lineas) + "\n"
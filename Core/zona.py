@@ -0,0 +1,227 @@
+"""
+Geometría de la zona de estudio guardada en local.
+
+El asset se descarga una vez como GeoJSON (con la fecha de actualización
+del asset como versión y una huella del contenido) y a partir de ahí se
+envía a GEE como geometría literal: nada de volver a resolver el
+FeatureCollection en cada filterBounds, clip o reduceRegion.
+
+Además ofrece la caja envolvente, para prefiltrar colecciones con
+filterBounds, y variantes simplificadas para reducir a escala gruesa.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+
+import ee
+
+from Core.cache import DIRECTORIO_CACHE
+from Core.remoto import get_asset, get_info
+
+ASSET_ZONA = "projects/fourth-return-458106-r5/assets/uchumayo"
+RUTA_ZONA = os.path.join(DIRECTORIO_CACHE, "zona_estudio.geojson")
+
+# Pasado este plazo se pregunta a GEE si el asset cambió (un getAsset)
+EDAD_COMPROBACION = 24 * 3600
+
+# Error de simplificación admitido, en fracciones de la escala de reducción:
+# con 0.5 los bordes se desplazan menos de medio píxel
+TOLERANCIA_ZONA = float(os.getenv("LANDSAT_TOLERANCIA_ZONA", "0.5"))
+
+# Por encima de esta escala (m) las estadísticas usan la zona simplificada
+ESCALA_SIMPLIFICACION = 30
+
+_zona = None
+_geometria = None
+_simplificadas = {}
+_lock = threading.Lock()
+
+
+def _huella(geometria):
+    texto = json.dumps(geometria, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _guardar(datos, ruta):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    os.replace(temporal, ruta)
+
+
+def _descargar(version):
+    geometria = get_info(ee.FeatureCollection(ASSET_ZONA).geometry(), "zona_estudio")
+    return {
+        "asset": ASSET_ZONA,
+        "version": version,
+        "huella": _huella(geometria),
+        "comprobado": time.time(),
+        "geometria": geometria,
+    }
+
+
+def cargar_zona(ruta=RUTA_ZONA):
+    """
+    Datos de la zona ({asset, version, huella, comprobado, geometria}):
+    del fichero local si sigue vigente; si no, de GEE. Una vez por proceso.
+    """
+    global _zona
+    with _lock:
+        if _zona is not None:
+            return _zona
+
+        datos = _leer(ruta)
+        if datos is None or datos.get("asset") != ASSET_ZONA:
+            datos = _descargar(get_asset(ASSET_ZONA, "zona_estudio").get("updateTime"))
+            _guardar(datos, ruta)
+
+        elif time.time() - datos["comprobado"] > EDAD_COMPROBACION:
+            version = get_asset(ASSET_ZONA, "zona_estudio").get("updateTime")
+            if version != datos["version"]:
+                datos = _descargar(version)
+            else:
+                datos["comprobado"] = time.time()
+            _guardar(datos, ruta)
+
+        _zona = datos
+        return _zona
+
+
+def olvidar_zona():
+    """Descarta la zona en memoria (el fichero se conserva)"""
+    global _zona, _geometria
+    with _lock:
+        _zona = None
+        _geometria = None
+        _simplificadas.clear()
+
+
+def huella_zona():
+    """Huella del contenido de la geometría, para claves de caché"""
+    return cargar_zona()["huella"]
+
+
+def zona_estudio():
+    """Geometría de la zona como literal del lado del cliente (una por proceso)"""
+    global _geometria
+    if _geometria is None:
+        _geometria = ee.Geometry(cargar_zona()["geometria"])
+    return _geometria
+
+
+# ===============================
+# CAJA ENVOLVENTE
+# ===============================
+def _coordenadas(geometria):
+    tipo = geometria["type"]
+    if tipo == "Polygon":
+        return [p for anillo in geometria["coordinates"] for p in anillo]
+    if tipo == "MultiPolygon":
+        return [p for poligono in geometria["coordinates"] for anillo in poligono for p in anillo]
+    if tipo == "GeometryCollection":
+        return [p for g in geometria["geometries"] for p in _coordenadas(g)]
+    return []
+
+
+def limites_zona_estudio():
+    """(oeste, sur, este, norte) en grados, calculados en local"""
+    puntos = _coordenadas(cargar_zona()["geometria"])
+    lons = [p[0] for p in puntos]
+    lats = [p[1] for p in puntos]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def caja_zona_estudio():
+    """Rectángulo envolvente: basta para filterBounds y pesa cuatro vértices"""
+    return ee.Geometry.Rectangle(list(limites_zona_estudio()))
+
+
+# ===============================
+# SIMPLIFICACIÓN
+# ===============================
+def _simplificar_anillo(anillo, tolerancia):
+    """Douglas-Peucker sobre un anillo lon/lat, con la tolerancia en metros"""
+    if len(anillo) <= 4:
+        return anillo
+
+    lat0 = math.radians(sum(p[1] for p in anillo) / len(anillo))
+    xy = [(p[0] * 111320 * math.cos(lat0), p[1] * 110540) for p in anillo]
+
+    conservar = [False] * len(anillo)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, len(anillo) - 1)]
+
+    while pila:
+        inicio, fin = pila.pop()
+        (x0, y0), (x1, y1) = xy[inicio], xy[fin]
+        dx, dy = x1 - x0, y1 - y0
+        largo = math.hypot(dx, dy)
+
+        maximo, indice = 0.0, None
+        for i in range(inicio + 1, fin):
+            x, y = xy[i]
+            if largo:
+                distancia = abs(dy * (x - x0) - dx * (y - y0)) / largo
+            else:
+                distancia = math.hypot(x - x0, y - y0)
+            if distancia > maximo:
+                maximo, indice = distancia, i
+
+        if indice is not None and maximo > tolerancia:
+            conservar[indice] = True
+            pila += [(inicio, indice), (indice, fin)]
+
+    resultado = [p for p, c in zip(anillo, conservar) if c]
+    # Un anillo necesita al menos cuatro puntos (el último repite el primero)
+    return resultado if len(resultado) >= 4 else anillo
+
+
+def simplificar_geojson(geometria, tolerancia):
+    tipo = geometria["type"]
+    if tipo == "Polygon":
+        anillos = [_simplificar_anillo(a, tolerancia) for a in geometria["coordinates"]]
+        return {"type": tipo, "coordinates": anillos}
+    if tipo == "MultiPolygon":
+        poligonos = [
+            [_simplificar_anillo(a, tolerancia) for a in poligono]
+            for poligono in geometria["coordinates"]
+        ]
+        return {"type": tipo, "coordinates": poligonos}
+    if tipo == "GeometryCollection":
+        return {"type": tipo, "geometries": [
+            simplificar_geojson(g, tolerancia) for g in geometria["geometries"]
+        ]}
+    return geometria
+
+
+def zona_simplificada(tolerancia):
+    """Zona simplificada con un error máximo de `tolerancia` metros"""
+    with _lock:
+        geometria = _simplificadas.get(tolerancia)
+    if geometria is None:
+        geometria = simplificar_geojson(cargar_zona()["geometria"], tolerancia)
+        with _lock:
+            _simplificadas[tolerancia] = geometria
+    return ee.Geometry(geometria)
+
+
+def zona_para_escala(escala):
+    """
+    Geometría para reducir a `escala` metros: la exacta a la escala nativa y,
+    por encima, la simplificada con TOLERANCIA_ZONA × escala.
+    """
+    if escala <= ESCALA_SIMPLIFICACION or TOLERANCIA_ZONA <= 0:
+        return zona_estudio()
+    return zona_simplificada(escala * TOLERANCIA_ZONA)
@@ -0,0 +1,232 @@
+"""
+Estadísticas zonales: media, mínimo, máximo y número de píxeles de un
+índice por subzona (distritos, subcuencas...) y año.
+
+Todas las zonas y años de un lote salen de una sola llamada a
+reduceRegions sobre una imagen con una banda por año; los lotes de
+TAMANO_LOTE_ZONAS zonas se lanzan en paralelo. El resultado es una tabla
+en columnas que se guarda en el almacén persistente por zonas, índice y año.
+"""
+import hashlib
+import json
+import threading
+import time
+
+import ee
+import pandas as pd
+
+from Core.cache import clave_cache, obtener_cache
+from Core.concurrencia import ejecutar_concurrente
+from Core.remoto import get_asset, get_info
+
+# Zonas por petición: acota el tamaño de la petición y de la respuesta
+TAMANO_LOTE_ZONAS = 100
+MAX_LOTES_SIMULTANEOS = 4
+
+ESTADISTICOS = ["mean", "min", "max", "count"]
+COLUMNAS = ["zona", "indice", "anio"] + ESTADISTICOS
+
+# Cada cuánto se vuelve a preguntar a GEE la fecha de actualización de un
+# asset de zonas (un getAsset)
+EDAD_VERSION_ASSET = 600
+
+_versiones = {}
+_versiones_lock = threading.Lock()
+
+
+# ===============================
+# ZONAS
+# ===============================
+def _geojson(datos):
+    if isinstance(datos, (bytes, bytearray)):
+        datos = datos.decode("utf-8")
+    if isinstance(datos, str):
+        datos = json.loads(datos)
+    if datos.get("type") == "Feature":
+        return [datos]
+    return datos.get("features", [])
+
+
+def campos_geojson(datos):
+    """Propiedades presentes en las zonas, para elegir la que da el nombre"""
+    campos = {}
+    for feature in _geojson(datos):
+        campos.update(dict.fromkeys(feature.get("properties") or {}))
+    return list(campos)
+
+
+def leer_geojson(datos, campo=None):
+    """
+    Zonas de un GeoJSON (texto, bytes o dict) como lista de Features con
+    una sola propiedad, "zona": el valor de `campo`, o el orden si no se da.
+    """
+    zonas = []
+    for i, feature in enumerate(_geojson(datos)):
+        propiedades = feature.get("properties") or {}
+        nombre = propiedades.get(campo) if campo else None
+        zonas.append({
+            "type": "Feature",
+            "geometry": feature["geometry"],
+            "properties": {"zona": str(nombre if nombre is not None else i)},
+        })
+    return zonas
+
+
+def version_asset(asset_id):
+    """Fecha de actualización del asset, memorizada EDAD_VERSION_ASSET segundos"""
+    with _versiones_lock:
+        version, instante = _versiones.get(asset_id, (None, 0))
+    if time.time() - instante > EDAD_VERSION_ASSET:
+        version = get_asset(asset_id, "estadisticas_zonales").get("updateTime")
+        with _versiones_lock:
+            _versiones[asset_id] = (version, time.time())
+    return version
+
+
+def huella_zonas(zonas):
+    """Huella de las zonas (lista de Features, o [id de asset, campo, versión]) para la caché"""
+    texto = json.dumps(zonas, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _lotes(zonas, campo=None):
+    """
+    (posición de la primera zona, colección de GEE) de como mucho
+    TAMANO_LOTE_ZONAS zonas. Con un id de asset se trocea en el servidor
+    (una llamada para contar las zonas).
+    """
+    if isinstance(zonas, str):
+        coleccion = ee.FeatureCollection(zonas)
+        if campo:
+            coleccion = coleccion.select([campo], ["zona"])
+        total = get_info(coleccion.size(), "estadisticas_zonales", asset=zonas)
+        return [
+            (inicio, ee.FeatureCollection(coleccion.toList(TAMANO_LOTE_ZONAS, inicio)))
+            for inicio in range(0, total, TAMANO_LOTE_ZONAS)
+        ]
+
+    return [
+        (i, ee.FeatureCollection({
+            "type": "FeatureCollection",
+            "features": zonas[i:i + TAMANO_LOTE_ZONAS],
+        }))
+        for i in range(0, len(zonas), TAMANO_LOTE_ZONAS)
+    ]
+
+
+# ===============================
+# REDUCCIÓN
+# ===============================
+def _nombre_zona(feature, posicion):
+    """
+    La propiedad "zona"; si falta (asset sin campo, o zona sin ese campo),
+    el system:index del asset y, en último caso, la posición, como
+    hace leer_geojson
+    """
+    nombre = (feature.get("properties") or {}).get("zona")
+    if nombre is None:
+        nombre = feature.get("id")
+    return str(nombre if nombre is not None else posicion)
+
+
+def _reducir_lote(inicio, coleccion, indice, anios):
+    """Una llamada a reduceRegions para todas las zonas del lote y todos los años"""
+    from Core.datos import ESCALA, obtener_indice
+
+    imagen = ee.Image.cat([obtener_indice(anio, indice).rename(f"a{anio}") for anio in anios])
+
+    reductor = ee.Reducer.mean()
+    for estadistico in ESTADISTICOS[1:]:
+        reductor = reductor.combine(getattr(ee.Reducer, estadistico)(), "", True)
+
+    # Con una sola banda, reduceRegions no antepone el nombre de la banda
+    def propiedad(anio, estadistico):
+        return f"a{anio}_{estadistico}" if len(anios) > 1 else estadistico
+
+    propiedades = ["zona"] + [propiedad(a, s) for a in anios for s in ESTADISTICOS]
+
+    reducidas = imagen.reduceRegions(
+        collection=coleccion,
+        reducer=reductor,
+        scale=ESCALA,
+        tileScale=4
+    )
+    # Sin geometrías en la respuesta: solo hacen falta las propiedades
+    datos = get_info(
+        reducidas.select(propiedades, None, False),
+        "estadisticas_zonales", indice=indice, anios=anios
+    )
+
+    tablas = {anio: {c: [] for c in COLUMNAS} for anio in anios}
+    for posicion, feature in enumerate(datos["features"], inicio):
+        props = feature.get("properties") or {}
+        zona = _nombre_zona(feature, posicion)
+        for anio in anios:
+            tabla = tablas[anio]
+            tabla["zona"].append(zona)
+            tabla["indice"].append(indice)
+            tabla["anio"].append(anio)
+            for estadistico in ESTADISTICOS:
+                tabla[estadistico].append(props.get(propiedad(anio, estadistico)))
+    return tablas
+
+
+def _clave(huella, indice, anio):
+    from Core.datos import ESCALA, NUBOSIDAD_MAX, sensor
+    from Core.zona import huella_zona
+
+    return clave_cache("zonal", indice, anio, huella, huella_zona(), NUBOSIDAD_MAX, sensor(anio), ESCALA)
+
+
+def estadisticas_zonales(zonas, indice, anios, campo=None):
+    """
+    Tabla (DataFrame con COLUMNAS) de las estadísticas de `indice` por zona
+    y año. `zonas` es una lista de Features (leer_geojson) o el id de un
+    asset de GEE, con `campo` como nombre de zona. Solo se piden a GEE los
+    años que no están en el almacén, todos en la misma reducción.
+    """
+    from Core.gee_init import asegurar_zona_estudio
+
+    asegurar_zona_estudio()
+    cache = obtener_cache()
+    # Un asset editado cambia de versión: sus tablas anteriores no valen
+    huella = huella_zonas(
+        [zonas, campo, version_asset(zonas)] if isinstance(zonas, str) else zonas
+    )
+
+    tablas = {}
+    faltantes = []
+    for anio in dict.fromkeys(anios):
+        tabla = cache.obtener(_clave(huella, indice, anio))
+        if tabla is None:
+            faltantes.append(anio)
+        else:
+            tablas[anio] = tabla
+
+    if faltantes:
+        tareas = {
+            ("zonal", i): (_reducir_lote, inicio, lote, indice, faltantes)
+            for i, (inicio, lote) in enumerate(_lotes(zonas, campo))
+        }
+
+        # Si un lote falla no se guarda nada: una tabla a medias en caché
+        # parecería completa en la siguiente consulta
+        por_lote = {}
+        for resultado in ejecutar_concurrente(tareas, MAX_LOTES_SIMULTANEOS):
+            if resultado.error is not None:
+                raise resultado.error
+            por_lote[resultado.nombre[1]] = resultado.valor
+
+        # Los lotes llegan en cualquier orden; las zonas se conservan en el suyo
+        parciales = {anio: {c: [] for c in COLUMNAS} for anio in faltantes}
+        for i in sorted(por_lote):
+            for anio, tabla in por_lote[i].items():
+                for columna, valores in tabla.items():
+                    parciales[anio][columna].extend(valores)
+
+        for anio, tabla in parciales.items():
+            cache.guardar(_clave(huella, indice, anio), tabla)
+            tablas[anio] = tabla
+
+    partes = [pd.DataFrame(tablas[anio], columns=COLUMNAS) for anio in dict.fromkeys(anios)]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS)
@@ -1,5 +1,5 @@
 import streamlit as st
-from Core.gee_init import inicializar_gee, obtener_zona_estudio
+from Core.gee_init import asegurar_gee, obtener_zona_estudio
 
 # SOLO el archivo principal tiene st.set_page_config
 st.set_page_config(
@@ -7,22 +7,21 @@ st.set_page_config(
     layout="wide",
 )
 
-# Inicializar GEE primero
+# Inicializar GEE primero (una vez por proceso, no en cada ejecución)
 try:
-    inicializar_gee()
+    asegurar_gee()
 except Exception as e:
     st.error(f"Error al inicializar Google Earth Engine: {str(e)}")
     st.info("Por favor, verifica tus credenciales de GEE en las variables de entorno.")
     st.stop()
 
-# Luego obtener la zona de estudio
-if "zona_estudio" not in st.session_state:
-    try:
-        st.session_state["zona_estudio"] = obtener_zona_estudio()
-    except Exception as e:
-        st.error(f"Error al cargar la zona de estudio: {str(e)}")
-        st.info("Verifica que el asset 'projects/fourth-return-458106-r5/assets/uchumayo' exista y sea accesible.")
-        st.stop()
+# Luego obtener la zona de estudio (guardada en disco tras la primera descarga)
+try:
+    obtener_zona_estudio()
+except Exception as e:
+    st.error(f"Error al cargar la zona de estudio: {str(e)}")
+    st.info("Verifica que el asset 'projects/fourth-return-458106-r5/assets/uchumayo' exista y sea accesible.")
+    st.stop()
 
 # ===============================
 # PÁGINA DE INICIO
@@ -41,12 +40,24 @@ para la cuenca del Río Chili, Arequipa.
 - Visualiza índices espectrales de un año específico
 - Explora diferentes índices de vegetación y agua
 - Ajusta la opacidad de las capas
+- Descarga el ráster del índice en GeoTIFF
 
 **Análisis Multitemporal**
 - Compara 3 años diferentes simultáneamente
 - Visualiza series temporales (2000-2025)
 - Analiza anomalías y tendencias
 - Estadísticas por periodo
+- Detección de cambios entre dos años, con hectáreas de pérdida y ganancia
+
+**Estadísticas Zonales**
+- Estadísticas del índice por distrito o subcuenca (GeoJSON o asset)
+- Cientos de zonas en una sola petición por lote
+- Descarga en CSV y Parquet
+
+**Diagnóstico**
+- Tiempos y percentiles de las llamadas a Earth Engine
+- Aciertos del almacén de resultados
+- Exportación en JSON y formato Prometheus
 
 ## Índices disponibles:
 - **NDVI** - Índice de Vegetación Normalizado
@@ -0,0 +1,106 @@
+"""
+Benchmark de arranque en frío.
+
+Cada medida corre en un proceso nuevo, como el primer usuario tras un
+despliegue:
+  - importación de las dependencias pesadas por separado (las reales);
+  - primer render de cada página y un segundo render en el mismo proceso,
+    sobre el backend simulado de benchmarks/ee_simulado.py, con los módulos
+    pesados que la página llegó a importar.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_arranque
+    python -m benchmarks.bench_arranque --repeticiones 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MODULOS = ["ee", "folium", "streamlit_folium", "plotly.graph_objects", "pandas", "pyarrow", "requests"]
+
+PAGINAS = [
+    "app.py",
+    "pages/1_Exploracion.py",
+    "pages/2_Analisis.py",
+    "pages/3_Diagnostico.py",
+    "pages/4_Zonas.py",
+]
+
+_IMPORTACION = """
+import json, time
+inicio = time.perf_counter()
+import {modulo}
+print(json.dumps({{"tiempo_s": time.perf_counter() - inicio}}))
+"""
+
+_RENDER = """
+import json, os, sys, time
+os.environ["LANDSAT_CACHE_DIR"] = {directorio!r}
+from benchmarks import ee_simulado
+ee_simulado.instalar(latencia=0.0)
+from streamlit.testing.v1 import AppTest
+
+antes = set(sys.modules)
+inicio = time.perf_counter()
+app = AppTest.from_file({pagina!r}, default_timeout=300)
+app.run()
+primero = time.perf_counter() - inicio
+
+inicio = time.perf_counter()
+app.run()
+segundo = time.perf_counter() - inicio
+
+cargados = set(sys.modules) - antes
+print(json.dumps({{
+    "primer_render_s": primero,
+    "segundo_render_s": segundo,
+    "error": app.exception[0].message if app.exception else None,
+    "pesados": [m for m in {modulos!r} if m in cargados],
+}}))
+"""
+
+
+def _ejecutar(codigo):
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="procesos por medida; se informa la mediana")
+    args = parser.parse_args()
+
+    print("Importación en frío (s)")
+    for modulo in MODULOS:
+        tiempos = [_ejecutar(_IMPORTACION.format(modulo=modulo))["tiempo_s"]
+                   for _ in range(args.repeticiones)]
+        print(f"  {modulo:<24} {statistics.median(tiempos):6.3f}")
+
+    print("\nPáginas (s)                 1.er render  2.º render  módulos pesados")
+    for pagina in PAGINAS:
+        # Almacén persistente nuevo por página: nada precalculado
+        medidas = [
+            _ejecutar(_RENDER.format(
+                directorio=tempfile.mkdtemp(prefix="landsat-arranque-"),
+                pagina=pagina,
+                modulos=[m.split(".")[0] for m in MODULOS if m != "ee"],
+            ))
+            for _ in range(args.repeticiones)
+        ]
+        error = next((m["error"] for m in medidas if m["error"]), None)
+        print(
+            f"  {pagina:<26} {statistics.median(m['primer_render_s'] for m in medidas):9.3f}"
+            f"  {statistics.median(m['segundo_render_s'] for m in medidas):10.3f}"
+            f"  {', '.join(medidas[0]['pesados']) or '-'}"
+            + (f"  ERROR: {error}" if error else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
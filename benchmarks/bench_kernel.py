@@ -0,0 +1,78 @@
+"""
+Micro-benchmark del cálculo local de índices: kernel fusionado
+(Core/kernel.py) frente al cálculo índice a índice con sus fórmulas directas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_kernel --lado 4000 --repeticiones 3
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from Core.indices import NOMBRES_INDICES
+from Core.kernel import indice_directo, indices_fusionados, reservar_salidas
+from Core.local import BANDAS
+
+
+def bandas_sinteticas(lado, semilla=0):
+    rng = np.random.default_rng(semilla)
+    cubo = rng.uniform(7000, 20000, size=(len(BANDAS), lado, lado)).astype(np.float32)
+    # Algunos píxeles sin dato y denominadores nulos
+    cubo[:, :lado // 20, :] = np.nan
+    cubo[[BANDAS.index("NIR"), BANDAS.index("RED")], -1, :] = 0
+    return {b: cubo[i] for i, b in enumerate(BANDAS)}
+
+
+def ingenuo(bandas):
+    return {n: indice_directo(bandas, n) for n in NOMBRES_INDICES}
+
+
+def medir(nombre, funcion, pixeles, repeticiones):
+    funcion()  # calentamiento
+
+    tiempos = []
+    tracemalloc.start()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mejor = min(tiempos)
+    print(
+        f"{nombre:<12} {mejor * 1000:9.1f} ms  "
+        f"{pixeles / mejor / 1e6:8.1f} Mpx/s  "
+        f"pico {pico / 2**20:8.1f} MiB"
+    )
+    return mejor, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lado", type=int, default=3000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    bandas = bandas_sinteticas(args.lado)
+    pixeles = args.lado * args.lado
+    salidas = reservar_salidas((args.lado, args.lado))
+
+    print(f"{pixeles / 1e6:.1f} Mpx, {len(NOMBRES_INDICES)} índices")
+    t_ing, m_ing = medir("ingenuo", lambda: ingenuo(bandas), pixeles, args.repeticiones)
+    t_fus, m_fus = medir(
+        "fusionado", lambda: indices_fusionados(bandas, salidas), pixeles, args.repeticiones
+    )
+
+    # Los dos caminos deben coincidir (salvo redondeo float32)
+    referencia = ingenuo(bandas)
+    for n in NOMBRES_INDICES:
+        np.testing.assert_allclose(salidas[n], referencia[n], rtol=1e-4, atol=1e-6, equal_nan=True)
+
+    print(f"aceleración x{t_ing / t_fus:.2f}, memoria pico x{m_ing / max(m_fus, 1):.1f} menor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Benchmark sin conexión de las funciones de Core y del render de las páginas,
+sobre el backend simulado de benchmarks/ee_simulado.py.
+
+Los escenarios de interacción (`*_opacidad`, `*_cambio_anio`,
+`*_vuelta_anio`) miden las idas y vueltas que cuesta un solo gesto del
+usuario sobre la página ya cargada: un cambio puramente visual debe costar 0.
+
+Por escenario informa idas y vueltas a GEE, tiempo de pared, tasa de
+aciertos del almacén persistente y memoria pico, y lo compara con la línea
+base guardada: si algo empeora, termina con código 1.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --actualizar   # reescribe la línea base
+
+Los resultados van a stdout; los avisos de Streamlit, a stderr.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import ee_simulado
+
+LINEA_BASE = os.path.join(os.path.dirname(__file__), "linea_base.json")
+
+
+def medir(nombre, funcion):
+    import streamlit as st  # noqa: F401
+    from Core.cache import obtener_cache
+
+    registro = ee_simulado.registro
+    cache = obtener_cache()
+
+    antes = cache.estadisticas()
+    n_antes = len(registro.llamadas)
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    tiempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    despues = cache.estadisticas()
+    llamadas = registro.llamadas[n_antes:]
+    aciertos = despues["aciertos"] - antes["aciertos"]
+    consultas = aciertos + despues["fallos"] - antes["fallos"]
+
+    resultado = {
+        "idas_y_vueltas": len(llamadas),
+        "por_tipo": {
+            t: sum(1 for c in llamadas if c["tipo"] == t)
+            for t in sorted({c["tipo"] for c in llamadas})
+        },
+        "tiempo_s": round(tiempo, 3),
+        "tasa_aciertos": round(aciertos / consultas, 3) if consultas else None,
+        "memoria_pico_mib": round(pico / 2**20, 2),
+    }
+    print(
+        f"{nombre:<24} {resultado['idas_y_vueltas']:4d} idas  "
+        f"{resultado['tiempo_s']:7.2f} s  "
+        f"aciertos {resultado['tasa_aciertos'] if consultas else '-':>5}  "
+        f"pico {resultado['memoria_pico_mib']:7.2f} MiB  {resultado['por_tipo']}"
+    )
+    return resultado
+
+
+def esperar_segundo_plano():
+    """Lo calculado de fondo cuenta en el escenario que lo lanzó"""
+    from Core.concurrencia import esperar_segundo_plano
+
+    esperar_segundo_plano()
+
+
+def render(pagina):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(pagina, default_timeout=300)
+
+    def ejecutar():
+        app.run()
+        esperar_segundo_plano()
+        if app.exception:
+            raise RuntimeError(f"{pagina}: {app.exception[0].message}")
+
+    return app, ejecutar
+
+
+def interaccion(app, etiqueta, valor):
+    """Cambia el primer control con `etiqueta` y vuelve a ejecutar la página"""
+    def ejecutar():
+        controles = [c for c in (*app.slider, *app.selectbox) if c.label == etiqueta]
+        controles[0].set_value(valor)
+        app.run()
+        esperar_segundo_plano()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+    return ejecutar
+
+
+def reinicio_en_frio():
+    """Simula un proceso nuevo: se pierden las cachés en memoria, no el disco"""
+    import streamlit as st
+    from Core.teselas import map_ids
+    from Core.zona import olvidar_zona
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    map_ids().limpiar()
+    olvidar_zona()
+
+
+def en_paralelo(funciones):
+    """Lanza las funciones a la vez en hilos propios y espera a todas"""
+    import threading
+
+    salida = threading.Barrier(len(funciones))
+    errores = []
+
+    def hilo(funcion):
+        salida.wait()
+        try:
+            funcion()
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=hilo, args=(f,)) for f in funciones]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    if errores:
+        raise errores[0]
+
+
+def sesiones_simultaneas(n=8):
+    """n sesiones piden a la vez la misma reducción: debe salir una sola"""
+    import ee
+    from Core.remoto import get_info
+
+    objeto = ee.Image("simultanea").reduceRegion(ee.Reducer.mean())
+    return lambda: en_paralelo([lambda: get_info(objeto, "bench")] * n)
+
+
+def cuota_limitada(max_peticiones, n=8, limite=4):
+    """
+    n peticiones distintas contra un backend que rechaza (429) por encima de
+    `limite` simultáneas, con un intermediario de tope `max_peticiones`
+    """
+    import ee
+    from Core.intermediario import Intermediario
+
+    # Espera base del orden de una ida y vuelta, con margen de reintentos
+    # para que el escenario no falle por mala suerte con el jitter
+    intermediario = Intermediario(
+        max_peticiones=max_peticiones, max_reintentos=8,
+        espera_base=ee_simulado.registro.latencia or 0.05, espera_maxima=2.0
+    )
+    objetos = [ee.Image(f"cuota_{i}").reduceRegion(ee.Reducer.mean()) for i in range(n)]
+
+    def ejecutar():
+        # Jitter reproducible: el tiempo del escenario no depende de la suerte
+        random.seed(0)
+        ee_simulado.registro.limite = limite
+        try:
+            en_paralelo([
+                lambda o=o: intermediario.ejecutar(None, o.getInfo) for o in objetos
+            ])
+        finally:
+            ee_simulado.registro.limite = None
+        metricas = intermediario.metricas()
+        if metricas["fallidas"]:
+            raise RuntimeError(f"peticiones fallidas pese a los reintentos: {metricas}")
+
+    return ejecutar
+
+
+def escenarios():
+    import streamlit as st
+    from streamlit import logger
+
+    logger.set_log_level("error")
+    from Core import datos
+    from Core.cache import obtener_cache
+    from Core.gee_init import asegurar_zona_estudio
+
+    resultados = {}
+
+    # --- Geometría de la zona: se descarga una vez y queda en disco
+    resultados["zona_frio"] = medir("zona_frio", asegurar_zona_estudio)
+    reinicio_en_frio()
+    resultados["zona_reinicio"] = medir("zona_reinicio", asegurar_zona_estudio)
+
+    # --- Funciones de Core, sin caché de ningún tipo
+    obtener_cache().limpiar()
+    reinicio_en_frio()
+    resultados["indice_frio"] = medir("indice_frio", lambda: datos.obtener_indice(2023, "NDVI"))
+    resultados["estadisticas_frio"] = medir(
+        "estadisticas_frio", lambda: datos.estadisticas_indice(2023, "NDVI")
+    )
+    resultados["estadisticas_otro_indice"] = medir(
+        "estadisticas_otro_indice", lambda: datos.estadisticas_indice(2023, "EVI")
+    )
+    resultados["serie_frio"] = medir("serie_frio", lambda: datos.serie_temporal("NDVI"))
+    reinicio_en_frio()
+    resultados["serie_reinicio"] = medir("serie_reinicio", lambda: datos.serie_temporal("NDVI"))
+    resultados["serie_extendida"] = medir(
+        "serie_extendida", lambda: datos.serie_temporal("NDVI", 2000, 2026)
+    )
+
+    # --- Intermediario: fusión de peticiones idénticas y cuota de GEE
+    resultados["sesiones_simultaneas"] = medir("sesiones_simultaneas", sesiones_simultaneas())
+    resultados["cuota_reintentos"] = medir("cuota_reintentos", cuota_limitada(8))
+    resultados["cuota_tope"] = medir("cuota_tope", cuota_limitada(4))
+
+    # --- Páginas completas
+    for nombre, pagina, control_anio in (("exploracion", "pages/1_Exploracion.py", "Año"),
+                                         ("analisis", "pages/2_Analisis.py", "Año 1")):
+        obtener_cache().limpiar()
+        reinicio_en_frio()
+        st.session_state.clear()
+
+        app, ejecutar = render(pagina)
+        resultados[f"{nombre}_frio"] = medir(f"{nombre}_frio", ejecutar)
+        resultados[f"{nombre}_caliente"] = medir(f"{nombre}_caliente", ejecutar)
+
+        # Gestos sobre la página cargada
+        resultados[f"{nombre}_opacidad"] = medir(
+            f"{nombre}_opacidad", interaccion(app, "Opacidad", 0.3)
+        )
+        resultados[f"{nombre}_cambio_anio"] = medir(
+            f"{nombre}_cambio_anio", interaccion(app, control_anio, 2010)
+        )
+        resultados[f"{nombre}_vuelta_anio"] = medir(
+            f"{nombre}_vuelta_anio", interaccion(app, control_anio, 2023)
+        )
+
+        reinicio_en_frio()
+        app, ejecutar = render(pagina)
+        resultados[f"{nombre}_reinicio"] = medir(f"{nombre}_reinicio", ejecutar)
+
+    return resultados
+
+
+def comparar(actual, base, tolerancia):
+    """Lista de regresiones respecto a la línea base"""
+    fallos = []
+    for nombre, ref in base["escenarios"].items():
+        med = actual.get(nombre)
+        if med is None:
+            fallos.append(f"{nombre}: escenario ausente")
+            continue
+        if med["idas_y_vueltas"] > ref["idas_y_vueltas"]:
+            fallos.append(
+                f"{nombre}: {med['idas_y_vueltas']} idas y vueltas (base {ref['idas_y_vueltas']})"
+            )
+        # Holgura absoluta para no fallar por ruido en escenarios de milisegundos
+        limite = ref["tiempo_s"] * (1 + tolerancia) + 0.25
+        if med["tiempo_s"] > limite:
+            fallos.append(f"{nombre}: {med['tiempo_s']} s (límite {limite:.2f} s)")
+        if med["memoria_pico_mib"] > ref["memoria_pico_mib"] * (1 + tolerancia) + 1:
+            fallos.append(
+                f"{nombre}: memoria pico {med['memoria_pico_mib']} MiB (base {ref['memoria_pico_mib']})"
+            )
+        if (ref["tasa_aciertos"] is not None and med["tasa_aciertos"] is not None
+                and med["tasa_aciertos"] < ref["tasa_aciertos"] - 0.05):
+            fallos.append(
+                f"{nombre}: tasa de aciertos {med['tasa_aciertos']} (base {ref['tasa_aciertos']})"
+            )
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latencia", type=float, default=0.2,
+                        help="segundos por ida y vuelta simulada")
+    parser.add_argument("--tolerancia", type=float, default=0.5,
+                        help="margen relativo de tiempo antes de fallar")
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--actualizar", action="store_true",
+                        help="guarda los resultados como nueva línea base")
+    args = parser.parse_args()
+
+    # Almacén persistente aislado y backend simulado antes de importar Core
+    os.environ["LANDSAT_CACHE_DIR"] = tempfile.mkdtemp(prefix="landsat-bench-")
+    ee_simulado.instalar(latencia=args.latencia)
+
+    actual = escenarios()
+
+    if args.actualizar or not os.path.exists(args.linea_base):
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump({"latencia": args.latencia, "escenarios": actual}, f,
+                      indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.linea_base}")
+        return
+
+    with open(args.linea_base, encoding="utf-8") as f:
+        base = json.load(f)
+
+    if base["latencia"] != args.latencia:
+        print(f"Aviso: la línea base se midió con latencia {base['latencia']} s")
+
+    fallos = comparar(actual, base, args.tolerancia)
+    if fallos:
+        print("\nREGRESIONES:")
+        for fallo in fallos:
+            print(f"  - {fallo}")
+        sys.exit(1)
+
+    print("\nSin regresiones respecto a la línea base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+"""
+Sustituto local del módulo `ee` para medir sin credenciales ni red.
+
+Construye los mismos grafos perezosos que la API real, pero cada getInfo,
+getMapId o computePixels es una "ida y vuelta" simulada: se registra, se
+espera `latencia` segundos y se devuelven valores sintéticos deterministas.
+
+Con `limite` simula la cuota de GEE: por encima de ese número de idas y
+vueltas simultáneas, las nuevas se rechazan con un 429 (EEException).
+
+    from benchmarks import ee_simulado
+    ee_simulado.instalar(latencia=0.2)   # antes de importar Core
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+import types
+
+
+class EEException(Exception):
+    pass
+
+
+# ===============================
+# REGISTRO DE LLAMADAS REMOTAS
+# ===============================
+class Registro:
+
+    def __init__(self, latencia=0.0, limite=None):
+        self.latencia = latencia
+        self.limite = limite
+        self.llamadas = []
+        self.rechazadas = 0
+        self._en_curso = 0
+        self._lock = threading.Lock()
+
+    def ida_y_vuelta(self, tipo, desc, respuesta):
+        # Las rechazadas no cuentan como ida y vuelta completa
+        with self._lock:
+            if self.limite is not None and self._en_curso >= self.limite:
+                self.rechazadas += 1
+                raise EEException("Too Many Requests (429): demasiadas peticiones simultáneas")
+            self._en_curso += 1
+
+        try:
+            inicio = time.perf_counter()
+            if self.latencia:
+                time.sleep(self.latencia)
+            valor = respuesta()
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+
+        with self._lock:
+            self.llamadas.append({
+                "tipo": tipo,
+                "desc": desc[:120],
+                "duracion": time.perf_counter() - inicio,
+                "bytes": len(json.dumps(valor, default=str)),
+            })
+        return valor
+
+    def contar(self, tipo=None):
+        with self._lock:
+            return sum(1 for c in self.llamadas if tipo is None or c["tipo"] == tipo)
+
+    def reiniciar(self):
+        with self._lock:
+            self.llamadas = []
+            self.rechazadas = 0
+
+
+registro = Registro()
+
+
+def _zona_simulada(n=240):
+    """Polígono irregular de unos 15 km alrededor de Uchumayo, con n vértices"""
+    import math
+
+    anillo = []
+    for i in range(n):
+        angulo = 2 * math.pi * i / n
+        radio = 0.07 + 0.01 * math.sin(7 * angulo) + 0.003 * math.sin(53 * angulo)
+        anillo.append([round(-71.62 + radio * math.cos(angulo), 6),
+                       round(-16.42 + radio * math.sin(angulo), 6)])
+    return {"type": "Polygon", "coordinates": [anillo + [anillo[0]]]}
+
+
+ZONA_SIMULADA = _zona_simulada()
+
+
+def _sintetico(clave):
+    """Valor pseudoaleatorio estable en [-0.2, 0.8) para una clave"""
+    h = int(hashlib.sha1(clave.encode("utf-8")).hexdigest()[:8], 16)
+    return round(-0.2 + (h % 10000) / 10000, 6)
+
+
+def _histograma_sintetico(clave, minimo, maximo, intervalos):
+    """[[mínimo del intervalo, píxeles], ...] con forma de campana estable para una clave"""
+    import math
+
+    centro = _sintetico(clave)
+    ancho = (maximo - minimo) / intervalos
+    return [
+        [minimo + i * ancho, int(1000 * math.exp(-((minimo + (i + 0.5) * ancho - centro) / 0.15) ** 2))]
+        for i in range(intervalos)
+    ]
+
+
+def resolver(obj):
+    if isinstance(obj, Nodo):
+        return obj.resolver()
+    if isinstance(obj, dict):
+        return {k: resolver(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [resolver(v) for v in obj]
+    return obj
+
+
+# ===============================
+# NODOS DEL GRAFO
+# ===============================
+class Nodo:
+    """
+    Objeto perezoso genérico. Cualquier método no definido devuelve un nodo
+    nuevo que conserva las bandas, lo que basta para la mayoría de cadenas
+    (filterDate, filterBounds, clip, median, toFloat, unmask...).
+    """
+
+    def __init__(self, desc, bandas=None, valor=None, salidas=None):
+        self.desc = desc
+        self.bandas = list(bandas or [])
+        self.salidas = list(salidas or [])
+        self._valor = valor
+
+    def __getattr__(self, nombre):
+        if nombre.startswith("__"):
+            raise AttributeError(nombre)
+
+        def metodo(*args, **kwargs):
+            return Nodo(_desc(self.desc, nombre, args, kwargs), self.bandas)
+
+        return metodo
+
+    def resolver(self):
+        if callable(self._valor):
+            return self._valor()
+        if self._valor is not None:
+            return resolver(self._valor)
+        return _sintetico(self.desc)
+
+    # --- serialización e idas y vueltas
+    def serialize(self):
+        return self.desc
+
+    def getInfo(self):
+        return registro.ida_y_vuelta("getInfo", self.desc, self.resolver)
+
+    def getMapId(self, vis_params=None):
+        def respuesta():
+            mapid = hashlib.sha1(self.desc.encode("utf-8")).hexdigest()[:20]
+            return {
+                "mapid": mapid,
+                "token": "",
+                "tile_fetcher": types.SimpleNamespace(
+                    url_format=f"https://earthengine.simulado/map/{mapid}/{{z}}/{{x}}/{{y}}"
+                ),
+            }
+        return registro.ida_y_vuelta("getMapId", self.desc, respuesta)
+
+    # --- bandas
+    def rename(self, *nombres):
+        nombres = nombres[0] if len(nombres) == 1 else list(nombres)
+        nombres = [nombres] if isinstance(nombres, str) else list(nombres)
+        return Nodo(_desc(self.desc, "rename", nombres), nombres)
+
+    def select(self, seleccion, *resto):
+        if isinstance(seleccion, str):
+            bandas = [seleccion, *resto]
+        elif isinstance(seleccion, list) and all(isinstance(b, str) for b in seleccion):
+            bandas = seleccion
+        else:
+            bandas = self.bandas
+        # En colecciones con valor (reduceRegions) conserva las features
+        return Nodo(_desc(self.desc, "select", [seleccion]), bandas, valor=self._valor)
+
+    def addBands(self, otra, *args, **kwargs):
+        return Nodo(_desc(self.desc, "addBands", [otra]), self.bandas + otra.bandas)
+
+    def normalizedDifference(self, bandas=None):
+        return Nodo(_desc(self.desc, "normalizedDifference", [bandas]), ["nd"])
+
+    def expression(self, formula, variables=None):
+        return Nodo(_desc(self.desc, "expression", [formula]), ["constant"])
+
+    def bandNames(self):
+        return Nodo(_desc(self.desc, "bandNames"), valor=list(self.bandas))
+
+    # --- reducciones
+    def reduceRegion(self, reducer=None, geometry=None, scale=None, **kwargs):
+        desc = _desc(self.desc, "reduceRegion", [reducer, scale], kwargs)
+        if reducer.grupo:
+            # Tres grupos (0, 1, 2) con valores positivos, como las clases de cambio
+            nombre, salida = reducer.grupo
+            return Nodo(desc, valor=lambda: {"groups": [
+                {nombre: g, salida: round(1000 * (1.2 + _sintetico(f"{desc}|{g}")), 4)}
+                for g in range(3)
+            ]})
+        return Diccionario(
+            desc, _claves_reduccion(self.bandas, reducer.salidas), self.bandas,
+            histograma=reducer.histograma
+        )
+
+    def reduceRegions(self, collection=None, reducer=None, scale=None, **kwargs):
+        desc = _desc(self.desc, "reduceRegions", [collection, reducer, scale], kwargs)
+
+        def valor():
+            claves = reducer.salidas if len(self.bandas) == 1 else _claves_reduccion(self.bandas, reducer.salidas)
+            return {"type": "FeatureCollection", "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {
+                        **f.get("properties", {}),
+                        **{k: _sintetico(f"{desc}|{i}|{k}") for k in claves},
+                    },
+                }
+                for i, f in enumerate(resolver(collection).get("features", []))
+            ]}
+
+        return Nodo(desc, valor=valor)
+
+    def reduce(self, reducer, *args, **kwargs):
+        desc = _desc(self.desc, "reduce", [reducer])
+        return Nodo(desc, reducer.salidas or self.bandas)
+
+    # --- geometrías
+    def bounds(self, *args, **kwargs):
+        """Caja de ZONA_SIMULADA en UTM 19S (proyección aproximada, como bounds(1, CRS_LOCAL))"""
+        import math
+
+        anillo = ZONA_SIMULADA["coordinates"][0]
+        xs = [500000 + (p[0] + 69) * 111320 * math.cos(math.radians(p[1])) for p in anillo]
+        ys = [10000000 + p[1] * 110540 for p in anillo]
+        x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+        caja = {"type": "Polygon", "coordinates": [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]}
+        return Nodo(_desc(self.desc, "bounds", args, kwargs), valor=caja)
+
+    # --- colecciones
+    def map(self, funcion, *args, **kwargs):
+        elementos = self._valor if isinstance(self._valor, list) else []
+        resultados = [funcion(Numero(e) if isinstance(e, (int, float)) else e) for e in elementos]
+        return Lista(_desc(self.desc, "map", [len(resultados)]), resultados)
+
+    def size(self):
+        return Numero(1)
+
+    def __repr__(self):
+        return f"<ee simulado {self.desc[:60]}>"
+
+
+class Diccionario(Nodo):
+    """Resultado de reduceRegion: claves conocidas, valores sintéticos"""
+
+    def __init__(self, desc, claves, bandas=None, extra=None, histograma=None):
+        super().__init__(desc, bandas)
+        self.claves = list(claves)
+        self.extra = dict(extra or {})
+        self.histograma = histograma
+
+    def resolver(self):
+        valores = {
+            k: _histograma_sintetico(f"{self.desc}|{k}", *self.histograma)
+            if self.histograma and k.endswith("histogram") else _sintetico(f"{self.desc}|{k}")
+            for k in self.claves
+        }
+        valores.update(resolver(self.extra))
+        return valores
+
+    def get(self, clave, *args):
+        return Nodo(_desc(self.desc, "get", [clave]), valor=lambda: self.resolver().get(clave))
+
+    def contains(self, clave):
+        return Numero(clave in self.claves)
+
+    def set(self, clave, valor):
+        return Diccionario(
+            self.desc, self.claves, self.bandas, {**self.extra, clave: valor}, self.histograma
+        )
+
+    def combine(self, otro, *args):
+        return Diccionario(
+            self.desc, self.claves, self.bandas, {**self.extra, **resolver(otro)}, self.histograma
+        )
+
+
+class Numero(Nodo):
+
+    def __init__(self, valor):
+        valor = valor.resolver() if isinstance(valor, Nodo) else valor
+        super().__init__(f"Number({valor})", valor=lambda: valor)
+        self.numero = valor
+
+
+class Lista(Nodo):
+
+    def __init__(self, desc, elementos):
+        super().__init__(desc, valor=elementos)
+
+
+def _claves_reduccion(bandas, salidas):
+    # Como en GEE: con una sola salida, cada banda conserva su nombre
+    if len(salidas) == 1:
+        return list(bandas)
+    return [f"{b}_{s}" for b in bandas for s in salidas]
+
+
+def _desc(base, metodo, args=(), kwargs=None):
+    partes = [_corto(a) for a in args]
+    partes += [f"{k}={_corto(v)}" for k, v in (kwargs or {}).items()]
+    return f"{base}.{metodo}({','.join(partes)})"
+
+
+def _corto(valor):
+    # Abreviado pero sin perder la identidad: el intermediario funde las
+    # peticiones cuyo grafo serializado (aquí, desc) coincide
+    if isinstance(valor, Nodo):
+        return hashlib.sha1(valor.desc.encode("utf-8")).hexdigest()[:8]
+    if isinstance(valor, (list, tuple)):
+        texto = "[" + ",".join(_corto(v) for v in valor) + "]"
+    else:
+        texto = repr(valor)
+    if len(texto) <= 40:
+        return texto
+    return texto[:30] + "…" + hashlib.sha1(texto.encode("utf-8")).hexdigest()[:8]
+
+
+# ===============================
+# FACHADA DEL MÓDULO `ee`
+# ===============================
+class _Reductor(Nodo):
+
+    def __init__(self, desc, salidas, histograma=None, grupo=None):
+        super().__init__(desc, salidas=salidas)
+        # (mínimo, máximo, intervalos) si incluye un fixedHistogram
+        self.histograma = histograma
+        # groupName si es un reductor agrupado
+        self.grupo = grupo
+
+    def combine(self, otro, *args, **kwargs):
+        return _Reductor(
+            _desc(self.desc, "combine", [otro]), self.salidas + otro.salidas,
+            self.histograma or otro.histograma
+        )
+
+    def group(self, groupField=0, groupName="group", *args, **kwargs):
+        return _Reductor(
+            _desc(self.desc, "group", [groupField, groupName]), ["groups"],
+            grupo=(groupName, self.salidas[0])
+        )
+
+    def setOutputs(self, nombres):
+        return _Reductor(_desc(self.desc, "setOutputs", [nombres]), list(nombres))
+
+
+class Reducer:
+    mean = staticmethod(lambda: _Reductor("Reducer.mean", ["mean"]))
+    min = staticmethod(lambda: _Reductor("Reducer.min", ["min"]))
+    max = staticmethod(lambda: _Reductor("Reducer.max", ["max"]))
+    sum = staticmethod(lambda: _Reductor("Reducer.sum", ["sum"]))
+    count = staticmethod(lambda: _Reductor("Reducer.count", ["count"]))
+    stdDev = staticmethod(lambda: _Reductor("Reducer.stdDev", ["stdDev"]))
+    median = staticmethod(lambda: _Reductor("Reducer.median", ["median"]))
+    linearFit = staticmethod(lambda: _Reductor("Reducer.linearFit", ["scale", "offset"]))
+    sensSlope = staticmethod(lambda: _Reductor("Reducer.sensSlope", ["slope", "offset"]))
+
+    @staticmethod
+    def percentile(percentiles, *args, **kwargs):
+        return _Reductor(f"Reducer.percentile({percentiles})", [f"p{p}" for p in percentiles])
+
+    @staticmethod
+    def fixedHistogram(minimo, maximo, intervalos, *args, **kwargs):
+        return _Reductor(
+            f"Reducer.fixedHistogram({minimo},{maximo},{intervalos})", ["histogram"],
+            (minimo, maximo, intervalos)
+        )
+
+
+class _Fabrica:
+    """ee.Image, ee.ImageCollection... como llamables con métodos estáticos"""
+
+    def __init__(self, nombre, bandas=None):
+        self.nombre = nombre
+        self.bandas = bandas
+
+    def __call__(self, *args, **kwargs):
+        if len(args) == 1 and isinstance(args[0], Nodo) and not kwargs:
+            return args[0]
+        return Nodo(_desc(self.nombre, "new", args, kwargs), self.bandas)
+
+    def __getattr__(self, metodo):
+        if metodo.startswith("__"):
+            raise AttributeError(metodo)
+        return lambda *a, **k: Nodo(_desc(self.nombre, metodo, a, k), self.bandas)
+
+
+class _FabricaImagen(_Fabrica):
+
+    def cat(self, *imagenes):
+        imagenes = imagenes[0] if len(imagenes) == 1 and isinstance(imagenes[0], list) else imagenes
+        bandas = [b for img in imagenes for b in img.bandas]
+        return Nodo(_desc("Image", "cat", imagenes), bandas)
+
+    def constant(self, valor):
+        return Nodo(_desc("Image", "constant", [valor]), ["constant"])
+
+
+class _FabricaFeature(_Fabrica):
+
+    def __call__(self, geometria=None, propiedades=None):
+        if isinstance(geometria, Nodo) and propiedades is None:
+            return geometria
+        desc = _desc("Feature", "new", [geometria, propiedades])
+        return Nodo(desc, valor=lambda: {
+            "type": "Feature",
+            "geometry": resolver(geometria),
+            "properties": resolver(propiedades) or {},
+        })
+
+
+class _FabricaColeccion(_Fabrica):
+
+    def __call__(self, origen=None, *args):
+        if isinstance(origen, Lista) or isinstance(origen, list):
+            elementos = origen._valor if isinstance(origen, Lista) else origen
+            desc = _desc("FeatureCollection", "new", [elementos])
+            return Nodo(desc, valor=lambda: {
+                "type": "FeatureCollection",
+                "features": [resolver(e) for e in elementos],
+            })
+        if isinstance(origen, dict):
+            return Nodo(_desc("FeatureCollection", "new", [origen]), valor=origen)
+        if isinstance(origen, str):
+            return _ColeccionActivo(_desc("FeatureCollection", "new", [origen]))
+        return Nodo(_desc("FeatureCollection", "new", [origen]), valor=lambda: {
+            "type": "FeatureCollection", "features": []
+        })
+
+
+class _ColeccionActivo(Nodo):
+    """FeatureCollection de un asset: su geometría es ZONA_SIMULADA"""
+
+    def geometry(self, *args, **kwargs):
+        return Nodo(_desc(self.desc, "geometry"), valor=ZONA_SIMULADA)
+
+
+class _FabricaLista(_Fabrica):
+
+    def __call__(self, elementos):
+        if isinstance(elementos, Nodo):
+            return elementos
+        return Lista(_desc("List", "new", [elementos]), list(elementos))
+
+    def sequence(self, inicio, fin=None, paso=1, *args):
+        inicio = getattr(inicio, "numero", inicio)
+        fin = getattr(fin, "numero", fin)
+        return Lista(_desc("List", "sequence", [inicio, fin, paso]), list(range(int(inicio), int(fin) + 1, int(paso))))
+
+
+class _FabricaDiccionario(_Fabrica):
+
+    def __call__(self, origen=None):
+        if isinstance(origen, Diccionario):
+            return origen
+        return Diccionario(_desc("Dictionary", "new", [origen]), [], extra=origen or {})
+
+
+class Algorithms:
+
+    @staticmethod
+    def If(condicion, verdadero, falso=None):
+        # Se asume siempre que la condición se cumple (hay escenas, hay banda)
+        return verdadero
+
+
+class _Datos:
+
+    def computePixels(self, peticion):
+        import numpy as np
+
+        grid = peticion["grid"]["dimensions"]
+        bandas = peticion["expression"].bandas
+
+        def respuesta():
+            forma = (grid["height"], grid["width"])
+            return np.ones(forma, dtype=[(b, "<f4") for b in bandas])
+
+        return registro.ida_y_vuelta("computePixels", peticion["expression"].desc, respuesta)
+
+    def getTaskStatus(self, ids):
+        return registro.ida_y_vuelta(
+            "getTaskStatus", ",".join(ids),
+            lambda: [{"id": i, "state": _tareas.get(i, "UNKNOWN")} for i in ids]
+        )
+
+    def deleteAsset(self, asset_id):
+        return registro.ida_y_vuelta("deleteAsset", asset_id, lambda: None)
+
+    def getAsset(self, asset_id):
+        return registro.ida_y_vuelta(
+            "getAsset", asset_id, lambda: {"id": asset_id, "updateTime": "2025-01-01T00:00:00Z"}
+        )
+
+
+# Exportaciones: la tarea se da por completada en cuanto se lanza
+_tareas = {}
+
+
+class _Tarea:
+
+    def __init__(self, imagen, **parametros):
+        self.id = f"TAREA_{len(_tareas) + 1}"
+        self.desc = _desc(imagen.desc, "export", [parametros.get("assetId")])
+
+    def start(self):
+        registro.ida_y_vuelta("export", self.desc, lambda: None)
+        _tareas[self.id] = "COMPLETED"
+
+
+class _Batch:
+
+    class Export:
+
+        class image:
+
+            @staticmethod
+            def toAsset(image=None, **parametros):
+                return _Tarea(image, **parametros)
+
+
+def instalar(latencia=0.0, limite=None):
+    """Registra este módulo como `ee` en sys.modules y fija latencia y cuota"""
+    registro.latencia = latencia
+    registro.limite = limite
+
+    modulo = types.ModuleType("ee")
+    modulo.__dict__.update({
+        "EEException": EEException,
+        "Initialize": lambda *a, **k: None,
+        "Image": _FabricaImagen("Image"),
+        "ImageCollection": _Fabrica("ImageCollection"),
+        "Feature": _FabricaFeature("Feature"),
+        "FeatureCollection": _FabricaColeccion("FeatureCollection"),
+        "Geometry": _Fabrica("Geometry"),
+        "Filter": _Fabrica("Filter"),
+        "Date": _Fabrica("Date"),
+        "Number": Numero,
+        "String": _Fabrica("String"),
+        "List": _FabricaLista("List"),
+        "Dictionary": _FabricaDiccionario("Dictionary"),
+        "Reducer": Reducer,
+        "Algorithms": Algorithms,
+        "data": _Datos(),
+        "batch": _Batch,
+        "registro": registro,
+    })
+    sys.modules["ee"] = modulo
+    return modulo
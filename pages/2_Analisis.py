@@ -1,143 +1,31 @@
-import ee
+import time
 import streamlit as st
 import folium
 from streamlit_folium import st_folium
 import plotly.graph_objects as go
-from Core.gee_init import asegurar_zona_estudio 
+from Core.gee_init import asegurar_zona_estudio
+from Core.indices import INDICES, PERCENTILES
+from Core.datos import (
+    ESCALA_APROXIMADA, GRANULARIDADES, MODO_LOCAL, MODO_PROGRESIVO, NUBOSIDAD_MAX, cota_error,
+    distribucion_periodos, estadisticas_anios, estadisticas_aproximadas, estadisticas_en_cache,
+    intervalo_muestreo, registrar_diferencias, serie_periodos, serie_temporal, version_serie
+)
+from Core.cambios import (
+    CLASES, UMBRAL_GANANCIA, UMBRAL_PERDIDA, VIS_CAMBIO, VIS_DIFERENCIA, areas_cambio,
+    clasificacion, diferencia, version_cambio
+)
+from Core.concurrencia import ejecutar_concurrente, en_segundo_plano, resumen_tiempos
+from Core.exportacion import seccion_descarga
+from Core.teselas import url_imagen, url_teselas
+from Core.tendencias import (
+    VIS_ANOMALIA, VIS_TENDENCIA, anomalia_z, tendencia_lineal, tendencia_sen
+)
 
 # ===============================
 # CONTEXTO COMPARTIDO
 # ===============================
 zona_estudio = asegurar_zona_estudio()
 
-# ===============================
-# DEFINICIÓN DE ÍNDICES
-# ===============================
-INDICES = {
-    "NDVI": lambda img: img.normalizedDifference(['NIR', 'RED']),
-    "SAVI": lambda img: img.expression(
-        '(NIR - RED) / (NIR + RED + 0.5) * 1.5',
-        {'NIR': img.select('NIR'), 'RED': img.select('RED')}
-    ),
-    "EVI": lambda img: img.expression(
-        '2.5 * ((NIR - RED) / (NIR + 6 * RED - 7.5 * BLUE + 1))',
-        {
-            'NIR': img.select('NIR'),
-            'RED': img.select('RED'),
-            'BLUE': img.select('BLUE')
-        }
-    ),
-    "GNDVI": lambda img: img.normalizedDifference(['NIR', 'GREEN']),
-    "LSWI": lambda img: img.normalizedDifference(['NIR', 'SWIR1']),
-    "NDWI": lambda img: img.normalizedDifference(['GREEN', 'NIR']),
-    "MNDWI": lambda img: img.normalizedDifference(['GREEN', 'SWIR1'])
-}
-
-VIS_PARAMS = {
-    "NDVI": {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
-    "SAVI": {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
-    "EVI":  {"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
-    "GNDVI":{"min": -0.2, "max": 0.9, "palette": ["brown", "yellow", "green"]},
-    "LSWI": {"min": -0.5, "max": 0.8, "palette": ["brown", "white", "blue"]},
-    "NDWI": {"min": -0.5, "max": 0.8, "palette": ["white", "cyan", "blue"]},
-    "MNDWI":{"min": -0.5, "max": 0.8, "palette": ["white", "lightblue", "darkblue"]}
-}
-
-# ===============================
-# FUNCIONES BASE
-# ===============================
-@st.cache_data(show_spinner=False)
-def obtener_indice(anio, indice):
-    if anio <= 2011:
-        coleccion = ee.ImageCollection("LANDSAT/LE07/C02/T1_L2")
-        bandas = ["SR_B1","SR_B2","SR_B3","SR_B4","SR_B5","SR_B7"]
-    else:
-        coleccion = ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-        bandas = ["SR_B2","SR_B3","SR_B4","SR_B5","SR_B6","SR_B7"]
-
-    img = (
-        coleccion
-        .filterDate(f"{anio}-01-01", f"{anio}-12-31")
-        .filterBounds(zona_estudio)
-        .filter(ee.Filter.lt("CLOUD_COVER", 20))
-        .median()
-        .select(bandas)
-        .rename(["BLUE","GREEN","RED","NIR","SWIR1","SWIR2"])
-    )
-
-    return INDICES[indice](img).rename(indice).clip(zona_estudio)
-
-@st.cache_data(show_spinner=False)
-def estadisticas_indice(anio, indice):
-    img = obtener_indice(anio, indice)
-    stats = img.reduceRegion(
-        reducer=ee.Reducer.mean()
-        .combine(ee.Reducer.min(), "", True)
-        .combine(ee.Reducer.max(), "", True),
-        geometry=zona_estudio,
-        scale=30,
-        maxPixels=1e9
-    )
-    return stats.getInfo()
-
-@st.cache_data(show_spinner=False)
-def serie_temporal(indice, anio_inicio=2000, anio_fin=2025):
-
-    def calcular(anio):
-        anio = ee.Number(anio)
-
-        coleccion = ee.ImageCollection(
-            ee.Algorithms.If(
-                anio.lte(2011),
-                ee.ImageCollection("LANDSAT/LE07/C02/T1_L2"),
-                ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-            )
-        ).filterDate(
-            ee.Date.fromYMD(anio, 1, 1),
-            ee.Date.fromYMD(anio, 12, 31)
-        ).filterBounds(zona_estudio).filter(
-            ee.Filter.lt("CLOUD_COVER", 20)
-        )
-
-        def calc():
-            img = coleccion.median()
-            bandas = ee.List(
-                ee.Algorithms.If(
-                    anio.lte(2011),
-                    ["SR_B1","SR_B2","SR_B3","SR_B4","SR_B5","SR_B7"],
-                    ["SR_B2","SR_B3","SR_B4","SR_B5","SR_B6","SR_B7"]
-                )
-            )
-            img = img.select(bandas).rename(
-                ["BLUE","GREEN","RED","NIR","SWIR1","SWIR2"]
-            )
-            ind = INDICES[indice](img).rename(indice)
-            red = ind.reduceRegion(
-                ee.Reducer.mean(),
-                zona_estudio,
-                30,
-                maxPixels=1e9
-            )
-            return ee.Algorithms.If(red.contains(indice), red.get(indice), None)
-
-        return ee.Feature(
-            None,
-            {
-                "Año": anio,
-                "Valor": ee.Algorithms.If(coleccion.size().gt(0), calc(), None)
-            }
-        )
-
-    fc = ee.FeatureCollection(
-        ee.List.sequence(anio_inicio, anio_fin).map(calcular)
-    )
-
-    datos = fc.getInfo()
-    return [
-        {"Año": int(f["properties"]["Año"]), "Valor": f["properties"].get("Valor")}
-        for f in datos["features"]
-    ]
-
 # ===============================
 # INTERFAZ
 # ===============================
@@ -146,89 +34,318 @@ st.title("Análisis Multitemporal – Índices Landsat")
 
 with st.sidebar:
     indice = st.selectbox("Índice espectral", list(INDICES.keys()))
+    n_anios = st.slider("Años a comparar", 1, 6, 3)
     anios_sel = [
-        st.selectbox("Año 1", range(2000, 2026), index=23),
-        st.selectbox("Año 2", range(2000, 2026), index=20),
-        st.selectbox("Año 3", range(2000, 2026), index=17)
+        st.selectbox(f"Año {k + 1}", range(2000, 2026), index=max(23 - 3 * k, 0))
+        for k in range(n_anios)
     ]
     opacity = st.slider("Opacidad", 0.0, 1.0, 0.6, 0.1)
 
-serie = serie_temporal(indice)
+# ===============================
+# SERIE EN SEGUNDO PLANO
+# ===============================
+# La serie 2000–2025 se calcula de fondo: mapas y estadísticas no la
+# esperan. Las secciones que la usan son fragmentos que se refrescan solos
+# cada segundo mientras sigue en curso. La clave lleva la zona y el origen
+# de cada composición; una serie con lotes fallidos se muestra con su aviso
+# y se vuelve a pedir en la siguiente ejecución
+futuro_serie = en_segundo_plano(
+    ("serie", indice, *version_serie()), serie_temporal, indice,
+    completo=lambda valor: not valor[1]
+)
+serie_pendiente = not futuro_serie.done()
+REFRESCO = 1.0 if serie_pendiente else None
+pagina_completa = False
+
+
+def serie_lista():
+    """La serie si ya está; si no, un aviso y None"""
+    if serie_pendiente:
+        # Si termina durante un refresco del fragmento, un render completo de
+        # la página la muestra y deja los fragmentos sin refresco periódico.
+        # Dentro del propio render se mantiene el aviso aunque ya haya
+        # terminado: todas las secciones ven el mismo estado
+        if pagina_completa and futuro_serie.done():
+            st.rerun()
+        st.info("Calculando la serie temporal 2000–2025…")
+        return None
+
+    resultado = futuro_serie.result()
+    if resultado.error:
+        st.error(f"Error en la serie temporal: {resultado.error}")
+        return None
+
+    serie, fallidos = resultado.valor
+    if fallidos:
+        st.warning(
+            f"No se pudo calcular {indice} en {', '.join(fallidos)}: "
+            "esos años quedan fuera de la serie."
+        )
+    return serie
+
+
+@st.fragment(run_every=REFRESCO)
+def evolucion_rango():
+    serie = serie_lista()
+    if serie is None:
+        return
+
+    rango = [d for d in serie if d["Valor"] is not None and min(anios_sel) <= d["Año"] <= max(anios_sel)]
+    if rango:
+        st.line_chart({str(d["Año"]): d["Valor"] for d in rango})
+    else:
+        st.warning("No hay datos suficientes.")
+
 
-tab_mapas, tab_graficos = st.tabs(
-    ["Mapas y estadísticas", "Gráficos Analíticos"]
+tab_mapas, tab_graficos, tab_tendencias, tab_cambios = st.tabs(
+    ["Mapas y estadísticas", "Gráficos Analíticos", "Tendencias espaciales", "Detección de cambios"]
 )
 
 # ===============================
 # TAB 1 – MAPAS
 # ===============================
 with tab_mapas:
-    cols = st.columns(3)
+    # Rejilla de 3 columnas por fila, con huecos que se rellenan al llegar
+    # cada resultado
+    cols = [col for _ in range(0, len(anios_sel), 3) for col in st.columns(3)]
 
-    for i, (col, anio) in enumerate(zip(cols, anios_sel)):
+    huecos_mapa = []
+    huecos_stats = []
+    for col, anio in zip(cols, anios_sel):
         with col:
             st.subheader(f"{indice} – {anio}")
-            img = obtener_indice(anio, indice)
-            tiles = img.getMapId(VIS_PARAMS[indice])
+            huecos_mapa.append(st.empty())
+            huecos_stats.append(st.empty())
+
+    # Todas las peticiones a la vez: un getMapId por año y una sola
+    # petición para las estadísticas de todos los años
+    tareas = {
+        ("mapa", anio): (url_teselas, anio, indice, "2_Analisis")
+        for anio in set(anios_sel)
+    }
+    tareas[("estadisticas", tuple(anios_sel))] = (estadisticas_anios, anios_sel, indice)
+
+    # Para los años sin estadísticas exactas en caché se pide además una
+    # estimación a escala gruesa, que se muestra mientras llega la exacta
+    if MODO_PROGRESIVO and not MODO_LOCAL:
+        for anio in set(anios_sel):
+            if estadisticas_en_cache(anio, indice) is None:
+                tareas[("aproximada", anio)] = (estadisticas_aproximadas, anio)
+
+    aproximadas = {}
+    exactas = False
+
+    inicio = time.perf_counter()
+    resultados = []
+
+    for resultado in ejecutar_concurrente(tareas):
+        resultados.append(resultado)
+        tipo = resultado.nombre[0]
+
+        if tipo == "mapa":
+            anio = resultado.nombre[1]
+            destinos = [i for i, a in enumerate(anios_sel) if a == anio]
+
+            for i in destinos:
+                with huecos_mapa[i].container():
+                    if resultado.error:
+                        st.error(f"Error al generar el mapa: {resultado.error}")
+                        continue
+
+                    mapa = folium.Map(
+                        location=[-16.42, -71.54],
+                        zoom_start=11,
+                        tiles="OpenStreetMap"
+                    )
+
+                    # Clave estable por posición: índice, año y opacidad
+                    # solo cambian la capa, no el mapa
+                    capa = folium.FeatureGroup(name=f"{indice} {anio}")
+                    folium.TileLayer(
+                        tiles=resultado.valor,
+                        attr="Google Earth Engine",
+                        opacity=opacity
+                    ).add_to(capa)
+
+                    st_folium(
+                        mapa,
+                        width=450,
+                        height=380,
+                        key=f"mapa_{i}",
+                        feature_group_to_add=capa,
+                        returned_objects=[]
+                    )
+
+        elif tipo == "aproximada":
+            anio = resultado.nombre[1]
+            if resultado.error or exactas:
+                continue
+
+            stats = resultado.valor[indice]
+            aproximadas[anio] = stats
+            if stats[indice + "_mean"] is None:
+                continue
+
+            # ± solo con una cota calibrada con errores ya observados; si no,
+            # el intervalo de muestreo, rotulado como tal
+            cotas = cota_error(indice)
+            margen = {
+                s: f" ± {cotas[s]:.3f}" if cotas[s] is not None else "" for s in ("mean", "min", "max")
+            }
+            if cotas["mean"] is not None:
+                nota = f"± = percentil 95 del error observado en {cotas['comparaciones']} comparaciones con 30 m."
+            else:
+                muestreo = intervalo_muestreo(stats, indice)
+                nota = (
+                    f"IC 95 % de muestreo de la media a {ESCALA_APROXIMADA} m: ±{muestreo:.3f} "
+                    "(no acota la diferencia con el valor a 30 m)."
+                ) if muestreo is not None else ""
+
+            for i in [i for i, a in enumerate(anios_sel) if a == anio]:
+                with huecos_stats[i].container():
+                    st.markdown(
+                        f"""
+                        **Promedio:** {stats[indice+'_mean']:.3f}{margen['mean']}  
+                        **Mínimo:** {stats[indice+'_min']:.3f}{margen['min']}  
+                        **Máximo:** {stats[indice+'_max']:.3f}{margen['max']}
+                        """
+                    )
+                    st.caption(
+                        f"Provisional: estimación a {ESCALA_APROXIMADA} m, calculando a 30 m… {nota}"
+                    )
 
-            mapa = folium.Map(
-                location=[-16.42, -71.54],
-                zoom_start=11,
-                tiles="OpenStreetMap"
-            )
+        else:
+            exactas = True
+            # Cada año mostrado con estimación calibra la cota una sola vez
+            errores = {
+                anio: registrar_diferencias(aproximadas[anio], resultado.valor[anio], indice)
+                for anio in aproximadas if not resultado.error and anio in resultado.valor
+            }
+            for i, anio in enumerate(anios_sel):
+                if resultado.error:
+                    huecos_stats[i].error(f"Error en estadísticas: {resultado.error}")
+                    continue
+
+                stats = resultado.valor[anio]
+                with huecos_stats[i].container():
+                    st.markdown(
+                        f"""
+                        **Promedio:** {stats[indice+'_mean']:.3f}  
+                        **Mínimo:** {stats[indice+'_min']:.3f}  
+                        **Máximo:** {stats[indice+'_max']:.3f}
+                        """
+                    )
+
+                    # Error que tuvo la estimación provisional, si se mostró
+                    if anio in errores:
+                        error = errores[anio]
+                        partes = [
+                            f"{nombre} {error[s]:.4f}"
+                            for s, nombre in (("mean", "media"), ("min", "mínimo"), ("max", "máximo"))
+                            if error[s] is not None
+                        ]
+                        if partes:
+                            st.caption(
+                                f"Error de la estimación a {ESCALA_APROXIMADA} m: " + ", ".join(partes)
+                            )
+
+    with st.expander("Tiempos de consulta"):
+        st.dataframe(
+            resumen_tiempos(resultados, time.perf_counter() - inicio),
+            use_container_width=True
+        )
 
-            folium.TileLayer(
-                tiles=tiles["tile_fetcher"].url_format,
-                attr="Google Earth Engine",
-                opacity=opacity
-            ).add_to(mapa)
-
-            st_folium(
-                mapa,
-                width=450,
-                height=380,
-                key=f"mapa_{indice}_{anio}_{i}"
-            )   
-
-            stats = estadisticas_indice(anio, indice)
-            st.markdown(
-                f"""
-                **Promedio:** {stats[indice+'_mean']:.3f}  
-                **Mínimo:** {stats[indice+'_min']:.3f}  
-                **Máximo:** {stats[indice+'_max']:.3f}
-                """
-            )
+    with st.expander("Descargar rásteres"):
+        anio_descarga = st.selectbox("Año a descargar", sorted(set(anios_sel)))
+        seccion_descarga(anio_descarga, indice, "analisis")
 
     st.divider()
     st.subheader("Evolución temporal (rango seleccionado)")
-
-    rango = [d for d in serie if d["Valor"] is not None and min(anios_sel) <= d["Año"] <= max(anios_sel)]
-    if rango:
-        st.line_chart({str(d["Año"]): d["Valor"] for d in rango})
-    else:
-        st.warning("No hay datos suficientes.")
+    evolucion_rango()
 
 # ===============================
 # TAB 2 – GRÁFICOS ANALÍTICOS
 # ===============================
-with tab_graficos:
+@st.fragment(run_every=REFRESCO)
+def graficos_analiticos():
     st.subheader(f"Evolución temporal del {indice}")
+
+    serie = serie_lista()
+    if serie is None:
+        return
+
     completos = [d for d in serie if d["Valor"] is not None]
-    st.line_chart({str(d["Año"]): d["Valor"] for d in completos})
+
+    granularidad = st.radio(
+        "Granularidad", GRANULARIDADES, horizontal=True, format_func=str.capitalize
+    )
+
+    if granularidad == "anual":
+        st.line_chart({str(d["Año"]): d["Valor"] for d in completos})
+    else:
+        # Serie por lotes: el gráfico se redibuja cada vez que llega uno
+        grafico = st.empty()
+        aviso = st.empty()
+        aviso.caption("Calculando composiciones por lotes…")
+
+        for parcial, fallidos in serie_periodos(indice, granularidad):
+            con_valor = {d["Periodo"]: d["Valor"] for d in parcial if d["Valor"] is not None}
+            if con_valor:
+                grafico.line_chart(con_valor)
+
+        aviso.caption(
+            f"Los periodos sin escenas con menos del {NUBOSIDAD_MAX} % de nubes quedan sin valor."
+        )
+        if fallidos:
+            st.warning(
+                f"No se pudo calcular {indice} en {len(fallidos)} periodos "
+                f"({', '.join(fallidos)}): quedan fuera de la serie."
+            )
 
     st.divider()
     st.subheader(f"Distribución del {indice} por periodos")
 
+    # Cajas de los píxeles de todos los años del periodo, no de sus medias
+    # anuales: se montan sumando los histogramas anuales ya guardados
+    grupos = {"2000–2006": (2000, 2006), "2007–2012": (2007, 2012), "2013–2025": (2013, 2025)}
+    colores_grupo = {"2000–2006": "red", "2007–2012": "orange", "2013–2025": "green"}
+
+    # Un lote fallido no deja cajas a medias (ver distribucion_periodos):
+    # sin distribución se omite la gráfica y sigue el resto de la página
+    try:
+        distribucion = distribucion_periodos(indice, grupos)
+    except Exception as e:
+        st.error(f"Error en la distribución por periodos: {e}")
+        distribucion = None
+
+    if distribucion is not None:
+        fig = go.Figure()
+        for nombre, d in distribucion.items():
+            if d is None:
+                continue
+            fig.add_trace(go.Box(
+                x=[nombre], name=nombre, marker_color=colores_grupo[nombre],
+                lowerfence=[d["p5"]], q1=[d["p25"]], median=[d["p50"]],
+                q3=[d["p75"]], upperfence=[d["p95"]],
+                hovertext=f"{d['pixeles']:,} píxeles en {d['anios']} años"
+            ))
+
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption("Caja: percentiles 25–75 y mediana de los píxeles; bigotes: percentiles 5 y 95.")
+
+        with st.expander("Percentiles por año"):
+            por_anio = estadisticas_anios([d["Año"] for d in completos], indice, distribucion=True)
+            st.dataframe(
+                [
+                    {"Año": anio, **{f"p{p}": s.get(f"{indice}_p{p}") for p in PERCENTILES}}
+                    for anio, s in sorted(por_anio.items())
+                ],
+                use_container_width=True
+            )
+
     anios = [d["Año"] for d in completos]
     valores = [d["Valor"] for d in completos]
 
-    fig = go.Figure()
-    fig.add_trace(go.Box(y=[v for a,v in zip(anios,valores) if a<=2006], name="2000–2006", marker_color="red"))
-    fig.add_trace(go.Box(y=[v for a,v in zip(anios,valores) if 2007<=a<=2012], name="2007–2012", marker_color="orange"))
-    fig.add_trace(go.Box(y=[v for a,v in zip(anios,valores) if a>=2013], name="2013–2025", marker_color="green"))
-
-    st.plotly_chart(fig, use_container_width=True)
-
     st.divider()
     st.subheader(f"Análisis de anomalías del {indice}")
 
@@ -276,3 +393,155 @@ with tab_graficos:
         """
     )
 
+
+with tab_graficos:
+    graficos_analiticos()
+
+# ===============================
+# TAB 3 – TENDENCIAS ESPACIALES
+# ===============================
+# Fragmento: cambiar de capa o activarla solo vuelve a ejecutar esta pestaña
+@st.fragment
+def tendencias_espaciales():
+    st.subheader(f"Tendencias y anomalías del {indice} por píxel (2000–2025)")
+
+    capa = st.radio(
+        "Capa",
+        ["Tendencia lineal", "Tendencia robusta (Sen)", "Anomalía (z)"],
+        horizontal=True
+    )
+
+    # Las pestañas se ejecutan todas en cada render: la capa solo se pide
+    # a GEE cuando el usuario la activa
+    if not st.toggle("Mostrar capa", value=False):
+        st.info("Activa la capa para calcularla (una reducción sobre los 26 años).")
+    else:
+        if capa == "Anomalía (z)":
+            anio_anomalia = st.selectbox("Año de la anomalía", range(2000, 2026), index=23)
+            img = anomalia_z(anio_anomalia, indice)
+            vis = VIS_ANOMALIA
+            clave = ("anomalia", indice, anio_anomalia)
+            st.caption("Desviaciones típicas respecto a la media 2000–2025 de cada píxel.")
+        else:
+            ajuste = tendencia_lineal(indice) if capa == "Tendencia lineal" else tendencia_sen(indice)
+            img = ajuste.select("pendiente")
+            vis = VIS_TENDENCIA
+            clave = ("tendencia", indice, capa)
+            st.caption(f"Pendiente en unidades de {indice} por año: verde aumenta, rojo disminuye.")
+
+        url = url_imagen(clave, img, vis, "2_Analisis", capa=capa, indice=indice)
+
+        mapa = folium.Map(
+            location=[-16.42, -71.54],
+            zoom_start=11,
+            tiles="OpenStreetMap"
+        )
+
+        capa_folium = folium.FeatureGroup(name=capa)
+        folium.TileLayer(
+            tiles=url,
+            attr="Google Earth Engine",
+            opacity=opacity
+        ).add_to(capa_folium)
+
+        st_folium(
+            mapa,
+            width=1200,
+            height=550,
+            key="tendencia",
+            feature_group_to_add=capa_folium,
+            returned_objects=[]
+        )
+
+
+with tab_tendencias:
+    tendencias_espaciales()
+
+# ===============================
+# TAB 4 – DETECCIÓN DE CAMBIOS
+# ===============================
+@st.fragment
+def deteccion_cambios():
+    st.subheader(f"Cambios del {indice} entre dos años")
+
+    col_inicial, col_final = st.columns(2)
+    with col_inicial:
+        anio_inicial = st.selectbox("Año inicial", range(2000, 2026), index=13)
+        umbral_perdida = st.slider("Umbral de pérdida", 0.0, 0.5, UMBRAL_PERDIDA, 0.01)
+    with col_final:
+        anio_final = st.selectbox("Año final", range(2000, 2026), index=23)
+        umbral_ganancia = st.slider("Umbral de ganancia", 0.0, 0.5, UMBRAL_GANANCIA, 0.01)
+
+    capa = st.radio("Capa de cambios", ["Clasificación", "Diferencia"], horizontal=True)
+
+    if anio_inicial == anio_final:
+        st.warning("Elige dos años distintos.")
+        return
+
+    if not st.toggle("Calcular cambios", value=False):
+        st.info("Activa el cálculo para pedir a GEE la capa y las hectáreas por clase.")
+        return
+
+    # Como la tabla de hectáreas: al materializarse un año o cambiar la zona,
+    # la capa también se vuelve a pedir
+    version = version_cambio(anio_inicial, anio_final)
+    if capa == "Clasificación":
+        img = clasificacion(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia)
+        vis = VIS_CAMBIO
+        clave = ("cambio", indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia, *version)
+        st.caption(
+            f"Rojo: {indice} baja más de {umbral_perdida}; verde: sube más de "
+            f"{umbral_ganancia}; gris: estable."
+        )
+    else:
+        img = diferencia(indice, anio_inicial, anio_final)
+        vis = VIS_DIFERENCIA
+        clave = ("diferencia", indice, anio_inicial, anio_final, *version)
+        st.caption(f"{indice} de {anio_final} menos {indice} de {anio_inicial}.")
+
+    url = url_imagen(clave, img, vis, "2_Analisis", capa=capa, indice=indice)
+
+    mapa = folium.Map(
+        location=[-16.42, -71.54],
+        zoom_start=11,
+        tiles="OpenStreetMap"
+    )
+
+    capa_folium = folium.FeatureGroup(name=capa)
+    folium.TileLayer(
+        tiles=url,
+        attr="Google Earth Engine",
+        opacity=opacity
+    ).add_to(capa_folium)
+
+    st_folium(
+        mapa,
+        width=1200,
+        height=550,
+        key="cambios",
+        feature_group_to_add=capa_folium,
+        returned_objects=[]
+    )
+
+    st.markdown(f"**Superficie por clase ({anio_inicial} → {anio_final})**")
+    try:
+        tabla = areas_cambio(indice, anio_inicial, anio_final, umbral_perdida, umbral_ganancia)
+    except Exception as e:
+        st.error(f"Error en las hectáreas por clase: {e}")
+        return
+
+    columnas = st.columns(len(CLASES))
+    for columna, fila in zip(columnas, tabla):
+        columna.metric(
+            fila["Clase"], f"{fila['Hectáreas']:,.1f} ha",
+            f"{fila['Porcentaje']} %" if fila["Porcentaje"] is not None else None,
+            delta_color="off"
+        )
+    st.dataframe(tabla, use_container_width=True)
+
+
+with tab_cambios:
+    deteccion_cambios()
+
+# A partir de aquí solo se ejecutan los refrescos de los fragmentos
+pagina_completa = True
@@ -0,0 +1,111 @@
+import streamlit as st
+from Core import trazas
+from Core.cache import obtener_cache
+from Core.intermediario import exportar_prometheus, intermediario
+
+# ===============================
+# INTERFAZ
+# ===============================
+st.title("Diagnóstico – Llamadas a Earth Engine")
+
+st.markdown("""
+Trazas de las llamadas remotas (`getInfo`, `getMapId`, `computePixels`) y de
+las consultas al almacén persistente hechas por este proceso, desde su inicio.
+""")
+
+resumen = trazas.resumen()
+recientes = trazas.trazas()
+
+# ===============================
+# ALMACÉN PERSISTENTE
+# ===============================
+cache = obtener_cache().estadisticas()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Aciertos", cache["aciertos"])
+col2.metric("Fallos", cache["fallos"])
+col3.metric("Tasa de aciertos", f"{cache['tasa_aciertos']:.1%}")
+col4.metric("Entradas", f"{cache['entradas']} ({cache['bytes'] / 2**20:.1f} MB)")
+
+# ===============================
+# INTERMEDIARIO DE PETICIONES
+# ===============================
+st.subheader("Cola de peticiones a GEE")
+
+metricas = intermediario().metricas()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric(
+    "En curso", f"{metricas['en_curso']} / {metricas['limite']}",
+    help=f"Máximo observado: {metricas['max_en_curso']}"
+)
+col2.metric("En cola", metricas["en_cola"], help=f"Máximo observado: {metricas['max_cola']}")
+col3.metric(
+    "Fusionadas", metricas["fusionadas"],
+    help="Peticiones idénticas a otra en vuelo que esperaron su resultado"
+)
+col4.metric(
+    "Reintentos", metricas["reintentos"],
+    help=f"{metricas['transitorios']} errores transitorios (429/5xx), "
+         f"{metricas['fallidas']} peticiones agotaron los reintentos"
+)
+
+# ===============================
+# RESUMEN POR TIPO DE LLAMADA
+# ===============================
+st.subheader("Percentiles por tipo de llamada")
+
+if resumen:
+    st.dataframe(resumen, use_container_width=True)
+else:
+    st.info("Todavía no se ha registrado ninguna llamada.")
+
+# ===============================
+# ÚLTIMAS LLAMADAS
+# ===============================
+st.subheader("Últimas llamadas")
+
+tipos = sorted({t.tipo for t in recientes})
+filtro = st.multiselect("Tipo", tipos, default=[t for t in tipos if t != "cache"])
+solo_errores = st.checkbox("Solo errores")
+
+filas = [
+    {
+        "tipo": t.tipo,
+        "funcion": t.funcion,
+        "argumentos": str(t.argumentos),
+        "duracion_s": round(t.duracion, 4),
+        "bytes": t.bytes,
+        "cache": t.cache,
+        "error": t.error,
+    }
+    for t in reversed(recientes)
+    if t.tipo in filtro and (t.error or not solo_errores)
+][:500]
+
+st.dataframe(filas, use_container_width=True)
+
+# ===============================
+# EXPORTACIÓN
+# ===============================
+col_json, col_prom, col_limpiar = st.columns(3)
+
+with col_json:
+    st.download_button(
+        "Descargar JSON",
+        trazas.exportar_json(),
+        file_name="trazas_gee.json",
+        mime="application/json"
+    )
+
+with col_prom:
+    st.download_button(
+        "Descargar métricas Prometheus",
+        trazas.exportar_prometheus() + exportar_prometheus(),
+        file_name="metricas_gee.prom",
+        mime="text/plain"
+    )
+
+with col_limpiar:
+    if st.button("Vaciar trazas"):
+        trazas.limpiar()
+        intermediario().reiniciar_metricas()
+        st.rerun()
@@ -0,0 +1,88 @@
+import io
+import streamlit as st
+from Core.gee_init import asegurar_zona_estudio
+from Core.indices import INDICES
+from Core.zonal import campos_geojson, estadisticas_zonales, leer_geojson
+
+# ===============================
+# INICIALIZACIÓN Y CONTEXTO
+# ===============================
+zona_estudio = asegurar_zona_estudio()
+
+# ===============================
+# INTERFAZ
+# ===============================
+st.title("Estadísticas Zonales – Subzonas de la cuenca")
+
+st.markdown("""
+Media, mínimo, máximo y número de píxeles del índice por zona (distritos,
+subcuencas...) y año. Todas las zonas se reducen en una sola petición a
+Earth Engine, o en unas pocas si son cientos.
+""")
+
+with st.sidebar:
+    indice = st.selectbox("Índice espectral", list(INDICES.keys()))
+    anios = st.multiselect("Años", list(range(2000, 2026)), default=[2023])
+    origen = st.radio("Zonas", ["Archivo GeoJSON", "Asset de GEE"])
+
+zonas = None
+campo = None
+
+if origen == "Archivo GeoJSON":
+    archivo = st.file_uploader("GeoJSON con las zonas", type=["geojson", "json"])
+    if archivo is not None:
+        datos = archivo.getvalue()
+        campos = campos_geojson(datos)
+        campo = st.selectbox("Campo con el nombre de la zona", ["(orden)"] + campos)
+        campo = None if campo == "(orden)" else campo
+        zonas = leer_geojson(datos, campo)
+        st.caption(f"{len(zonas)} zonas")
+else:
+    asset = st.text_input("Id del asset (FeatureCollection)")
+    campo = st.text_input("Propiedad con el nombre de la zona") or None
+    zonas = asset or None
+
+# ===============================
+# CÁLCULO
+# ===============================
+# El resultado se guarda en la sesión: las descargas vuelven a ejecutar la
+# página y la tabla debe seguir ahí
+if st.button("Calcular", disabled=not zonas or not anios):
+    with st.spinner("Reduciendo todas las zonas en Earth Engine..."):
+        try:
+            st.session_state["tabla_zonal"] = estadisticas_zonales(zonas, indice, anios, campo)
+        except Exception as e:
+            st.error(f"Error en las estadísticas zonales: {e}")
+
+tabla = st.session_state.get("tabla_zonal")
+
+if tabla is not None and not tabla.empty:
+    st.subheader(f"{tabla['indice'].iloc[0]} por zona")
+    st.dataframe(tabla, use_container_width=True)
+
+    st.subheader("Media por zona y año")
+    st.dataframe(
+        tabla.pivot_table(index="zona", columns="anio", values="mean", sort=False),
+        use_container_width=True
+    )
+
+    parquet = io.BytesIO()
+    tabla.to_parquet(parquet, index=False)
+
+    col_csv, col_parquet = st.columns(2)
+    with col_csv:
+        st.download_button(
+            "Descargar CSV",
+            tabla.to_csv(index=False),
+            file_name="estadisticas_zonales.csv",
+            mime="text/csv"
+        )
+    with col_parquet:
+        st.download_button(
+            "Descargar Parquet",
+            parquet.getvalue(),
+            file_name="estadisticas_zonales.parquet",
+            mime="application/octet-stream"
+        )
+elif tabla is not None:
+    st.warning("La consulta no devolvió ninguna zona.")
@@ -0,0 +1,13 @@
+"""
+Las pruebas corren contra el backend simulado de benchmarks/ee_simulado.py
+(sin latencia) y con una caché en un directorio temporal: se instalan antes
+de importar nada de Core.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("LANDSAT_CACHE_DIR", tempfile.mkdtemp(prefix="landsat_pruebas_"))
+
+from benchmarks import ee_simulado  # noqa: E402
+
+ee_simulado.instalar(0.0)
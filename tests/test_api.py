@@ -0,0 +1,53 @@
+import json
+
+from tornado.testing import AsyncHTTPTestCase
+
+from Core import teselas
+from Core.api import MAX_EDAD, crear_aplicacion
+
+
+class PruebaApi(AsyncHTTPTestCase):
+
+    def get_app(self):
+        return crear_aplicacion()
+
+    def test_respuesta_con_etag_y_304_al_repetirla(self):
+        respuesta = self.fetch("/api/estadisticas?indices=NDVI,EVI&anios=2018-2019")
+        self.assertEqual(respuesta.code, 200)
+        datos = json.loads(respuesta.body)
+        self.assertEqual(sorted(datos), ["EVI", "NDVI"])
+        self.assertEqual(sorted(datos["NDVI"]), ["2018", "2019"])
+        etag = respuesta.headers["ETag"]
+
+        repetida = self.fetch(
+            "/api/estadisticas?indices=EVI,ndvi&anios=2018,2019",
+            headers={"If-None-Match": etag}
+        )
+        self.assertEqual(repetida.code, 304)
+        self.assertEqual(repetida.body, b"")
+
+    def test_parametros_no_validos_dan_400_en_json(self):
+        for consulta in (
+            "/api/estadisticas?indices=FOO&anios=2018",
+            "/api/estadisticas?indices=NDVI&anios=1990",
+            "/api/estadisticas?indices=NDVI",
+            "/api/serie?indices=NDVI&inicio=2020&fin=2010",
+        ):
+            respuesta = self.fetch(consulta)
+            self.assertEqual(respuesta.code, 400, consulta)
+            self.assertTrue(respuesta.headers["Content-Type"].startswith("application/json"))
+            self.assertIn("error", json.loads(respuesta.body))
+
+    def test_mapas_no_se_sirven_mas_alla_de_su_map_id(self):
+        # Plantilla memorizada hace casi TTL_MAP_ID: le quedan 60 segundos
+        teselas.url_map_id("NDVI", 2020)
+        memoria = teselas.map_ids()
+        clave = teselas._clave_map_id("NDVI", 2020)
+        plantilla, instante = memoria._plantillas[clave]
+        memoria._plantillas[clave] = (plantilla, instante - memoria.ttl + 60)
+
+        respuesta = self.fetch("/api/mapas?indices=NDVI&anios=2020")
+        self.assertEqual(respuesta.code, 200)
+        max_edad = int(respuesta.headers["Cache-Control"].rsplit("=", 1)[1])
+        self.assertLessEqual(max_edad, 60)
+        self.assertLess(max_edad, MAX_EDAD["mapas"])
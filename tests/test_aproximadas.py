@@ -0,0 +1,26 @@
+import pytest
+
+from Core.datos import MIN_COMPARACIONES, cota_error, intervalo_muestreo, registrar_diferencias
+
+
+def test_cota_calibrada_con_los_errores_observados():
+    indice = "LSWI"
+    assert cota_error(indice)["mean"] is None
+
+    for k in range(1, MIN_COMPARACIONES + 12):
+        aproximadas = {f"{indice}_mean": 0.30, f"{indice}_min": -0.1, f"{indice}_max": None}
+        exactas = {f"{indice}_mean": 0.30 + k / 1000, f"{indice}_min": -0.2, f"{indice}_max": 0.8}
+        registrar_diferencias(aproximadas, exactas, indice)
+
+    cotas = cota_error(indice)
+    assert cotas["comparaciones"] == MIN_COMPARACIONES + 11
+    # Percentil 95 de 0.001 … 0.019
+    assert cotas["mean"] == pytest.approx(0.019)
+    assert cotas["min"] == pytest.approx(0.1)
+    assert cotas["max"] is None
+
+
+def test_intervalo_de_muestreo():
+    stats = {"NDVI_stdDev": 0.2, "NDVI_count": 400}
+    assert intervalo_muestreo(stats, "NDVI") == pytest.approx(1.96 * 0.2 / 20)
+    assert intervalo_muestreo({"NDVI_stdDev": None, "NDVI_count": 0}, "NDVI") is None
@@ -0,0 +1,21 @@
+import types
+
+from Core import cambios, materializado
+
+
+def test_capa_y_tabla_cambian_con_el_origen_de_la_composicion(monkeypatch):
+    listos = {}
+    monkeypatch.setattr(materializado, "MATERIALIZAR", True)
+    monkeypatch.setattr(materializado, "_registro", types.SimpleNamespace(
+        origen=lambda anio, id_esperado: listos.get(anio)
+    ))
+
+    capa = cambios.clasificacion("NDVI", 2013, 2023).serialize()
+    clave = cambios._clave("NDVI", 2013, 2023, 0.1, 0.1)
+    assert cambios.clasificacion("NDVI", 2013, 2023).serialize() == capa
+
+    # 2023 pasa a leerse de su asset materializado
+    listos[2023] = "composiciones/composicion_2023"
+    assert cambios.clasificacion("NDVI", 2013, 2023).serialize() != capa
+    assert cambios._clave("NDVI", 2013, 2023, 0.1, 0.1) != clave
+    assert "composiciones/composicion_2023" in cambios.version_cambio(2013, 2023)
@@ -0,0 +1,25 @@
+from Core.concurrencia import en_segundo_plano
+
+
+def test_serie_con_lotes_fallidos_se_entrega_y_despues_se_relanza():
+    llamadas = []
+
+    def serie(indice):
+        llamadas.append(indice)
+        return [], ["2004"] if len(llamadas) == 1 else []
+
+    def pedir():
+        return en_segundo_plano(
+            ("prueba", "NDVI"), serie, "NDVI", completo=lambda valor: not valor[1]
+        )
+
+    fallida = pedir()
+    assert fallida.result().valor == ([], ["2004"])
+    # La ejecución que la ve terminada la recibe para avisar del fallo
+    assert pedir() is fallida
+    # La siguiente la vuelve a pedir y se queda con la completa
+    completa = pedir()
+    assert completa is not fallida
+    assert completa.result().valor == ([], [])
+    assert pedir() is completa
+    assert llamadas == ["NDVI", "NDVI"]
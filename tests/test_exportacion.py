@@ -0,0 +1,34 @@
+import numpy as np
+from PIL import Image
+
+from benchmarks.ee_simulado import registro
+from Core import exportacion
+from Core.concurrencia import ejecutar_concurrente
+
+
+def test_geotiff_en_teselas_con_vistas_generales():
+    manifiesto = exportacion.exportar_indice(2019, "NDVI", 30)
+    ruta = exportacion.escribir_geotiff(2019, "NDVI", 30)
+
+    imagen = Image.open(ruta)
+    for nivel in range(manifiesto["niveles"] + 1):
+        imagen.seek(nivel)
+        assert imagen.tag_v2[322] == exportacion.TESELA_GEOTIFF
+        assert imagen.tag_v2[254] == (1 if nivel else 0)
+        np.testing.assert_array_equal(
+            np.asarray(imagen), exportacion.leer_nivel(2019, "NDVI", 30, nivel)
+        )
+    imagen.seek(0)
+    assert imagen.size == (manifiesto["ancho"], manifiesto["alto"])
+    assert imagen.tag_v2[33922][3:5] == (manifiesto["x0"], manifiesto["y1"])
+
+
+def test_exportaciones_simultaneas_descargan_cada_tesela_una_vez():
+    antes = registro.contar("computePixels")
+    tareas = {i: (exportacion.exportar_indice, 2021, "EVI", 30) for i in range(3)}
+    resultados = list(ejecutar_concurrente(tareas))
+
+    assert all(r.error is None for r in resultados)
+    manifiesto = resultados[0].valor
+    assert manifiesto["terminado"]
+    assert registro.contar("computePixels") - antes == len(exportacion._teselas(manifiesto))
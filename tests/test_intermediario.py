@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ee
+
+from benchmarks import ee_simulado
+from Core.intermediario import Intermediario
+
+
+def _en_paralelo(funciones):
+    with ThreadPoolExecutor(len(funciones)) as pool:
+        return [f.result() for f in [pool.submit(funcion) for funcion in funciones]]
+
+
+def test_reintenta_cada_429_de_la_cuota(monkeypatch):
+    monkeypatch.setattr(ee_simulado.registro, "latencia", 0.02)
+    monkeypatch.setattr(ee_simulado.registro, "limite", 2)
+    rechazadas = ee_simulado.registro.rechazadas
+    random.seed(0)
+
+    intermediario = Intermediario(
+        max_peticiones=8, max_reintentos=20, espera_base=0.005, espera_maxima=0.05
+    )
+    objetos = [ee.Image(f"reintento_{i}").reduceRegion(ee.Reducer.mean()) for i in range(6)]
+    _en_paralelo([lambda o=o: intermediario.ejecutar(None, o.getInfo) for o in objetos])
+
+    metricas = intermediario.metricas()
+    rechazadas = ee_simulado.registro.rechazadas - rechazadas
+    assert rechazadas > 0
+    assert metricas["peticiones"] == 6
+    assert metricas["transitorios"] == metricas["reintentos"] == rechazadas
+    assert metricas["fallidas"] == 0
+
+
+def test_funde_peticiones_identicas_en_vuelo():
+    intermediario = Intermediario()
+    liberar = threading.Event()
+    llamadas = []
+
+    def llamada():
+        llamadas.append(1)
+        liberar.wait(5)
+        return "resultado"
+
+    def esperar_y_liberar():
+        # Las demás llegan mientras la primera sigue en vuelo
+        limite = time.time() + 5
+        while intermediario.metricas()["fusionadas"] < 4 and time.time() < limite:
+            time.sleep(0.001)
+        liberar.set()
+
+    resultados = _en_paralelo(
+        [lambda: intermediario.ejecutar("misma", llamada) for _ in range(5)] + [esperar_y_liberar]
+    )
+
+    assert resultados[:5] == ["resultado"] * 5
+    assert len(llamadas) == 1
+    metricas = intermediario.metricas()
+    assert metricas["peticiones"] == 1
+    assert metricas["fusionadas"] == 4
+    assert metricas["en_vuelo"] == 0
+
+
+def test_no_supera_el_tope_de_peticiones_simultaneas():
+    intermediario = Intermediario(max_peticiones=3)
+    lock = threading.Lock()
+    simultaneas = {"ahora": 0, "maximo": 0}
+
+    def llamada():
+        with lock:
+            simultaneas["ahora"] += 1
+            simultaneas["maximo"] = max(simultaneas["maximo"], simultaneas["ahora"])
+        time.sleep(0.02)
+        with lock:
+            simultaneas["ahora"] -= 1
+
+    _en_paralelo([lambda: intermediario.ejecutar(None, llamada) for _ in range(10)])
+
+    metricas = intermediario.metricas()
+    assert simultaneas["maximo"] == metricas["max_en_curso"] == 3
+    assert metricas["max_cola"] > 0
+    assert metricas["en_curso"] == metricas["en_cola"] == 0
+
+
+def test_reiniciar_no_hace_retroceder_los_totales():
+    intermediario = Intermediario()
+    for i in range(3):
+        intermediario.ejecutar(("clave", i), lambda: None)
+
+    intermediario.reiniciar_metricas()
+    intermediario.ejecutar(("clave", 3), lambda: None)
+
+    assert intermediario.metricas()["peticiones"] == 1
+    assert intermediario.totales()["peticiones"] == 4
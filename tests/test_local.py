@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from Core.indices import NOMBRES_INDICES, PERCENTILES
+from Core.kernel import indice_directo, indices_fusionados, reservar_salidas
+from Core.local import BANDAS, AlmacenBandas, MotorLocal, _resumir
+
+# Reflectancias de un píxel de vegetación y sus índices calculados a mano
+PIXEL = {"BLUE": 0.05, "GREEN": 0.2, "RED": 0.1, "NIR": 0.5, "SWIR1": 0.3, "SWIR2": 0.25}
+ESPERADOS = {
+    "NDVI": 0.4 / 0.6,
+    "SAVI": 0.4 / 1.1 * 1.5,
+    "EVI": 2.5 * 0.4 / 1.725,
+    "GNDVI": 0.3 / 0.7,
+    "LSWI": 0.2 / 0.8,
+    "NDWI": -0.3 / 0.7,
+    "MNDWI": -0.1 / 0.5,
+}
+
+
+def _cubo(alto=4, ancho=5):
+    cubo = np.stack([np.full((alto, ancho), PIXEL[b], dtype=np.float32) for b in BANDAS])
+    cubo[:, 0, :] = np.nan  # fila fuera de la zona
+    return cubo
+
+
+@pytest.fixture
+def motor(tmp_path):
+    almacen = AlmacenBandas(str(tmp_path))
+    almacen.guardar(2020, _cubo())
+    return MotorLocal(almacen)
+
+
+def test_estadisticas_de_valores_conocidos(motor):
+    stats = motor.estadisticas_todos(2020)
+
+    assert set(stats) == set(NOMBRES_INDICES)
+    for nombre, valor in ESPERADOS.items():
+        s = stats[nombre]
+        for clave in ["mean", "min", "max"] + [f"p{p}" for p in PERCENTILES]:
+            assert s[f"{nombre}_{clave}"] == pytest.approx(valor, abs=1e-6)
+        # 3 filas válidas × 5 columnas, todas en el mismo intervalo
+        assert sum(s[f"{nombre}_histogram"]) == 15
+        assert max(s[f"{nombre}_histogram"]) == 15
+
+
+def test_estadisticas_ignoran_pixeles_sin_dato_y_denominadores_nulos(tmp_path):
+    cubo = _cubo()
+    cubo[BANDAS.index("NIR"), 1, :] = 0.3  # NDVI = 0.2/0.4 = 0.5 en la fila 1
+    cubo[[BANDAS.index("NIR"), BANDAS.index("RED")], 2, 0] = 0  # 0/0: sin dato
+
+    almacen = AlmacenBandas(str(tmp_path))
+    almacen.guardar(2020, cubo)
+    ndvi = MotorLocal(almacen).estadisticas_todos(2020)["NDVI"]
+
+    # 14 píxeles válidos: 5 con 0.5 y 9 con 2/3
+    assert ndvi["NDVI_min"] == pytest.approx(0.5, abs=1e-6)
+    assert ndvi["NDVI_max"] == pytest.approx(0.4 / 0.6, abs=1e-6)
+    assert ndvi["NDVI_mean"] == pytest.approx((5 * 0.5 + 9 * 0.4 / 0.6) / 14, abs=1e-6)
+    assert sum(ndvi["NDVI_histogram"]) == 14
+
+
+def test_indice_suelto_coincide_con_la_pasada_conjunta(motor):
+    todos = motor.indices(2020)
+    for nombre in NOMBRES_INDICES:
+        np.testing.assert_array_equal(motor.indice(2020, nombre), todos[nombre])
+
+
+def test_kernel_coincide_con_las_formulas_directas():
+    rng = np.random.default_rng(0)
+    bandas = {b: rng.uniform(0.0, 0.6, size=(64, 64)).astype(np.float32) for b in BANDAS}
+    bandas["NIR"][0, :3] = np.nan
+
+    salidas = indices_fusionados(bandas, reservar_salidas((64, 64)), bloque=1000)
+    for nombre in NOMBRES_INDICES:
+        np.testing.assert_allclose(
+            salidas[nombre], indice_directo(bandas, nombre), rtol=1e-5, atol=1e-6, equal_nan=True
+        )
+
+
+def test_motor_sin_bandas_ni_descarga(motor):
+    with pytest.raises(KeyError):
+        motor.estadisticas_todos(1999)
+    with pytest.raises(ValueError):
+        motor.indice(2020, "NBR")
+
+
+def test_histograma_cuenta_savi_y_evi_fuera_de_menos_uno_a_uno():
+    from Core.datos import cuantiles_histograma
+
+    rng = np.random.default_rng(0)
+    savi = rng.uniform(-1.4, 1.4, 10000).astype(np.float32)
+    # EVI sin cota: colas muy por fuera de su rango, que caen en los extremos
+    evi = np.concatenate([
+        rng.normal(0.4, 0.3, 9000), np.full(500, 40.0), np.full(500, -40.0)
+    ]).astype(np.float32)
+
+    for indice, valores in (("SAVI", savi), ("EVI", evi)):
+        stats = _resumir(indice, valores)
+        histograma = stats[f"{indice}_histogram"]
+        minimo, maximo = stats[f"{indice}_histogram_rango"]
+        assert minimo < -1 and maximo > 1
+        assert sum(histograma) == valores.size
+
+        ancho = (maximo - minimo) / len(histograma)
+        cuantiles = cuantiles_histograma(histograma, [25, 50, 75], (minimo, maximo))
+        for q, valor in cuantiles.items():
+            assert abs(valor - stats[f"{indice}_p{q}"]) <= ancho
+
+    assert _resumir("EVI", evi)["EVI_histogram"][-1] >= 500
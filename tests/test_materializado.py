@@ -0,0 +1,43 @@
+import pytest
+
+from Core import materializado
+from Core.materializado import RegistroComposiciones, borrar_obsoletos, publicar, sondear
+
+ANIOS = range(2009, 2015)
+
+
+@pytest.fixture
+def registro(tmp_path):
+    return RegistroComposiciones(str(tmp_path / "composiciones.json"))
+
+
+def test_cambiar_la_mascara_de_un_sensor_solo_republica_sus_anios(registro, monkeypatch):
+    assert {anio: publicar(anio, registro) for anio in ANIOS} == {anio: "en_curso" for anio in ANIOS}
+    assert sondear(registro) == 0
+    assert {e["estado"] for e in registro.entradas().values()} == {"listo"}
+
+    monkeypatch.setitem(materializado.VERSIONES_SENSOR, "LE07", 2)
+    estados = {anio: publicar(anio, registro) for anio in ANIOS}
+
+    assert [a for a, estado in estados.items() if estado == "en_curso"] == [2009, 2010, 2011]
+    assert [a for a, estado in estados.items() if estado == "listo"] == [2012, 2013, 2014]
+
+
+def test_republicar_en_curso_conserva_todos_los_sustituidos(registro, monkeypatch):
+    publicar(2010, registro)
+    sondear(registro)
+    listo = registro.entradas()[2010]["id"]
+
+    # Sin sondear, la versión 2 sigue en curso cuando se publica la 3
+    monkeypatch.setitem(materializado.VERSIONES_SENSOR, "LE07", 2)
+    publicar(2010, registro)
+    en_curso = registro.entradas()[2010]["id"]
+    monkeypatch.setitem(materializado.VERSIONES_SENSOR, "LE07", 3)
+    publicar(2010, registro)
+    sondear(registro)
+
+    entrada = registro.entradas()[2010]
+    assert entrada["estado"] == "listo"
+    assert entrada["anteriores"] == [listo, en_curso]
+    assert borrar_obsoletos(registro) == [listo, en_curso]
+    assert registro.entradas()[2010]["anteriores"] == []
@@ -0,0 +1,48 @@
+from benchmarks.ee_simulado import registro
+from Core.precalculo import leer_tabla, precalcular
+
+
+def _reducciones(**argumentos):
+    antes = registro.contar("getInfo")
+    assert precalcular(**argumentos) == []
+    return registro.contar("getInfo") - antes
+
+
+def test_forzar_vuelve_a_reducir_los_anios_en_cache(tmp_path):
+    directorio = str(tmp_path)
+
+    assert _reducciones(inicio=2014, fin=2015, directorio=directorio) >= 2
+    assert len(leer_tabla(directorio)) == 14
+
+    # Al día: ni una petición
+    assert _reducciones(inicio=2014, fin=2015, directorio=directorio) == 0
+
+    # Forzado: una reducción por año aunque estén en el almacén persistente
+    assert _reducciones(inicio=2014, fin=2015, directorio=directorio, forzar=True) == 2
+
+
+def test_max_edad_recalcula(tmp_path):
+    directorio = str(tmp_path)
+    _reducciones(inicio=2016, fin=2016, directorio=directorio)
+
+    assert _reducciones(inicio=2016, fin=2016, directorio=directorio, max_edad=-1) == 1
+
+
+def test_la_tabla_sirve_la_distribucion_sin_ir_a_gee():
+    from Core import datos
+
+    # En el directorio por defecto (dentro de la caché temporal de las pruebas)
+    _reducciones(inicio=2017, fin=2018)
+    tabla = leer_tabla()
+    assert {"p5", "p95", "histograma"} <= set(tabla.columns)
+
+    # El almacén se vacía: solo queda la tabla
+    datos.tabla_precalculada.clear()
+    for anio in (2017, 2018):
+        for indice in tabla["indice"].unique():
+            datos.obtener_cache().borrar(datos._clave("estadisticas", indice, anio))
+
+    antes = registro.contar("getInfo")
+    distribucion = datos.distribucion_periodos("NDVI", {"todo": (2017, 2018)})
+    assert registro.contar("getInfo") == antes
+    assert distribucion["todo"]["anios"] == 2
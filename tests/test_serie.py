@@ -0,0 +1,22 @@
+from Core import datos
+from Core.cache import obtener_cache
+
+
+def test_anios_de_un_lote_fallido_se_devuelven_aparte(monkeypatch):
+    obtener_cache().limpiar()
+    monkeypatch.setattr(datos, "tabla_precalculada", lambda: {})
+    monkeypatch.setattr(datos, "TAMANO_LOTE_SERIE", 3)
+
+    calcular = datos._estadisticas_lote_anual
+
+    def lote_con_fallo(lote, indice):
+        if any(p["anio"] == 2004 for p in lote):
+            raise RuntimeError("lote caído")
+        return calcular(lote, indice)
+
+    monkeypatch.setattr(datos, "_estadisticas_lote_anual", lote_con_fallo)
+
+    serie, fallidos = datos.serie_temporal("NDVI", 2000, 2008)
+    assert fallidos == ["2003", "2004", "2005"]
+    sin_valor = [str(d["Año"]) for d in serie if d["Valor"] is None]
+    assert sin_valor == fallidos
@@ -0,0 +1,46 @@
+import types
+
+from Core.teselas import CacheTeselas, ProxyTeselas
+
+
+def _proxy(tmp_path, version, ttl=3600):
+    proxy = ProxyTeselas(
+        cache=CacheTeselas(str(tmp_path), ttl=ttl),
+        resolver=lambda indice, anio: f"origen/{version['actual']}/{{z}}/{{x}}/{{y}}",
+        version=lambda indice, anio: version["actual"],
+    )
+    proxy._descargar = lambda plantilla, z, x, y: types.SimpleNamespace(
+        status_code=200, content=plantilla.format(z=z, x=x, y=y).encode()
+    )
+    return proxy
+
+
+def test_cambio_de_version_no_sirve_teselas_viejas(tmp_path):
+    version = {"actual": "mediana"}
+    proxy = _proxy(tmp_path, version)
+
+    assert proxy.tesela("NDVI", 2020, 10, 1, 2) == (200, b"origen/mediana/10/1/2")
+    assert proxy.tesela("NDVI", 2020, 10, 1, 2) == (200, b"origen/mediana/10/1/2")
+    assert proxy.contadores["aciertos"] == 1
+
+    # Año materializado: otra versión, otra plantilla y otra URL pública
+    version["actual"] = "asset"
+    assert proxy.tesela("NDVI", 2020, 10, 1, 2) == (200, b"origen/asset/10/1/2")
+    assert "/asset/" in proxy.url("NDVI", 2020)
+
+
+def test_teselas_caducadas_se_descargan_de_nuevo(tmp_path):
+    proxy = _proxy(tmp_path, {"actual": "v"}, ttl=-1)
+    proxy.tesela("NDVI", 2020, 10, 1, 2)
+    proxy.tesela("NDVI", 2020, 10, 1, 2)
+    assert proxy.contadores == {"aciertos": 0, "fallos": 2, "renovaciones": 0}
+
+
+def test_escucha_solo_en_local_por_defecto(tmp_path):
+    proxy = _proxy(tmp_path, {"actual": "v"})
+    proxy.puerto = 0
+    proxy.iniciar()
+    try:
+        assert proxy._servidor.server_address[0] == "127.0.0.1"
+    finally:
+        proxy.detener()
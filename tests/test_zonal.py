@@ -0,0 +1,24 @@
+from Core import zonal
+
+
+def test_zona_sin_campo_usa_system_index_o_posicion():
+    assert zonal._nombre_zona({"properties": {"zona": 7}}, 0) == "7"
+    assert zonal._nombre_zona({"id": "00000000000000000003", "properties": {}}, 3) == "00000000000000000003"
+    assert zonal._nombre_zona({"properties": None}, 12) == "12"
+
+
+def test_lotes_de_lista_llevan_su_posicion():
+    zonas = [{"type": "Feature", "properties": {"zona": str(i)}, "geometry": None} for i in range(250)]
+    assert [inicio for inicio, _ in zonal._lotes(zonas)] == [0, 100, 200]
+
+
+def test_huella_de_asset_cambia_con_su_version(monkeypatch):
+    version = {"actual": "2025-01-01T00:00:00Z"}
+    monkeypatch.setattr(zonal, "get_asset", lambda asset_id, funcion: {"updateTime": version["actual"]})
+    monkeypatch.setattr(zonal, "EDAD_VERSION_ASSET", 0)
+
+    asset = "users/ejemplo/parcelas"
+    antes = zonal.huella_zonas([asset, None, zonal.version_asset(asset)])
+    version["actual"] = "2025-06-01T00:00:00Z"
+    despues = zonal.huella_zonas([asset, None, zonal.version_asset(asset)])
+    assert antes != despues